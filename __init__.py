@@ -1,10 +1,14 @@
 import os
 import logging
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from .sqlite_profile import sqlite_settings_from_env, sqlite_engine_options, install_sqlite_profile
+from .db_routing import RoutingSession, init_replicas
+from .sharding import init_sharding, move_user
 
 # Set up logging
 logging.basicConfig(
@@ -21,9 +25,19 @@ class Base(DeclarativeBase):
     pass
 
 # Initialize extensions
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 
+def engine_options_for(uri, sqlite_settings):
+    """Engine options shared by the primary database and its replicas"""
+    options = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+    if uri.startswith("sqlite"):
+        options = sqlite_engine_options(sqlite_settings, options)
+    return options
+
 def create_app():
     # Create the app
     app = Flask(__name__, 
@@ -33,10 +47,71 @@ def create_app():
     # Configure the app
     app.config["SECRET_KEY"] = os.environ.get("SESSION_SECRET", "mindcare-ai-secret-key-2024")
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///mindcare.db")
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_recycle": 300,
-        "pool_pre_ping": True,
-    }
+    # SQLite production profile: WAL, tuned pragmas and serialized writers
+    app.config["SQLITE_SETTINGS"] = sqlite_settings_from_env()
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_for(
+        app.config["SQLALCHEMY_DATABASE_URI"], app.config["SQLITE_SETTINGS"])
+    # Read replicas for read-only views
+    app.config["SQLALCHEMY_REPLICA_URIS"] = [
+        url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ]
+    app.config["REPLICA_MAX_LAG_SECONDS"] = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 5))
+    app.config["REPLICA_LAG_CHECK_SECONDS"] = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", 5))
+    # Shard databases for per-user data
+    app.config["SQLALCHEMY_SHARD_URIS"] = [
+        url.strip() for url in os.environ.get("DATABASE_SHARD_URLS", "").split(",") if url.strip()
+    ]
+    app.config["SHARD_DIRECTORY_TTL"] = float(os.environ.get("SHARD_DIRECTORY_TTL", 5))
+    # Mood and journal rows older than this move to compressed archive segments
+    app.config["ARCHIVE_AFTER_DAYS"] = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))
+    # Background screening of community posts
+    app.config["MODERATION_BATCH_SIZE"] = int(os.environ.get("MODERATION_BATCH_SIZE", 32))
+    app.config["MODERATION_LINGER_MS"] = float(os.environ.get("MODERATION_LINGER_MS", 50))
+    app.config["MODERATION_POLL_SECONDS"] = float(os.environ.get("MODERATION_POLL_SECONDS", 5))
+    app.config["MODERATION_AUTOSTART"] = os.environ.get("MODERATION_AUTOSTART", "1") == "1"
+    # Long texts are classified as overlapping windows of the models' 512-token input, at most this many per text
+    app.config["ANALYZER_WINDOW_OVERLAP"] = int(os.environ.get("ANALYZER_WINDOW_OVERLAP", 64))
+    app.config["ANALYZER_MAX_WINDOWS"] = int(os.environ.get("ANALYZER_MAX_WINDOWS", 16))
+    # Analyzer keyword lexicons, re-read by every worker when the file changes
+    app.config["LEXICON_PATH"] = os.environ.get(
+        "LEXICON_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons", "mood.json"))
+    app.config["LEXICON_RELOAD_SECONDS"] = float(os.environ.get("LEXICON_RELOAD_SECONDS", 5))
+    # Largest batch the offline check-in sync endpoint accepts
+    app.config["MOOD_CHECKIN_BATCH_MAX"] = int(os.environ.get("MOOD_CHECKIN_BATCH_MAX", 100))
+    # Trending community feed: a post needs twice the reactions to keep up with one a half-life newer
+    app.config["TRENDING_HALF_LIFE_HOURS"] = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", 12))
+    app.config["TRENDING_CACHE_SIZE"] = int(os.environ.get("TRENDING_CACHE_SIZE", 200))
+    app.config["TRENDING_REFRESH_SECONDS"] = float(os.environ.get("TRENDING_REFRESH_SECONDS", 10))
+    # Community mood heatmap: hours with fewer distinct users than this are hidden
+    app.config["HEATMAP_MIN_USERS"] = int(os.environ.get("HEATMAP_MIN_USERS", 5))
+    app.config["HEATMAP_REFRESH_SECONDS"] = float(os.environ.get("HEATMAP_REFRESH_SECONDS", 60))
+    # Per-user journal embedding files for similar-entry search
+    app.config["VECTOR_INDEX_DIR"] = os.environ.get("VECTOR_INDEX_DIR", os.path.join(app.instance_path, "vectors"))
+    # Saved entries waiting for the background embedding worker, per process
+    app.config["EMBEDDING_MAX_PENDING"] = int(os.environ.get("EMBEDDING_MAX_PENDING", 10000))
+    # Usernames allowed to use the counselor triage console
+    app.config["TRIAGE_STAFF_USERNAMES"] = [
+        name.strip() for name in os.environ.get("TRIAGE_STAFF_USERNAMES", "").split(",") if name.strip()
+    ]
+    # Live update streams (Server-Sent Events)
+    app.config["SSE_MAX_QUEUE"] = int(os.environ.get("SSE_MAX_QUEUE", 100))
+    app.config["SSE_MAX_SUBSCRIBERS"] = int(os.environ.get("SSE_MAX_SUBSCRIBERS", 5000))
+    app.config["SSE_HEARTBEAT_SECONDS"] = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+    # Streams served through Flask each hold a thread; keep most of a WSGI worker's threads for pages
+    app.config["SSE_MAX_THREAD_STREAMS"] = int(os.environ.get(
+        "SSE_MAX_THREAD_STREAMS", max(1, int(os.environ.get("WEB_THREADS", 4)) // 2)))
+    # Live updates reach streams held by other worker processes through the database
+    app.config["BROADCAST_RELAY"] = os.environ.get("BROADCAST_RELAY", "1") == "1"
+    app.config["BROADCAST_POLL_SECONDS"] = float(os.environ.get("BROADCAST_POLL_SECONDS", 0.5))
+    app.config["BROADCAST_RETENTION_SECONDS"] = float(os.environ.get("BROADCAST_RETENTION_SECONDS", 300))
+    # ASGI mode (run_asgi.py): threads running the Flask views that are not served from the event loop
+    app.config["ASGI_THREADS"] = int(os.environ.get("ASGI_THREADS", 32))
+    # Per-user template fragment cache
+    app.config["FRAGMENT_CACHE_MAX_ENTRIES"] = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", 10000))
+    app.config["FRAGMENT_CACHE_MAX_BYTES"] = int(os.environ.get("FRAGMENT_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    # Full-page cache for static-content routes and error pages
+    app.config["PAGE_CACHE_ENABLED"] = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+    app.config["PAGE_CACHE_CHECK_SECONDS"] = float(os.environ.get("PAGE_CACHE_CHECK_SECONDS", 2))
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
     # Initialize extensions with the app
@@ -46,19 +121,122 @@ def create_app():
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
     
+    # Fingerprinted, precompressed static assets
+    from .assets import init_assets
+    init_assets(app)
+    
     @login_manager.user_loader
     def load_user(user_id):
         from .models import User
         return User.query.get(int(user_id))
     
     with app.app_context():
+        install_sqlite_profile(db.engine, app.config["SQLITE_SETTINGS"])
+        init_replicas(app,
+                      lambda uri: engine_options_for(uri, app.config["SQLITE_SETTINGS"]),
+                      lambda engine: install_sqlite_profile(engine, app.config["SQLITE_SETTINGS"]))
+        
         # Import models
         from . import models
         
         # Import routes
         from . import routes
         
+        # Enable {% cache %} fragments in templates
+        from .fragment_cache import init_fragment_cache
+        init_fragment_cache(app)
+        
+        from .page_cache import init_page_cache
+        init_page_cache(app)
+        
+        from .heatmap import init_heatmap
+        init_heatmap(app)
+        
+        from .trending import init_trending
+        init_trending(app)
+        
+        from .lexicon import init_lexicons
+        init_lexicons(app)
+        
+        from .ai_analyzer import init_analyzer
+        init_analyzer(app)
+        
         # Create database tables
         db.create_all()
+        init_sharding(app, db,
+                      lambda uri: engine_options_for(uri, app.config["SQLITE_SETTINGS"]),
+                      lambda engine: install_sqlite_profile(engine, app.config["SQLITE_SETTINGS"]))
+        
+        # Full-text index over journal entries
+        from .search import init_search
+        init_search(app)
+    
+    @app.cli.command('move-user')
+    @click.argument('user_id', type=int)
+    @click.argument('shard', type=int)
+    def move_user_command(user_id, shard):
+        """Move a user's data to another shard without downtime"""
+        moved = move_user(app, user_id, shard)
+        print(f"Moved {moved} rows for user {user_id} to shard {shard}")
+    
+    @app.cli.command('archive-data')
+    @click.option('--days', type=int, default=None, help='Archive rows older than this many days')
+    def archive_data_command(days):
+        """Move old mood and journal entries into cold storage"""
+        from .archive import archive_old_entries
+        archived = archive_old_entries(app, days)
+        print(f"Archived {archived} rows")
+    
+    @app.cli.command('rebuild-heatmap')
+    def rebuild_heatmap_command():
+        """Recompute the community mood heatmap from stored check-ins"""
+        from .heatmap import rebuild_aggregates
+        hours = rebuild_aggregates(app)
+        print(f"Rebuilt {hours} hourly mood aggregates")
+    
+    @app.cli.command('rebuild-trending')
+    def rebuild_trending_command():
+        """Recompute the trending order of community posts"""
+        from .trending import trending_feed
+        ranked = trending_feed.rebuild()
+        print(f"Ranked {ranked} community posts")
+    
+    @app.cli.command('check-lexicon')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def check_lexicon_command(path):
+        """Validate a lexicon file before publishing it to LEXICON_PATH"""
+        from .lexicon import Lexicon, LexiconError
+        try:
+            lexicon = Lexicon.load(path)
+        except LexiconError as e:
+            raise click.ClickException(f"{path}: {e}")
+        print(f"Lexicon version {lexicon.version}: {len(lexicon.emergency_keywords)} crisis phrases, "
+              f"{len(lexicon.positive_keywords)} positive and {len(lexicon.negative_keywords)} negative words, "
+              f"{len(lexicon.emotion_keywords)} emotions")
+    
+    @app.cli.command('backfill-change-log')
+    def backfill_change_log_command():
+        """Add entries saved before delta sync existed to the change log"""
+        from .sync import backfill_change_log
+        logged = backfill_change_log(app)
+        print(f"Logged {logged} existing entries")
+    
+    @app.cli.command('embed-journals')
+    @click.option('--user', 'user_id', type=int, default=None, help='Only index this user')
+    def embed_journals_command(user_id):
+        """Add every stored journal entry to the similar-entry vector index"""
+        from .models import JournalEntry
+        from .routes import index_journal_embedding
+        from .sharding import shard_sessions
+        indexed = 0
+        for shard, shard_session in shard_sessions(db):
+            query = shard_session.query(JournalEntry)
+            if user_id is not None:
+                query = query.filter(JournalEntry.user_id == user_id)
+            for entry in query.yield_per(500):
+                indexed += index_journal_embedding(entry)
+            if shard is not None:
+                shard_session.close()
+        print(f"Indexed {indexed} journal entries")
     
     return app
\ No newline at end of file
@@ -1,6 +1,8 @@
 import os
 import re
+import time
 import logging
+import threading
 try:
     from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 except ImportError:
@@ -14,6 +16,8 @@ from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 
+from .lexicon import lexicons
+
 # Download required NLTK data
 try:
     nltk.download('punkt', quiet=True)
@@ -23,8 +27,32 @@ try:
 except:
     pass
 
+# Synthetic check-ins pushed through every model before a process reports ready
+WARM_UP_TEXTS = [
+    "I feel really good about today and how things went.",
+    "This week has been exhausting and I am struggling to keep up.",
+    "Nothing special happened, just an ordinary afternoon.",
+]
+
+# Longest input the classifiers accept, in tokens
+MODEL_MAX_TOKENS = 512
+
+
+def padded_size(lengths, batch_size):
+    """Token positions the model computes, padding included, when `lengths` are batched in order"""
+    return sum(max(lengths[i:i + batch_size]) * len(lengths[i:i + batch_size])
+               for i in range(0, len(lengths), batch_size))
+
+
+def padding_efficiency(lengths, batch_size):
+    """Share of the computed positions that are real tokens"""
+    padded = padded_size(lengths, batch_size)
+    return sum(lengths) / padded if padded else 1.0
+
 class MoodAnalyzer:
     def __init__(self):
+        load_started = time.perf_counter()
+        
         # Initialize sentiment analysis pipeline
         try:
             self.sentiment_analyzer = pipeline(
@@ -47,13 +75,9 @@ class MoodAnalyzer:
             logging.warning(f"Could not load emotion model: {e}")
             self.emotion_analyzer = None
         
-        # Emergency keywords that might indicate suicidal thoughts
-        self.emergency_keywords = [
-            'suicide', 'kill myself', 'end it all', 'want to die', 'no point living',
-            'better off dead', 'worthless', 'hopeless', 'can\'t go on', 'end my life',
-            'suicidal', 'kill me', 'hurt myself', 'self harm', 'cut myself',
-            'overdose', 'jump off', 'hang myself', 'give up on life'
-        ]
+        # Emergency keywords that might indicate suicidal thoughts come from the
+        # hot-reloadable lexicon file (see lexicon.py)
+        self.lexicons = lexicons
         
         # Initialize text processing tools
         try:
@@ -62,6 +86,82 @@ class MoodAnalyzer:
         except:
             self.stop_words = set()
             self.lemmatizer = None
+        
+        # Long entries are classified as overlapping token windows (see _windows)
+        self.window_overlap = 64
+        self.max_windows = 16
+        # Inputs are sorted by token count before batching, so each batch pads to a similar length
+        self.sort_by_length = True
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        
+        # Model state for the readiness probe
+        self.load_seconds = time.perf_counter() - load_started
+        self.model_memory_mb = self._model_memory_mb()
+        self.warmup_seconds = None
+        self.last_inference_ms = None
+        self.inference_count = 0
+        self._ready_pid = None
+        self._warm_pid = None
+        self._warm_lock = threading.Lock()
+
+    def _model_memory_mb(self):
+        """Size of the loaded model weights"""
+        total = 0
+        for analyzer in (self.sentiment_analyzer, self.emotion_analyzer):
+            model = getattr(analyzer, 'model', None)
+            if model is None or not hasattr(model, 'parameters'):
+                continue
+            total += sum(p.numel() * p.element_size() for p in model.parameters())
+        return round(total / (1024 * 1024), 1) if total else None
+
+    def _observe(self, started):
+        """Record the latency of a model call"""
+        self.last_inference_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.inference_count += 1
+
+    def start_warm_up(self):
+        """Warm the models up in the background, once per process"""
+        if self._warm_pid == os.getpid():
+            return
+        with self._warm_lock:
+            if self._warm_pid != os.getpid():
+                self._warm_pid = os.getpid()
+                threading.Thread(target=self.warm_up, name='analyzer-warm-up', daemon=True).start()
+
+    def warm_up(self):
+        """Run a synthetic batch through every model so no real check-in pays for lazy initialization"""
+        self._warm_pid = os.getpid()
+        started = time.perf_counter()
+        self.analyze_sentiment_batch(WARM_UP_TEXTS)
+        self.detect_emotions_batch(WARM_UP_TEXTS)
+        for text in WARM_UP_TEXTS:
+            self.analyze_sentiment(text)
+            self.detect_emotions(text)
+        self.embed_text(WARM_UP_TEXTS[0])
+        self.warmup_seconds = time.perf_counter() - started
+        # Forked workers inherit this object, so readiness is tracked per process
+        self._ready_pid = os.getpid()
+        logging.info(f"Mood analyzer warmed up in {self.warmup_seconds:.2f}s (pid {os.getpid()})")
+
+    @property
+    def is_ready(self):
+        return self._ready_pid == os.getpid()
+
+    def status(self):
+        """Model state for health checks"""
+        return {
+            'ready': self.is_ready,
+            'sentiment_model': self.sentiment_analyzer is not None,
+            'emotion_model': self.emotion_analyzer is not None,
+            'load_seconds': round(self.load_seconds, 3),
+            'warmup_seconds': round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            'model_memory_mb': self.model_memory_mb,
+            'last_inference_ms': self.last_inference_ms,
+            'inferences': self.inference_count,
+            'padding_efficiency': round(self.real_tokens / self.padded_tokens, 3) if self.padded_tokens else None,
+            'lexicon': self.lexicons.status()
+        }
 
     def preprocess_text(self, text):
         """Clean and preprocess text for analysis"""
@@ -95,47 +195,9 @@ class MoodAnalyzer:
         
         try:
             # Get sentiment analysis
-            results = self.sentiment_analyzer(text)
-            
-            if isinstance(results, list) and len(results) > 0:
-                # Handle different model outputs
-                if isinstance(results[0], list):
-                    scores = results[0]
-                else:
-                    scores = results
-                
-                # Process scores
-                sentiment_scores = {}
-                for score in scores:
-                    label = score['label'].lower()
-                    # Normalize labels
-                    if 'positive' in label or label == 'pos':
-                        sentiment_scores['positive'] = score['score']
-                    elif 'negative' in label or label == 'neg':
-                        sentiment_scores['negative'] = score['score']
-                    else:
-                        sentiment_scores['neutral'] = score['score']
-                
-                # Determine primary sentiment
-                max_sentiment = max(sentiment_scores.items(), key=lambda x: x[1])
-                primary_sentiment = max_sentiment[0]
-                confidence = max_sentiment[1]
-                
-                # Calculate mood score (-1 to 1)
-                mood_score = 0.0
-                if 'positive' in sentiment_scores and 'negative' in sentiment_scores:
-                    mood_score = sentiment_scores['positive'] - sentiment_scores['negative']
-                elif 'positive' in sentiment_scores:
-                    mood_score = sentiment_scores['positive'] - 0.5
-                elif 'negative' in sentiment_scores:
-                    mood_score = 0.5 - sentiment_scores['negative']
-                
-                return {
-                    'sentiment': primary_sentiment,
-                    'confidence': confidence,
-                    'score': mood_score,
-                    'detailed_scores': sentiment_scores
-                }
+            scores = self._classify(self.sentiment_analyzer, [text])[0]
+            if scores:
+                return self._sentiment_from_scores(scores)
                 
         except Exception as e:
             logging.error(f"Error in sentiment analysis: {e}")
@@ -147,46 +209,218 @@ class MoodAnalyzer:
             'detailed_scores': {}
         }
 
+    def analyze_sentiment_batch(self, texts, batch_size=16):
+        """Analyze sentiment of many texts with one batched model call"""
+        neutral = {
+            'sentiment': 'neutral',
+            'confidence': 0.0,
+            'score': 0.0,
+            'detailed_scores': {}
+        }
+        results = [dict(neutral) for _ in texts]
+        
+        # Texts too short to classify keep the neutral default
+        positions = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 3]
+        if not positions:
+            return results
+        
+        try:
+            outputs = self._classify(self.sentiment_analyzer, [texts[i] for i in positions], batch_size=batch_size)
+            for i, scores in zip(positions, outputs):
+                results[i] = self._sentiment_from_scores(scores)
+        except Exception as e:
+            logging.error(f"Error in batched sentiment analysis: {e}")
+        
+        return results
+
+    def _windows(self, analyzer, text):
+        """Split a text into overlapping windows that each fit the model, with their token counts"""
+        tokenizer = getattr(analyzer, 'tokenizer', None)
+        if tokenizer is None:
+            # Without a tokenizer, characters stand in for tokens when ordering batches
+            return [(text, len(text))]
+        specials = tokenizer.num_special_tokens_to_add()
+        limit = min(tokenizer.model_max_length or MODEL_MAX_TOKENS, MODEL_MAX_TOKENS) - specials
+        try:
+            encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+            offsets = encoding['offset_mapping']
+        except NotImplementedError:
+            # Slow tokenizers have no character offsets; windows are decoded from the ids instead
+            encoding = tokenizer(text, add_special_tokens=False, verbose=False)
+            offsets = None
+        ids = encoding['input_ids']
+        if len(ids) <= limit:
+            return [(text, len(ids) + specials)]
+        
+        # Windows of `limit` tokens sharing `window_overlap` tokens with their neighbours; the last
+        # one ends on the final token so every window is full-size and scores weigh the same
+        step = max(1, limit - self.window_overlap)
+        starts = list(range(0, len(ids) - limit, step)) + [len(ids) - limit]
+        if len(starts) > self.max_windows:
+            # Cap the work per entry: keep the first and last windows and spread the rest evenly
+            keep = self.max_windows
+            starts = [starts[round(i * (len(starts) - 1) / (keep - 1))] for i in range(keep)] if keep > 1 else starts[:1]
+        
+        if offsets is None:
+            return [(tokenizer.decode(ids[start:start + limit]), limit + specials) for start in starts]
+        return [(text[offsets[start][0]:offsets[start + limit - 1][1]], limit + specials) for start in starts]
+
+    def _classify(self, analyzer, texts, batch_size=16):
+        """Label scores for each text, averaged over its windows, from one model call"""
+        windows = []
+        lengths = []
+        owners = []
+        for i, text in enumerate(texts):
+            for window, tokens in self._windows(analyzer, text):
+                windows.append(window)
+                lengths.append(tokens)
+                owners.append(i)
+        
+        # The pipeline pads every batch to its longest input, so a three-word check-in batched
+        # with a full window costs a full window; sorting keeps similar lengths together
+        order = range(len(windows))
+        if self.sort_by_length:
+            order = sorted(order, key=lambda j: lengths[j])
+        sorted_lengths = [lengths[j] for j in order]
+        self.real_tokens += sum(sorted_lengths)
+        self.padded_tokens += padded_size(sorted_lengths, batch_size)
+        
+        started = time.perf_counter()
+        sorted_outputs = analyzer([windows[j] for j in order], batch_size=batch_size, truncation=True)
+        self._observe(started)
+        
+        # Back to input order
+        outputs = [None] * len(windows)
+        for j, scores in zip(order, sorted_outputs):
+            outputs[j] = scores
+        
+        totals = [{} for _ in texts]
+        counts = [0] * len(texts)
+        for i, scores in zip(owners, outputs):
+            for score in (scores if isinstance(scores, list) else [scores]):
+                totals[i][score['label']] = totals[i].get(score['label'], 0.0) + score['score']
+            counts[i] += 1
+        return [[{'label': label, 'score': total / count} for label, total in label_totals.items()]
+                for label_totals, count in zip(totals, counts)]
+
+    def _sentiment_from_scores(self, scores):
+        """Turn one text's label scores into the analyzer's sentiment result"""
+        # Process scores
+        sentiment_scores = {}
+        for score in scores:
+            label = score['label'].lower()
+            # Normalize labels
+            if 'positive' in label or label == 'pos':
+                sentiment_scores['positive'] = score['score']
+            elif 'negative' in label or label == 'neg':
+                sentiment_scores['negative'] = score['score']
+            else:
+                sentiment_scores['neutral'] = score['score']
+        
+        # Determine primary sentiment
+        max_sentiment = max(sentiment_scores.items(), key=lambda x: x[1])
+        primary_sentiment = max_sentiment[0]
+        confidence = max_sentiment[1]
+        
+        # Calculate mood score (-1 to 1)
+        mood_score = 0.0
+        if 'positive' in sentiment_scores and 'negative' in sentiment_scores:
+            mood_score = sentiment_scores['positive'] - sentiment_scores['negative']
+        elif 'positive' in sentiment_scores:
+            mood_score = sentiment_scores['positive'] - 0.5
+        elif 'negative' in sentiment_scores:
+            mood_score = 0.5 - sentiment_scores['negative']
+        
+        return {
+            'sentiment': primary_sentiment,
+            'confidence': confidence,
+            'score': mood_score,
+            'detailed_scores': sentiment_scores
+        }
+
     def detect_emotions(self, text):
         """Detect specific emotions in the text"""
         if not self.emotion_analyzer or not text:
             return []
         
         try:
-            results = self.emotion_analyzer(text)
-            emotions = []
-            
-            for result in results:
-                if result['score'] > 0.3:  # Only include emotions with reasonable confidence
-                    emotions.append({
-                        'emotion': result['label'],
-                        'confidence': result['score']
-                    })
-            
-            # Sort by confidence
-            emotions.sort(key=lambda x: x['confidence'], reverse=True)
-            return emotions[:3]  # Return top 3 emotions
+            results = self._classify(self.emotion_analyzer, [text])[0]
+            return self._emotions_from_scores(results)
             
         except Exception as e:
             logging.error(f"Error in emotion detection: {e}")
             return []
 
-    def check_emergency_keywords(self, text):
+    def _emotions_from_scores(self, results):
+        """Top emotions from one text's label scores"""
+        emotions = []
+        
+        for result in results:
+            if result['score'] > 0.3:  # Only include emotions with reasonable confidence
+                emotions.append({
+                    'emotion': result['label'],
+                    'confidence': result['score']
+                })
+        
+        # Sort by confidence
+        emotions.sort(key=lambda x: x['confidence'], reverse=True)
+        return emotions[:3]  # Return top 3 emotions
+
+    def detect_emotions_batch(self, texts, batch_size=16):
+        """Detect emotions in many texts with one batched model call"""
+        results = [[] for _ in texts]
+        positions = [i for i, text in enumerate(texts) if text]
+        if not self.emotion_analyzer or not positions:
+            return results
+        
+        try:
+            outputs = self._classify(self.emotion_analyzer, [texts[i] for i in positions], batch_size=batch_size)
+            for i, scores in zip(positions, outputs):
+                results[i] = self._emotions_from_scores(scores)
+        except Exception as e:
+            logging.error(f"Error in batched emotion detection: {e}")
+        
+        return results
+
+    def embed_text(self, text):
+        """Mean-pooled sentence embedding from the sentiment model's encoder"""
+        if not text or self.sentiment_analyzer is None:
+            return None
+        
+        try:
+            import torch
+            tokenizer = self.sentiment_analyzer.tokenizer
+            model = self.sentiment_analyzer.model
+            inputs = tokenizer(text, truncation=True, max_length=512, return_tensors='pt')
+            started = time.perf_counter()
+            with torch.no_grad():
+                hidden = model.base_model(**inputs).last_hidden_state
+            self._observe(started)
+            
+            # Average the token vectors, ignoring padding
+            mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            embedding = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            return embedding[0].cpu().numpy()
+            
+        except Exception as e:
+            logging.error(f"Error computing text embedding: {e}")
+            return None
+
+    @property
+    def emergency_keywords(self):
+        return self.lexicons.current.emergency_keywords
+
+    def check_emergency_keywords(self, text, lexicon=None):
         """Check if text contains emergency/suicidal keywords"""
         if not text:
             return False, []
         
-        text_lower = text.lower()
-        found_keywords = []
-        
-        for keyword in self.emergency_keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
-        
+        found_keywords = (lexicon or self.lexicons.current).emergency_matches(text)
         return len(found_keywords) > 0, found_keywords
 
     def analyze_mood_text(self, text):
         """Comprehensive mood analysis"""
+        lexicon = self.lexicons.current
         if not text:
             return {
                 'sentiment': 'neutral',
@@ -194,7 +428,8 @@ class MoodAnalyzer:
                 'mood_score': 0.0,
                 'emotions': [],
                 'is_emergency': False,
-                'emergency_keywords': []
+                'emergency_keywords': [],
+                'lexicon_version': lexicon.version
             }
         
         # Preprocess text
@@ -207,7 +442,7 @@ class MoodAnalyzer:
         emotions = self.detect_emotions(text)
         
         # Check for emergency keywords
-        is_emergency, emergency_keywords = self.check_emergency_keywords(text)
+        is_emergency, emergency_keywords = self.check_emergency_keywords(text, lexicon)
         
         return {
             'sentiment': sentiment_result['sentiment'],
@@ -216,9 +451,32 @@ class MoodAnalyzer:
             'detailed_scores': sentiment_result['detailed_scores'],
             'emotions': emotions,
             'is_emergency': is_emergency,
-            'emergency_keywords': emergency_keywords
+            'emergency_keywords': emergency_keywords,
+            'lexicon_version': lexicon.version
         }
 
+    def analyze_mood_texts(self, texts, batch_size=16):
+        """analyze_mood_text for many texts, sharing one call per model"""
+        sentiments = self.analyze_sentiment_batch(texts, batch_size=batch_size)
+        emotions = self.detect_emotions_batch(texts, batch_size=batch_size)
+        # The whole batch is screened with one lexicon version
+        lexicon = self.lexicons.current
+        
+        results = []
+        for text, sentiment_result, text_emotions in zip(texts, sentiments, emotions):
+            is_emergency, emergency_keywords = self.check_emergency_keywords(text, lexicon)
+            results.append({
+                'sentiment': sentiment_result['sentiment'],
+                'confidence': sentiment_result['confidence'],
+                'mood_score': sentiment_result['score'],
+                'detailed_scores': sentiment_result['detailed_scores'],
+                'emotions': text_emotions,
+                'is_emergency': is_emergency,
+                'emergency_keywords': emergency_keywords,
+                'lexicon_version': lexicon.version
+            })
+        return results
+
     def calculate_mood_trend(self, mood_scores, days=7):
         """Calculate mood trend over specified days"""
         if len(mood_scores) < 2:
@@ -243,3 +501,8 @@ class MoodAnalyzer:
 
 # Global analyzer instance
 mood_analyzer = MoodAnalyzer()
+
+
+def init_analyzer(app):
+    mood_analyzer.window_overlap = app.config.get('ANALYZER_WINDOW_OVERLAP', mood_analyzer.window_overlap)
+    mood_analyzer.max_windows = app.config.get('ANALYZER_MAX_WINDOWS', mood_analyzer.max_windows)
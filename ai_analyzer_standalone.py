@@ -3,31 +3,71 @@ import logging
 
 # Basic sentiment analysis using keyword matching
 # This is a simplified version that doesn't require external ML libraries
+#
+# Inside the app the keywords come from the hot-reloadable lexicon file (see
+# lexicon.py). Used on its own, outside the package, it falls back to the
+# built-in keyword lists below, which never reload.
+
+
+class BuiltinLexicon:
+    """Keyword lists used when the lexicon file is not available"""
+
+    version = 'builtin'
+
+    # Emergency keywords that might indicate suicidal thoughts
+    emergency_keywords = (
+        'suicide', 'kill myself', 'end it all', 'want to die', 'no point living',
+        'better off dead', 'worthless', 'hopeless', 'can\'t go on', 'end my life',
+        'suicidal', 'kill me', 'hurt myself', 'self harm', 'cut myself',
+        'overdose', 'jump off', 'hang myself', 'give up on life'
+    )
+
+    # Positive and negative keywords for basic sentiment analysis
+    positive_keywords = frozenset([
+        'happy', 'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic',
+        'joy', 'excited', 'love', 'perfect', 'awesome', 'brilliant', 'cheerful',
+        'delighted', 'pleased', 'grateful', 'thankful', 'blessed', 'optimistic',
+        'confident', 'proud', 'satisfied', 'content', 'peaceful', 'relaxed'
+    ])
+
+    negative_keywords = frozenset([
+        'sad', 'bad', 'terrible', 'awful', 'horrible', 'depressed', 'angry',
+        'frustrated', 'upset', 'worried', 'anxious', 'stressed', 'overwhelmed',
+        'lonely', 'tired', 'exhausted', 'disappointed', 'hurt', 'pain',
+        'scared', 'afraid', 'nervous', 'mad', 'furious', 'hate'
+    ])
+
+    emotion_keywords = {
+        'joy': frozenset(['happy', 'joy', 'excited', 'cheerful', 'delighted', 'elated']),
+        'sadness': frozenset(['sad', 'depressed', 'lonely', 'disappointed', 'grief']),
+        'anger': frozenset(['angry', 'mad', 'furious', 'frustrated', 'irritated']),
+        'fear': frozenset(['scared', 'afraid', 'worried', 'anxious', 'nervous']),
+        'love': frozenset(['love', 'adore', 'cherish', 'affection', 'care']),
+        'gratitude': frozenset(['grateful', 'thankful', 'blessed', 'appreciative'])
+    }
+
+    def emergency_matches(self, text):
+        """Crisis phrases contained in the text, in list order"""
+        text_lower = (text or '').lower()
+        return [keyword for keyword in self.emergency_keywords if keyword in text_lower]
+
+
+class BuiltinLexicons:
+    """Stands in for the lexicon store, always serving the built-in lists"""
+
+    current = BuiltinLexicon()
+
+
+try:
+    from .lexicon import lexicons
+except ImportError:
+    lexicons = BuiltinLexicons()
 
 class MoodAnalyzer:
     def __init__(self):
-        # Emergency keywords that might indicate suicidal thoughts
-        self.emergency_keywords = [
-            'suicide', 'kill myself', 'end it all', 'want to die', 'no point living',
-            'better off dead', 'worthless', 'hopeless', 'can\'t go on', 'end my life',
-            'suicidal', 'kill me', 'hurt myself', 'self harm', 'cut myself',
-            'overdose', 'jump off', 'hang myself', 'give up on life'
-        ]
-        
-        # Positive and negative keywords for basic sentiment analysis
-        self.positive_keywords = [
-            'happy', 'good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic',
-            'joy', 'excited', 'love', 'perfect', 'awesome', 'brilliant', 'cheerful',
-            'delighted', 'pleased', 'grateful', 'thankful', 'blessed', 'optimistic',
-            'confident', 'proud', 'satisfied', 'content', 'peaceful', 'relaxed'
-        ]
-        
-        self.negative_keywords = [
-            'sad', 'bad', 'terrible', 'awful', 'horrible', 'depressed', 'angry',
-            'frustrated', 'upset', 'worried', 'anxious', 'stressed', 'overwhelmed',
-            'lonely', 'tired', 'exhausted', 'disappointed', 'hurt', 'pain',
-            'scared', 'afraid', 'nervous', 'angry', 'mad', 'furious', 'hate'
-        ]
+        # Emergency, positive/negative and emotion keywords come from the
+        # hot-reloadable lexicon file, or the built-in lists outside the app
+        self.lexicons = lexicons
         
         # Basic stop words
         self.stop_words = {
@@ -57,7 +97,7 @@ class MoodAnalyzer:
         
         return ' '.join(filtered_words)
 
-    def analyze_sentiment(self, text):
+    def analyze_sentiment(self, text, lexicon=None):
         """Analyze sentiment of the given text using keyword matching"""
         if not text or len(text.strip()) < 3:
             return {
@@ -72,8 +112,9 @@ class MoodAnalyzer:
         words = processed_text.split()
         
         # Count positive and negative words
-        positive_count = sum(1 for word in words if word in self.positive_keywords)
-        negative_count = sum(1 for word in words if word in self.negative_keywords)
+        lexicon = lexicon or self.lexicons.current
+        positive_count = sum(1 for word in words if word in lexicon.positive_keywords)
+        negative_count = sum(1 for word in words if word in lexicon.negative_keywords)
         total_words = len(words)
         
         # Calculate sentiment scores
@@ -113,26 +154,16 @@ class MoodAnalyzer:
             }
         }
 
-    def detect_emotions(self, text):
+    def detect_emotions(self, text, lexicon=None):
         """Detect specific emotions in the text using keyword matching"""
         if not text:
             return []
         
-        # Emotion keywords
-        emotion_keywords = {
-            'joy': ['happy', 'joy', 'excited', 'cheerful', 'delighted', 'elated'],
-            'sadness': ['sad', 'depressed', 'lonely', 'disappointed', 'grief'],
-            'anger': ['angry', 'mad', 'furious', 'frustrated', 'irritated'],
-            'fear': ['scared', 'afraid', 'worried', 'anxious', 'nervous'],
-            'love': ['love', 'adore', 'cherish', 'affection', 'care'],
-            'gratitude': ['grateful', 'thankful', 'blessed', 'appreciative']
-        }
-        
         processed_text = self.preprocess_text(text)
         words = processed_text.split()
         
         emotions = []
-        for emotion, keywords in emotion_keywords.items():
+        for emotion, keywords in (lexicon or self.lexicons.current).emotion_keywords.items():
             count = sum(1 for word in words if word in keywords)
             if count > 0:
                 confidence = min(0.9, count / len(words) * 5)  # Scale confidence
@@ -145,39 +176,35 @@ class MoodAnalyzer:
         emotions.sort(key=lambda x: x['confidence'], reverse=True)
         return emotions[:3]  # Return top 3 emotions
 
-    def check_emergency_keywords(self, text):
+    def check_emergency_keywords(self, text, lexicon=None):
         """Check if text contains emergency/suicidal keywords"""
         if not text:
             return []
         
-        text_lower = text.lower()
-        found_keywords = []
-        
-        for keyword in self.emergency_keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
-        
-        return found_keywords
+        return (lexicon or self.lexicons.current).emergency_matches(text)
 
     def analyze_mood_text(self, text):
         """Comprehensive mood analysis"""
+        # One lexicon version for the whole analysis, even if a reload lands midway
+        lexicon = self.lexicons.current
         if not text:
             return {
                 'sentiment': 'neutral',
                 'confidence': 0.0,
                 'score': 0.0,
                 'emotions': [],
-                'emergency_keywords': []
+                'emergency_keywords': [],
+                'lexicon_version': lexicon.version
             }
         
         # Get sentiment analysis
-        sentiment_result = self.analyze_sentiment(text)
+        sentiment_result = self.analyze_sentiment(text, lexicon)
         
         # Get emotions
-        emotions = self.detect_emotions(text)
+        emotions = self.detect_emotions(text, lexicon)
         
         # Check for emergency keywords
-        emergency_keywords = self.check_emergency_keywords(text)
+        emergency_keywords = self.check_emergency_keywords(text, lexicon)
         
         return {
             'sentiment': sentiment_result['sentiment'],
@@ -185,7 +212,8 @@ class MoodAnalyzer:
             'score': sentiment_result['score'],
             'emotions': emotions,
             'emergency_keywords': emergency_keywords,
-            'detailed_scores': sentiment_result['detailed_scores']
+            'detailed_scores': sentiment_result['detailed_scores'],
+            'lexicon_version': lexicon.version
         }
 
     def calculate_mood_trend(self, mood_scores, days=7):
@@ -0,0 +1,213 @@
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, func, desc
+from sqlalchemy.orm import defer
+
+from . import db
+from .models import MoodEntry, JournalEntry, EmergencyAlert, ArchiveSegment, ChangeLog, JournalSentence, ArchivedJournalText
+from .sharding import shard_sessions, using_shard
+
+# Cold storage for old mood and journal rows.
+#
+# `flask archive-data` moves rows older than ARCHIVE_AFTER_DAYS out of the hot
+# tables into archive_segments: one gzip-compressed JSON-lines blob per user,
+# kind and run, appended and never rewritten. Segments sit next to the user's
+# hot rows (on the same shard) and record the date range they cover, so the
+# readers below only decompress them when a requested range reaches that far.
+# Journal text is also kept uncompressed in archived_journal_texts, so search
+# never has to decompress a segment (see search.py).
+
+ARCHIVE_KINDS = {'mood': MoodEntry, 'journal': JournalEntry}
+_MODEL_KINDS = {model: kind for kind, model in ARCHIVE_KINDS.items()}
+
+# Keeps each DELETE ... IN (...) well under database parameter limits
+DELETE_BATCH_SIZE = 500
+
+
+class ArchivedEntry:
+    """Read-only stand-in for a mood or journal row that lives in the archive"""
+    is_archived = True
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def _encode_rows(rows):
+    lines = []
+    for row in rows:
+        values = {name: value.isoformat() if isinstance(value, datetime) else value
+                  for name, value in row.items()}
+        lines.append(json.dumps(values, separators=(',', ':')))
+    return gzip.compress('\n'.join(lines).encode('utf-8'), mtime=0)
+
+
+def decode_segment(segment, model):
+    datetime_columns = [column.name for column in model.__table__.columns if isinstance(column.type, db.DateTime)]
+    entries = []
+    for line in gzip.decompress(segment.payload).decode('utf-8').splitlines():
+        values = json.loads(line)
+        for name in datetime_columns:
+            if values.get(name):
+                values[name] = datetime.fromisoformat(values[name])
+        entries.append(ArchivedEntry(values))
+    return entries
+
+
+def _segment_query(model, user_id, since=None, until=None):
+    query = ArchiveSegment.query.filter(ArchiveSegment.user_id == user_id,
+                                        ArchiveSegment.kind == _MODEL_KINDS[model])
+    if since is not None:
+        query = query.filter(ArchiveSegment.end_at >= since)
+    if until is not None:
+        query = query.filter(ArchiveSegment.start_at < until)
+    return query
+
+
+def archive_stamp(model, user_id, since=None, until=None):
+    """Cheap fingerprint of the archived data a range would read, for cache validators"""
+    with using_shard(db.session, user_id):
+        count, newest_id = _segment_query(model, user_id, since, until)\
+            .with_entities(func.count(ArchiveSegment.id), func.max(ArchiveSegment.id)).one()
+    # Archived rows also age out of a sliding window day by day
+    return (count, newest_id, since.date() if count and since is not None else None)
+
+
+def load_archived(model, user_id, since=None, until=None):
+    """Archived rows of a user created in [since, until), oldest first"""
+    entries = []
+    with using_shard(db.session, user_id):
+        segments = _segment_query(model, user_id, since, until).all()
+    for segment in segments:
+        entries.extend(
+            entry for entry in decode_segment(segment, model)
+            if (since is None or entry.created_at >= since) and (until is None or entry.created_at < until)
+        )
+    entries.sort(key=lambda entry: entry.created_at)
+    return entries
+
+
+def entries_between(model, user_id, since=None, until=None):
+    """Hot and archived rows of a user created in [since, until), oldest first"""
+    query = model.query.filter(model.user_id == user_id)
+    if since is not None:
+        query = query.filter(model.created_at >= since)
+    if until is not None:
+        query = query.filter(model.created_at < until)
+    with using_shard(db.session, user_id):
+        hot = query.order_by(model.created_at).all()
+
+    archived = load_archived(model, user_id, since, until)
+    if not archived:
+        return hot
+    return sorted(archived + hot, key=lambda entry: entry.created_at or datetime.min)
+
+
+def recent_entries(model, user_id, limit):
+    """Newest rows of a user across the hot table and the archive, newest first"""
+    with using_shard(db.session, user_id):
+        entries = model.query.filter(model.user_id == user_id)\
+                             .order_by(desc(model.created_at))\
+                             .limit(limit).all()
+        # Rows kept hot past the cutoff (alerted check-ins) can be older than archived ones,
+        # so every segment reaching past the oldest row kept so far is a candidate
+        since = entries[-1].created_at if len(entries) >= limit else None
+        segments = _segment_query(model, user_id, since).order_by(desc(ArchiveSegment.end_at))
+        # Payloads are only fetched for the segments actually needed
+        for segment in segments.options(defer(ArchiveSegment.payload)).all():
+            if len(entries) >= limit and segment.end_at < (entries[-1].created_at or datetime.min):
+                break
+            entries = sorted(entries + decode_segment(segment, model),
+                             key=lambda entry: entry.created_at or datetime.min, reverse=True)[:limit]
+    return entries
+
+
+def _archive_user(session, kind, model, user_id, cutoff):
+    table = model.__table__
+    query = select(table).where(table.c.user_id == user_id, table.c.created_at < cutoff)
+    if model is MoodEntry:
+        # Entries that raised an emergency alert stay hot for the triage history
+        alerts = EmergencyAlert.__table__
+        query = query.where(table.c.id.not_in(
+            select(alerts.c.mood_entry_id).where(alerts.c.mood_entry_id.is_not(None))
+        ))
+    rows = session.execute(query.order_by(table.c.created_at, table.c.id)).mappings().all()
+    if not rows:
+        return 0
+
+    segment_id = session.execute(insert(ArchiveSegment.__table__).values(
+        user_id=user_id,
+        kind=kind,
+        start_at=rows[0]['created_at'],
+        end_at=rows[-1]['created_at'],
+        row_count=len(rows),
+        payload=_encode_rows(rows),
+        created_at=datetime.utcnow()
+    )).inserted_primary_key[0]
+    if model is JournalEntry:
+        _index_journal_rows(session, user_id, segment_id, rows)
+    ids = [row['id'] for row in rows]
+    log = ChangeLog.__table__
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[start:start + DELETE_BATCH_SIZE]
+        if model is JournalEntry:
+            # Archived entries cannot be edited, so their cached sentence analysis goes too
+            sentences = JournalSentence.__table__
+            session.execute(delete(sentences).where(sentences.c.user_id == user_id,
+                                                    sentences.c.journal_entry_id.in_(batch)))
+        session.execute(delete(table).where(table.c.id.in_(batch)))
+        # Archiving is not a deletion: the rows leave delta sync without tombstones
+        session.execute(delete(log).where(log.c.user_id == user_id, log.c.entity == table.name,
+                                          log.c.entity_id.in_(batch)))
+    return len(rows)
+
+
+def _index_journal_rows(connection, user_id, segment_id, rows):
+    connection.execute(insert(ArchivedJournalText.__table__), [{
+        'user_id': user_id,
+        'segment_id': segment_id,
+        'entry_id': row['id'],
+        'title': row['title'],
+        'content': row['content'],
+        'created_at': row['created_at']
+    } for row in rows])
+
+
+def index_archived_journals(connection):
+    """Add search text for journal segments archived before archived_journal_texts existed"""
+    segments, texts = ArchiveSegment.__table__, ArchivedJournalText.__table__
+    pending = connection.execute(select(segments).where(
+        segments.c.kind == _MODEL_KINDS[JournalEntry],
+        segments.c.id.not_in(select(texts.c.segment_id))
+    )).all()
+    for segment in pending:
+        rows = [vars(entry) for entry in decode_segment(segment, JournalEntry)]
+        _index_journal_rows(connection, segment.user_id, segment.id, rows)
+    return len(pending)
+
+
+def archive_old_entries(app, older_than_days=None):
+    """Move mood and journal rows older than the cutoff into archive segments"""
+    days = older_than_days or app.config.get('ARCHIVE_AFTER_DAYS', 365)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+
+    with app.app_context():
+        for shard, session in shard_sessions(db):
+            try:
+                for kind, model in ARCHIVE_KINDS.items():
+                    table = model.__table__
+                    user_ids = session.execute(
+                        select(table.c.user_id).where(table.c.created_at < cutoff).distinct()
+                    ).scalars().all()
+                    # One transaction per user, so a segment and its deletes land together
+                    for user_id in user_ids:
+                        archived += _archive_user(session, kind, model, user_id, cutoff)
+                        session.commit()
+            finally:
+                if shard is not None:
+                    session.close()
+
+    logging.info(f"Archived {archived} mood and journal rows older than {days} days")
+    return archived
\ No newline at end of file
@@ -0,0 +1,407 @@
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+from itsdangerous import BadSignature
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.http import parse_etags, parse_date, http_date
+
+from .models import User, MoodEntry, ArchiveSegment
+from .broadcast import hub, HubFull, sse_stream_async
+from .conditional import make_etag, as_utc
+from .archive import decode_segment
+from .sqlite_profile import install_sqlite_profile
+
+# ASGI serving mode.
+#
+#   uvicorn run_asgi:app
+#
+# The routes that spend their time waiting rather than computing are served
+# straight from the event loop: the community and triage live streams hold no
+# thread while idle, so one process can keep thousands of browsers connected,
+# and /api/mood-data reads through async SQLAlchemy engines that mirror the
+# primary, replica and shard engines of the Flask app. Every other request,
+# and anyone the login manager has to redirect or refuse, goes to the
+# unchanged Flask app on a bounded thread pool, so page rendering and analyzer
+# calls never block the loop.
+#
+# The /community and /dashboard pages still render through Flask on that pool:
+# their reads go through the fragment and page caches, Flask-Login and the
+# replica and shard routing of the sync session, which have no async
+# counterparts yet. They finish in one request-sized slice of a thread, so
+# unlike the streams they do not pin the pool.
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+
+def async_url(url):
+    """Same database as a sync engine URL, through its asyncio driver"""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver known for {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP request"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_response(send, status, body=b'', headers=()):
+    headers = list(headers) + [(b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class WSGIBridge:
+    """Runs the Flask app on a thread pool and streams its response back to the event loop"""
+
+    def __init__(self, wsgi_app, threads=32):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        started = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return written.append
+
+        chunks = await loop.run_in_executor(self.executor, self.wsgi_app, wsgi_environ(scope, bytes(body)), start_response)
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            # Streaming views (SSE) block between chunks, so each one is pulled on the pool
+            iterator = iter(chunks)
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            for data in written:
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            while chunk is not None and not disconnected.done():
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            if hasattr(chunks, 'close'):
+                await loop.run_in_executor(self.executor, chunks.close)
+
+
+class AsyncDatabase:
+    """Async engines for the databases behind the Flask app's sync engines"""
+
+    def __init__(self, app, primary):
+        settings = app.config['SQLITE_SETTINGS']
+        self.router = app.extensions.get('shard_router')
+        self.primary = self._engine(primary.url, settings)
+        self.shards = [self._engine(engine.url, settings) for engine in self.router.engines] if self.router else []
+        self.replicas = [(replica, self._engine(replica.engine.url, settings))
+                         for replica in app.extensions.get('db_replicas', [])]
+        self.check_interval = app.config.get('REPLICA_LAG_CHECK_SECONDS', 5.0)
+        self._monitor = None
+
+    @staticmethod
+    def _engine(url, settings):
+        options = {}
+        if url.get_backend_name() == 'sqlite':
+            options['connect_args'] = {'timeout': settings['busy_timeout'] / 1000.0}
+        engine = create_async_engine(async_url(url), **options)
+        install_sqlite_profile(engine.sync_engine, settings)
+        return engine
+
+    async def engine_for(self, user_id, read_only=False):
+        """Engine holding a user's mood data, a healthy replica for reads when there is one"""
+        if self.router is not None:
+            shard = self.router.cached_shard(user_id)
+            if shard is None:
+                # Directory misses query the primary with the sync engine; keep that off the loop
+                shard = await asyncio.get_running_loop().run_in_executor(None, self.router.shard_for, user_id)
+            return self.shards[shard]
+        if read_only:
+            self._ensure_monitor()
+            healthy = [engine for replica, engine in self.replicas if replica.last_known_healthy]
+            if healthy:
+                return random.choice(healthy)
+        return self.primary
+
+    def _ensure_monitor(self):
+        if self.replicas and self._monitor is None:
+            self._monitor = asyncio.ensure_future(self._check_replicas())
+
+    async def _check_replicas(self):
+        # Lag checks use the sync engines, so they run on the default executor
+        loop = asyncio.get_running_loop()
+        while True:
+            for replica, _ in self.replicas:
+                await loop.run_in_executor(None, replica.is_healthy)
+            await asyncio.sleep(self.check_interval)
+
+    async def user_exists(self, user_id):
+        async with self.primary.connect() as conn:
+            return (await conn.execute(select(User.id).where(User.id == user_id))).first() is not None
+
+    async def dispose(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for engine in [self.primary] + self.shards + [engine for _, engine in self.replicas]:
+            await engine.dispose()
+
+
+class AsgiApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.bridge = WSGIBridge(flask_app, flask_app.config.get('ASGI_THREADS', 32))
+        self.heartbeat = flask_app.config.get('SSE_HEARTBEAT_SECONDS', 15.0)
+        self.max_replica_lag = flask_app.config.get('REPLICA_MAX_LAG_SECONDS', 5.0)
+        self.cookie_name = flask_app.config['SESSION_COOKIE_NAME']
+        self.serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.session_max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+        try:
+            with flask_app.app_context():
+                self.db = AsyncDatabase(flask_app, flask_app.extensions['sqlalchemy'].engine)
+        except (ImportError, ValueError) as e:
+            logging.warning(f"Async database access unavailable, serving every route through Flask: {e}")
+            self.db = None
+
+        self.routes = {
+            ('GET', '/community/stream'): self.community_stream,
+            ('GET', '/api/triage/stream'): self.triage_stream,
+            ('GET', '/api/mood-data'): self.mood_data,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        handler = self.routes.get((scope['method'], scope['path'])) if self.db is not None else None
+        if handler is not None:
+            session = self.load_session(scope)
+            user_id = await self.authenticated_user(session)
+            if user_id is not None:
+                return await handler(scope, receive, send, user_id, session)
+        # Everything else, including visitors the login manager has to redirect, goes through Flask
+        await self.bridge(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.db is not None:
+                    await self.db.dispose()
+                self.bridge.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def load_session(self, scope):
+        """Flask session from the request's signed cookie, empty when missing or tampered with"""
+        cookies = SimpleCookie()
+        for name, value in scope.get('headers', []):
+            if name == b'cookie':
+                cookies.load(value.decode('latin-1'))
+        morsel = cookies.get(self.cookie_name)
+        if morsel is None or self.serializer is None:
+            return {}
+        try:
+            return self.serializer.loads(morsel.value, max_age=self.session_max_age)
+        except BadSignature:
+            return {}
+
+    async def username(self, user_id):
+        async with self.db.primary.connect() as conn:
+            return (await conn.execute(select(User.username).where(User.id == user_id))).scalar()
+
+    async def authenticated_user(self, session):
+        """Id of the user Flask-Login would load for this session, or None"""
+        try:
+            user_id = int(session.get('_user_id'))
+        except (TypeError, ValueError):
+            return None
+        return user_id if await self.db.user_exists(user_id) else None
+
+    def recent_writer(self, session):
+        last_write = session.get('_last_write_at')
+        return last_write is not None and time.time() - last_write < self.max_replica_lag
+
+    async def community_stream(self, scope, receive, send, user_id, session):
+        """Server-Sent Events stream of new posts and reaction counts"""
+        await self.event_stream(receive, send, 'community')
+
+    async def triage_stream(self, scope, receive, send, user_id, session):
+        """Server-Sent Events stream of new and resolved emergency alerts, for counselors"""
+        if await self.username(user_id) not in self.flask_app.config.get('TRIAGE_STAFF_USERNAMES', []):
+            # Flask renders the 403 page
+            return await self.bridge(scope, receive, send)
+
+        def snapshot():
+            from .routes import get_unresolved_alerts
+            with self.flask_app.app_context():
+                return [{'id': 0, 'event': 'snapshot', 'data': get_unresolved_alerts()}]
+
+        # Taken after subscribing so no alert falls in between; the queries are sync, so off the loop
+        await self.event_stream(receive, send, 'triage',
+                                lambda: asyncio.get_running_loop().run_in_executor(self.bridge.executor, snapshot))
+
+    async def event_stream(self, receive, send, channel, initial=None):
+        try:
+            subscription = hub.subscribe(channel)
+        except HubFull:
+            logging.warning(f"Rejecting live stream on '{channel}': subscriber limit reached")
+            return await send_response(send, 503, b'Too many live connections, please retry shortly.',
+                                       [(b'content-type', b'text/plain'), (b'retry-after', b'30')])
+        try:
+            initial = await initial() if initial is not None else None
+        except Exception:
+            subscription.close()
+            raise
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        frames = sse_stream_async(subscription, heartbeat=self.heartbeat, initial=initial)
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            while True:
+                frame = asyncio.ensure_future(frames.__anext__())
+                await asyncio.wait({frame, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    # Let the cancelled read unwind the generator before closing it
+                    frame.cancel()
+                    await asyncio.wait({frame})
+                    break
+                await send({'type': 'http.response.body', 'body': frame.result().encode('utf-8'), 'more_body': True})
+        finally:
+            disconnected.cancel()
+            await frames.aclose()
+
+    async def mood_data(self, scope, receive, send, user_id, session):
+        """/api/mood-data from the event loop; same payload and validators as the Flask view"""
+        try:
+            days = int(parse_qs(scope.get('query_string', b'').decode('latin-1')).get('days', ['30'])[0])
+        except ValueError:
+            days = 30
+        start_date = datetime.utcnow() - timedelta(days=days)
+        in_window = (MoodEntry.user_id == user_id, MoodEntry.created_at >= start_date)
+        in_archive = (ArchiveSegment.user_id == user_id, ArchiveSegment.kind == 'mood',
+                      ArchiveSegment.end_at >= start_date)
+
+        engine = await self.db.engine_for(user_id, read_only=not self.recent_writer(session))
+        async with engine.connect() as conn:
+            entry_count, newest = (await conn.execute(
+                select(func.count(MoodEntry.id), func.max(MoodEntry.created_at)).where(*in_window)
+            )).one()
+            newest_expired = (await conn.execute(select(func.max(MoodEntry.created_at)).where(
+                MoodEntry.user_id == user_id, MoodEntry.created_at < start_date
+            ))).scalar()
+            segment_count, newest_segment = (await conn.execute(
+                select(func.count(ArchiveSegment.id), func.max(ArchiveSegment.id)).where(*in_archive)
+            )).one()
+
+            last_modified = max(filter(None, [newest, newest_expired and newest_expired + timedelta(days=days)]),
+                                default=None)
+            etag = make_etag('mood-data', user_id, days, entry_count, newest,
+                             (segment_count, newest_segment, start_date.date() if segment_count else None))
+            # Weak like the Flask view's: both carry the same data, not necessarily the same bytes
+            validators = [(b'etag', f'W/"{etag}"'.encode()), (b'cache-control', b'private, no-cache'), (b'vary', b'Cookie')]
+            if last_modified:
+                validators.append((b'last-modified', http_date(as_utc(last_modified)).encode()))
+            if self.not_modified(scope, etag, last_modified):
+                return await send_response(send, 304, headers=validators)
+
+            hot = (await conn.execute(
+                select(MoodEntry.created_at, MoodEntry.mood_score, MoodEntry.ai_sentiment)
+                .where(*in_window).order_by(MoodEntry.created_at)
+            )).all()
+            segments = (await conn.execute(select(ArchiveSegment.payload).where(*in_archive))).all() \
+                if segment_count else []
+
+        entries = [(row.created_at, row.mood_score, row.ai_sentiment) for row in hot]
+        if segments:
+            # Decompressing archive segments is CPU work; keep it off the loop
+            archived = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: [entry for segment in segments for entry in decode_segment(segment, MoodEntry)])
+            entries = sorted(entries + [(entry.created_at, entry.mood_score, entry.ai_sentiment)
+                                        for entry in archived if entry.created_at >= start_date],
+                             key=lambda entry: entry[0])
+
+        data = [{'date': created_at.strftime('%Y-%m-%d'), 'mood_score': mood_score, 'sentiment': sentiment}
+                for created_at, mood_score, sentiment in entries]
+        body = (json.dumps(data, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        await send_response(send, 200, body, [(b'content-type', b'application/json')] + validators)
+
+    @staticmethod
+    def not_modified(scope, etag, last_modified):
+        headers = dict(scope.get('headers', []))
+        # If-None-Match wins over If-Modified-Since when both are sent
+        if b'if-none-match' in headers:
+            return parse_etags(headers[b'if-none-match'].decode('latin-1')).contains_weak(etag)
+        since = parse_date(headers.get(b'if-modified-since', b'').decode('latin-1') or None)
+        last_modified = as_utc(last_modified)
+        return bool(last_modified and since and last_modified <= since)
+
+
+def create_asgi_app(flask_app):
+    """Wrap a Flask app from create_app() for an ASGI server such as uvicorn"""
+    return AsgiApp(flask_app)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import mimetypes
+from flask import request, send_file, url_for, abort
+try:
+    import brotli
+except ImportError:
+    # Brotli variants are skipped when the library is not available
+    brotli = None
+
+# Build-time asset pipeline. `flask build-assets` copies every file under
+# static/ into static/dist/ with a content hash in its name, writes gzip and
+# brotli variants next to it, and records the mapping in a manifest. Templates
+# call asset_url('css/app.css') to get the fingerprinted URL, which can then
+# be cached by browsers and proxies forever.
+
+DIST_FOLDER = 'dist'
+MANIFEST_NAME = 'manifest.json'
+FAR_FUTURE = 365 * 24 * 60 * 60
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.txt', '.html', '.map', '.xml', '.ico'}
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def build_assets(static_folder):
+    """Fingerprint and precompress static files, returns the manifest"""
+    dist_folder = os.path.join(static_folder, DIST_FOLDER)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder) and DIST_FOLDER in dirs:
+            dirs.remove(DIST_FOLDER)
+        for name in files:
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(logical)
+            fingerprinted = f"{stem}.{_fingerprint(source)}{ext}"
+
+            target = os.path.join(dist_folder, fingerprinted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+
+            if ext.lower() in COMPRESSIBLE:
+                with open(source, 'rb') as f:
+                    data = f.read()
+                # mtime=0 keeps the gzip output byte-for-byte reproducible
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+
+            manifest[logical] = fingerprinted
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    logging.info(f"Built {len(manifest)} static assets into {dist_folder}")
+    return manifest
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_FOLDER, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def init_assets(app):
+    """Register asset_url(), the fingerprinted asset route and the build command"""
+    dist_folder = os.path.join(app.static_folder, DIST_FOLDER)
+    # In debug mode files change all the time, so always serve the live copies
+    manifest = {} if app.debug else load_manifest(app.static_folder)
+
+    def asset_url(filename):
+        fingerprinted = manifest.get(filename)
+        if fingerprinted:
+            return url_for('fingerprinted_asset', filename=fingerprinted)
+        return url_for('static', filename=filename)
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.route('/assets/<path:filename>', endpoint='fingerprinted_asset')
+    def fingerprinted_asset(filename):
+        path = os.path.realpath(os.path.join(dist_folder, filename))
+        if not path.startswith(os.path.realpath(dist_folder) + os.sep) or not os.path.isfile(path):
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        encoding = None
+        if accepted['br'] and os.path.isfile(path + '.br'):
+            encoding, path = 'br', path + '.br'
+        elif accepted['gzip'] and os.path.isfile(path + '.gz'):
+            encoding, path = 'gzip', path + '.gz'
+
+        response = send_file(path, mimetype=mimetype, max_age=FAR_FUTURE, conditional=True)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f'public, max-age={FAR_FUTURE}, immutable'
+        return response
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and precompress everything under static/"""
+        manifest.clear()
+        manifest.update(build_assets(app.static_folder))
+        print(f"Built {len(manifest)} assets into {dist_folder}")
+
+    return asset_url
@@ -0,0 +1,84 @@
+# Analyzer latency for long journal entries.
+#
+# Usage: python benchmarks/long_entry_inference.py [runs] [max_windows]
+#
+# Builds 5 KB to 50 KB entries from everyday journal sentences and times
+# sentiment plus emotion analysis three ways: truncated to the first 512-token
+# window (what the models saw before), every overlapping window, and windows
+# capped at max_windows. Needs transformers and torch; the first run of each
+# model downloads its weights.
+
+import os
+import sys
+import time
+import random
+import importlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ROOT))
+ai_analyzer = importlib.import_module(f'{os.path.basename(ROOT)}.ai_analyzer')
+
+SIZES_KB = [5, 10, 25, 50]
+
+SENTENCES = [
+    "Woke up early and actually felt rested for once.",
+    "Work was stressful again and the deadline keeps moving.",
+    "Had lunch with Sam and we laughed about the old apartment.",
+    "I keep replaying the argument from last night and it makes me anxious.",
+    "The walk by the river helped me clear my head.",
+    "I am grateful my sister called, even if it was only for ten minutes.",
+    "Felt lonely in the evening and scrolled my phone for far too long.",
+    "Therapy today was hard but I think we got somewhere.",
+    "Cooked a proper dinner instead of ordering food, small win.",
+    "I am tired of feeling like I have to hold everything together.",
+]
+
+
+def journal_entry(size_kb, rng):
+    sentences = []
+    length = 0
+    while length < size_kb * 1024:
+        sentences.append(rng.choice(SENTENCES))
+        length += len(sentences[-1]) + 1
+    return ' '.join(sentences)
+
+
+def percentile(samples, pct):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def time_analysis(analyzer, text, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        analyzer.analyze_sentiment(text)
+        analyzer.detect_emotions(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cap = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    analyzer = ai_analyzer.mood_analyzer
+    rng = random.Random(0)
+
+    # One untimed pass so lazy initialization does not land in the first size
+    analyzer.warm_up()
+    print(f"{runs} runs per size, sentiment + emotions, overlap {analyzer.window_overlap} tokens")
+    print(f"{'size':>6} {'windows':>8} {'truncated p50':>14} {'all windows p50':>16} "
+          f"{'capped at ' + str(cap) + ' p50':>18} {'p95':>8}")
+    for size_kb in SIZES_KB:
+        text = journal_entry(size_kb, rng)
+        row = {}
+        for label, max_windows in (('truncated', 1), ('all', 10 ** 6), ('capped', cap)):
+            analyzer.max_windows = max_windows
+            windows = len(analyzer._windows(analyzer.sentiment_analyzer, text))
+            row[label] = (windows, time_analysis(analyzer, text, runs))
+        print(f"{size_kb:>4} KB {row['all'][0]:>8} {percentile(row['truncated'][1], 50):>11.1f} ms "
+              f"{percentile(row['all'][1], 50):>13.1f} ms {percentile(row['capped'][1], 50):>15.1f} ms "
+              f"{percentile(row['capped'][1], 95):>5.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+# Concurrent write throughput: default SQLite settings vs the production profile.
+#
+# Usage: python benchmarks/sqlite_write_throughput.py [threads] [commits_per_thread]
+#
+# Each worker thread mimics a check-in request: it reads the user's latest
+# entry, inserts a new row and commits. The script reports commits per second
+# and how many transactions failed with "database is locked".
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from datetime import datetime
+from sqlalchemy import create_engine, Column, Integer, Float, Text, DateTime, select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlite_profile import sqlite_settings_from_env, sqlite_engine_options, install_sqlite_profile
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Entry(Base):
+    __tablename__ = 'entries'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    mood_score = Column(Float, nullable=False)
+    mood_text = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+def run(label, engine, threads, commits):
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    errors = []
+
+    def worker(user_id):
+        for i in range(commits):
+            session = Session()
+            try:
+                session.execute(select(func.max(Entry.created_at)).where(Entry.user_id == user_id)).scalar()
+                session.add(Entry(user_id=user_id, mood_score=0.5, mood_text='feeling okay today ' * 5))
+                session.commit()
+            except OperationalError as e:
+                session.rollback()
+                errors.append(str(e.orig))
+            finally:
+                session.close()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(func.count(Entry.id))).scalar()
+    print(f"{label:>9}: {stored:6d} commits in {elapsed:6.2f}s = {stored / elapsed:8.1f} commits/s, "
+          f"{len(errors)} failed")
+    engine.dispose()
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    commits = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{threads} threads x {commits} commits")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = create_engine(f"sqlite:///{os.path.join(tmp, 'baseline.db')}",
+                                 pool_recycle=300, pool_pre_ping=True)
+        run('baseline', baseline, threads, commits)
+
+        settings = sqlite_settings_from_env()
+        options = sqlite_engine_options(settings, {'pool_recycle': 300, 'pool_pre_ping': True})
+        profiled = create_engine(f"sqlite:///{os.path.join(tmp, 'profiled.db')}", **options)
+        install_sqlite_profile(profiled, settings)
+        run('profile', profiled, threads, commits)
+
+
+if __name__ == '__main__':
+    main()
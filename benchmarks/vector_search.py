@@ -0,0 +1,71 @@
+# Similar-entry search latency for one user's float16 vector index.
+#
+# Usage: python benchmarks/vector_search.py [vectors] [dim] [queries] [k]
+#
+# Fills a temporary index with random unit vectors, then reports the cost of
+# the first (cold) search that maps the file and finds each entry's newest
+# record, the p50/p95/max latency of warm top-k searches, and the cost of
+# appending one more vector from a save.
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_index import VectorIndex
+
+
+def fill(index, user_id, count, dim, rng):
+    """Write records in bulk; equivalent to `count` calls to add()"""
+    records = np.zeros(count, dtype=index.record_dtype(dim))
+    records['id'] = np.arange(1, count + 1)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    records['vector'] = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    os.makedirs(index.directory, exist_ok=True)
+    records.tofile(index._path(user_id, dim))
+
+
+def percentile(samples, pct):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+    queries = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    k = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(tmp)
+        fill(index, 1, count, dim, rng)
+        size = os.path.getsize(index._path(1, dim))
+        print(f"{count} vectors x {dim} dims, {size / 1024 / 1024:.1f} MiB on disk, top-{k}")
+
+        probes = rng.standard_normal((queries + 1, dim)).astype(np.float32)
+        start = time.perf_counter()
+        index.search(1, probes[0], k)
+        print(f"     cold: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        timings = []
+        for probe in probes[1:]:
+            start = time.perf_counter()
+            results = index.search(1, probe, k, exclude=[1])
+            timings.append((time.perf_counter() - start) * 1000)
+        assert len(results) == k
+        print(f"     warm: p50 {percentile(timings, 50):6.1f} ms, p95 {percentile(timings, 95):6.1f} ms, "
+              f"max {max(timings):6.1f} ms")
+
+        start = time.perf_counter()
+        index.add(1, count + 1, probes[0])
+        append_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        index.search(1, probes[1], k)
+        print(f"   append: {append_ms:8.2f} ms, next search (remaps) "
+              f"{(time.perf_counter() - start) * 1000:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, func
+
+# In-process publish/subscribe hub used to push live updates to connected
+# browsers over Server-Sent Events. Every subscriber owns a small bounded
+# buffer so one slow client can never hold up the request that publishes an
+# event; when a buffer overflows the oldest events are dropped and the client
+# is told to resynchronise instead.
+#
+# Each worker process has its own hub, so events are also relayed through the
+# broadcast_events table: publish() stores the event and delivers it locally,
+# and every process with open streams polls the table for events published by
+# the other processes. An alert raised in one worker thereby reaches triage
+# consoles connected to any worker within BROADCAST_POLL_SECONDS. Publishers
+# delete events older than BROADCAST_RETENTION_SECONDS (indexed by created_at)
+# about once a minute.
+
+class HubFull(Exception):
+    """Raised when a channel already has its maximum number of subscribers"""
+
+
+class Subscription:
+    __slots__ = ('hub', 'channel', 'buffer', 'ready', 'lagged', '_loop', '_async_ready')
+
+    def __init__(self, hub, channel, max_queue):
+        self.hub = hub
+        self.channel = channel
+        self.buffer = deque(maxlen=max_queue)
+        self.ready = threading.Event()
+        self.lagged = False
+        self._loop = None
+        self._async_ready = None
+
+    def push(self, message):
+        if len(self.buffer) == self.buffer.maxlen:
+            # Slow consumer: drop the oldest event and ask it to resync
+            self.lagged = True
+        self.buffer.append(message)
+        self.ready.set()
+        if self._async_ready is not None:
+            # Publishers run on worker threads; wake the listener on its own event loop
+            try:
+                self._loop.call_soon_threadsafe(self._async_ready.set)
+            except RuntimeError:
+                pass
+
+    def get(self, timeout=None):
+        """Wait for the next event, returns None on timeout"""
+        if not self.buffer and not self.ready.wait(timeout):
+            return None
+        self.ready.clear()
+        return self._next()
+
+    async def get_async(self, timeout=None):
+        """get() for listeners served from an event loop, without holding a thread"""
+        if self._async_ready is None:
+            self._loop = asyncio.get_running_loop()
+            self._async_ready = asyncio.Event()
+        if not self.buffer:
+            try:
+                await asyncio.wait_for(self._async_ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._async_ready.clear()
+        return self._next()
+
+    def _next(self):
+        if self.lagged:
+            self.lagged = False
+            self.buffer.clear()
+            return {'id': None, 'event': 'resync', 'data': {}}
+        try:
+            message = self.buffer.popleft()
+        except IndexError:
+            return None
+        if self.buffer:
+            self.ready.set()
+        return message
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class BroadcastHub:
+    def __init__(self, max_queue=100, max_subscribers=5000):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._sequence = {}
+        self.relay = None
+
+    def subscribe(self, channel):
+        """Register a new listener on a channel"""
+        if self.relay is not None:
+            self.relay.ensure_polling()
+        subscription = Subscription(self, channel, self.max_queue)
+        with self._lock:
+            listeners = self._subscribers.setdefault(channel, set())
+            if len(listeners) >= self.max_subscribers:
+                raise HubFull(channel)
+            listeners.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a listener, safe to call more than once"""
+        with self._lock:
+            listeners = self._subscribers.get(subscription.channel)
+            if listeners:
+                listeners.discard(subscription)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def publish(self, channel, event, data):
+        """Send an event to every listener on a channel, in this process and the others"""
+        if self.relay is not None:
+            self.relay.send(channel, event, data)
+        return self._deliver(channel, event, data)
+
+    def _deliver(self, channel, event, data):
+        """Send an event to this process's listeners"""
+        with self._lock:
+            event_id = self._sequence.get(channel, 0) + 1
+            self._sequence[channel] = event_id
+            listeners = list(self._subscribers.get(channel, ()))
+
+        message = {'id': event_id, 'event': event, 'data': data}
+        for subscription in listeners:
+            subscription.push(message)
+        return event_id
+
+
+class StreamSlots:
+    """Counts live streams that each hold a server thread, refusing new ones past a limit"""
+
+    def __init__(self, limit=2):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.limit > 0 and self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+
+def format_sse(message):
+    """Serialize a hub message into the text/event-stream wire format"""
+    if message is None:
+        # Comment lines keep idle connections (and proxies) alive
+        return ": keep-alive\n\n"
+    frame = f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+    if message['id'] is not None:
+        frame = f"id: {message['id']}\n" + frame
+    return frame
+
+
+def sse_stream(subscription, heartbeat=15.0, initial=None):
+    """Generator yielding SSE frames until the client disconnects"""
+    try:
+        # Flush headers straight away and tell browsers how fast to reconnect
+        yield "retry: 3000\n\n"
+        for message in initial or []:
+            yield format_sse(message)
+        while True:
+            yield format_sse(subscription.get(timeout=heartbeat))
+    finally:
+        subscription.close()
+
+
+async def sse_stream_async(subscription, heartbeat=15.0, initial=None):
+    """Async generator counterpart of sse_stream for the ASGI server"""
+    try:
+        yield "retry: 3000\n\n"
+        for message in initial or []:
+            yield format_sse(message)
+        while True:
+            yield format_sse(await subscription.get_async(timeout=heartbeat))
+    finally:
+        subscription.close()
+
+
+# How often a publishing process deletes relayed events past their retention
+PRUNE_INTERVAL_SECONDS = 60
+
+
+class EventRelay:
+    """Carries hub events between worker processes through a database table"""
+
+    def __init__(self, hub, engine, table, poll_seconds=0.5, retention_seconds=300):
+        self.hub = hub
+        self.engine = engine
+        self.table = table
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._next_prune = 0.0
+
+    @staticmethod
+    def origin():
+        # Evaluated per call: a forked worker must not pass for its master
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def send(self, channel, event, data):
+        now = datetime.utcnow()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(self.table).values(origin=self.origin(), channel=channel, event=event,
+                                                       data=json.dumps(data), created_at=now))
+                # Publishers prune, so the table stays bounded even when no process has a stream open
+                if time.monotonic() >= self._next_prune:
+                    self._next_prune = time.monotonic() + min(self.retention_seconds, PRUNE_INTERVAL_SECONDS)
+                    conn.execute(delete(self.table).where(
+                        self.table.c.created_at < now - timedelta(seconds=self.retention_seconds)))
+        except Exception as e:
+            # Local listeners still get the event
+            logging.error(f"Could not relay '{event}' on '{channel}' to other workers: {e}")
+
+    def ensure_polling(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                with self.engine.connect() as conn:
+                    # Only events published from now on; streams load their initial state themselves
+                    last_id = conn.execute(select(func.max(self.table.c.id))).scalar() or 0
+                self._thread = threading.Thread(target=self._poll, args=(last_id,), name='broadcast-relay', daemon=True)
+                self._thread.start()
+
+    def _poll(self, last_id):
+        stopped = threading.Event()
+        origin = self.origin()
+        while not stopped.wait(self.poll_seconds):
+            try:
+                with self.engine.connect() as conn:
+                    rows = conn.execute(select(self.table).where(self.table.c.id > last_id)
+                                        .order_by(self.table.c.id)).mappings().all()
+                for row in rows:
+                    last_id = row['id']
+                    if row['origin'] != origin:
+                        self.hub._deliver(row['channel'], row['event'], json.loads(row['data']))
+            except Exception:
+                logging.exception("Broadcast relay poll failed")
+
+
+# Global hub instance
+hub = BroadcastHub()
+
+# Streams served by Flask hold a worker thread each (the ASGI app serves them without one)
+thread_streams = StreamSlots()
+
+
+def init_broadcast(app, engine):
+    from .models import BroadcastEvent
+    hub.max_queue = app.config.get('SSE_MAX_QUEUE', hub.max_queue)
+    hub.max_subscribers = app.config.get('SSE_MAX_SUBSCRIBERS', hub.max_subscribers)
+    thread_streams.limit = app.config.get('SSE_MAX_THREAD_STREAMS', thread_streams.limit)
+    if app.config.get('BROADCAST_RELAY', True):
+        hub.relay = EventRelay(hub, engine, BroadcastEvent.__table__,
+                               app.config.get('BROADCAST_POLL_SECONDS', 0.5),
+                               app.config.get('BROADCAST_RETENTION_SECONDS', 300))
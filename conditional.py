@@ -0,0 +1,45 @@
+import hashlib
+from datetime import timezone
+from flask import request, Response
+
+# Helpers for conditional GET. Views compute a cheap validator (an ETag and
+# optionally a Last-Modified time) before doing any real work and return
+# 304 Not Modified straight away when the client's copy is still current.
+
+def make_etag(*parts):
+    """Build a short, stable ETag from the values that define a response"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+
+def as_utc(value):
+    """A database timestamp as an aware UTC datetime at HTTP-date precision"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def is_not_modified(etag, last_modified=None):
+    """Check the request's validators against the current ones"""
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    last_modified = as_utc(last_modified)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+def set_validators(response, etag, last_modified=None, weak=False):
+    """Attach validators and make clients revalidate on every use"""
+    # Weak when the same data can be served with different bytes (see asgi.py)
+    response.set_etag(etag, weak=weak)
+    if last_modified:
+        response.last_modified = as_utc(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+def not_modified(etag, last_modified=None, weak=False):
+    """Empty 304 response carrying the current validators"""
+    return set_validators(Response(status=304), etag, last_modified, weak)
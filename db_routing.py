@@ -0,0 +1,133 @@
+import time
+import random
+import logging
+import threading
+from functools import wraps
+from flask import current_app, request, session as flask_session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, inspect, text
+from .sharding import SHARDED_TABLES, get_router, routed_user_id
+
+# Read/write splitting across a primary database and read replicas.
+#
+# Views wrapped in @use_replica send their SELECTs to a replica engine from
+# DATABASE_REPLICA_URLS. Flushes and everything outside those views stay on
+# the primary. After a user commits a write, their requests keep reading from
+# the primary for REPLICA_MAX_LAG_SECONDS so they always see their own data.
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Per-user tables always go to the owning user's shard
+        if bind is None and mapper is not None:
+            router = get_router()
+            if router is not None and inspect(mapper).local_table.name in SHARDED_TABLES:
+                user_id = routed_user_id(self)
+                if self._flushing or getattr(clause, 'is_dml', False):
+                    # Refused while the user's rows are being moved to another shard
+                    router.check_writable(user_id)
+                return router.engine_for(user_id)
+
+        if bind is None and not self._flushing and self.info.get('use_replica'):
+            replica = self._pick_replica(mapper)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _pick_replica(self, mapper):
+        # Only tables on the default bind have replicas
+        if mapper is not None and inspect(mapper).local_table.metadata.info.get('bind_key') is not None:
+            return None
+        if 'replica' not in self.info:
+            # Stick to one replica for the whole request
+            healthy = [r for r in current_app.extensions.get('db_replicas', []) if r.is_healthy()]
+            self.info['replica'] = random.choice(healthy).engine if healthy else None
+        return self.info['replica']
+
+
+class Replica:
+    def __init__(self, engine, max_lag, check_interval):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = 0.0
+        self._healthy = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def measure_lag(self):
+        """Replication delay in seconds, 0 for engines that cannot report it"""
+        if self.engine.dialect.name != 'postgresql':
+            return 0.0
+        with self.engine.connect() as conn:
+            return float(conn.execute(text(
+                "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+            )).scalar() or 0.0)
+
+    @property
+    def last_known_healthy(self):
+        """Result of the most recent lag check, without running a new one"""
+        return self._healthy
+
+    def is_healthy(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._checked_at = now
+                self.lag = self.measure_lag()
+                self._healthy = self.lag <= self.max_lag
+                if not self._healthy:
+                    logging.warning(f"Replica {self.engine.url.render_as_string()} is {self.lag:.1f}s behind, skipping it")
+            except Exception as e:
+                logging.error(f"Replica {self.engine.url.render_as_string()} is unreachable: {e}")
+                self._healthy = False
+            finally:
+                self._lock.release()
+        return self._healthy
+
+
+def init_replicas(app, engine_options_for, on_engine_created=None):
+    """Create engines for every replica URL in SQLALCHEMY_REPLICA_URIS"""
+    replicas = []
+    for url in app.config.get('SQLALCHEMY_REPLICA_URIS', []):
+        engine = create_engine(url, **engine_options_for(url))
+        if on_engine_created:
+            on_engine_created(engine)
+        replicas.append(Replica(engine,
+                                max_lag=app.config.get('REPLICA_MAX_LAG_SECONDS', 5.0),
+                                check_interval=app.config.get('REPLICA_LAG_CHECK_SECONDS', 5.0)))
+    app.extensions['db_replicas'] = replicas
+    if replicas:
+        logging.info(f"Routing read-only views across {len(replicas)} replica(s)")
+    return replicas
+
+
+def _recent_writer():
+    last_write = flask_session.get('_last_write_at')
+    return last_write is not None and time.time() - last_write < current_app.config.get('REPLICA_MAX_LAG_SECONDS', 5.0)
+
+
+def use_replica(view):
+    """Serve a read-only view from a replica unless the user just wrote something"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and not _recent_writer():
+            current_app.extensions['sqlalchemy'].session.info['use_replica'] = True
+        return view(*args, **kwargs)
+    return wrapped
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    # Pin this user to the primary for a while so they read their own writes
+    if session.info.pop('wrote', False) and has_request_context():
+        flask_session['_last_write_at'] = time.time()
@@ -0,0 +1,105 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from . import db
+from .models import JournalEntry
+from .sharding import using_shard
+
+# Background indexing of journal embeddings.
+#
+# Saving or editing a journal entry only queues its (user id, entry id); a
+# worker thread loads the entry, runs the encoder and appends the embedding to
+# the owner's vector index, so the request never waits on the model. An entry
+# edited again before it was indexed is queued once. The queue is in memory:
+# entries left in it by a process that exits are missing from similar-entry
+# results until `flask embed-journals` indexes them, and the similar-entry view
+# itself never embeds. An entry renumbered by a shard move in the meantime is
+# skipped for the same reason.
+
+
+class EmbeddingWorker:
+    def __init__(self, max_pending=10000, linger=0.05):
+        self.max_pending = max_pending
+        self.linger = linger
+        self.app = None
+        self.index_entry = None
+        self.indexed = 0
+        self.dropped = 0
+        self._pending = OrderedDict()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app, index_entry):
+        self.app = app
+        self.index_entry = index_entry
+        self.max_pending = app.config.get('EMBEDDING_MAX_PENDING', self.max_pending)
+
+    def enqueue(self, entry):
+        """Queue a saved journal entry for (re-)indexing"""
+        with self._lock:
+            key = (entry.user_id, entry.id)
+            self._pending.pop(key, None)
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[key] = True
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """Run the worker thread in this process, if it is not running yet"""
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='journal-embeddings', daemon=True)
+                self._thread.start()
+
+    def _take(self):
+        with self._lock:
+            if not self._pending:
+                return None
+            return self._pending.popitem(last=False)[0]
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.linger)
+            self._wake.clear()
+            with self.app.app_context():
+                while True:
+                    key = self._take()
+                    if key is None:
+                        break
+                    try:
+                        self.index_pending(*key)
+                    except Exception:
+                        logging.exception(f"Indexing journal entry {key[1]} failed")
+                        db.session.rollback()
+
+    def index_pending(self, user_id, entry_id):
+        """Embed and index one queued entry, if it still exists"""
+        with using_shard(db.session, user_id):
+            entry = db.session.get(JournalEntry, entry_id)
+            if entry is None or entry.user_id != user_id:
+                return False
+            indexed = self.index_entry(entry)
+        db.session.rollback()
+        self.indexed += bool(indexed)
+        return indexed
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {'indexed': self.indexed, 'pending': pending, 'dropped': self.dropped}
+
+
+# Global worker, wired up by the routes
+embedding_worker = EmbeddingWorker()
\ No newline at end of file
@@ -0,0 +1,157 @@
+import sys
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from flask import g, has_app_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+from sqlalchemy import select, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+from .models import UserDataVersion
+from .sharding import using_shard
+
+# Fragment caching for per-user template widgets.
+#
+#   {% cache 'recent_journals', current_user.id %}
+#       ... expensive markup ...
+#   {% endcache %}
+#
+# Each fragment is keyed by template, fragment name, user id, that user's
+# data version and the current UTC day. The day is there because widgets such
+# as the dashboard's 7-day trend depend on today's date as well as the data,
+# so they are re-rendered after midnight. The version is bumped in the same transaction as any change
+# to a MoodEntry/JournalEntry row (by the change listeners in sync.py, which
+# also stamp the change in the delta-sync log with it), so a stale fragment is
+# simply never looked up again and ages out of the LRU.
+
+class LRUCache:
+    def __init__(self, max_entries=10000, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, cost = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        cost = sys.getsizeof(value)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self.size -= self._data.pop(key)[1]
+            self._data[key] = (value, cost)
+            self.size += cost
+            # Evict least recently used fragments until back within both limits
+            while len(self._data) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_cost) = self._data.popitem(last=False)
+                self.size -= evicted_cost
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self.size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+# Global fragment store
+fragment_cache = LRUCache()
+
+
+def get_data_version(user_id):
+    """Current data version for a user, looked up at most once per request"""
+    versions = g.setdefault('_data_versions', {})
+    if user_id not in versions:
+        with using_shard(db.session, user_id):
+            versions[user_id] = db.session.execute(
+                select(UserDataVersion.version).where(UserDataVersion.user_id == user_id)
+            ).scalar() or 0
+    return versions[user_id]
+
+
+def bump_data_version(connection, user_id):
+    """Increment a user's data version inside the current transaction and return it"""
+    table = UserDataVersion.__table__
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = dialect_insert(table).values(user_id=user_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={'version': table.c.version + 1}
+        )
+        version = connection.execute(stmt.returning(table.c.version)).scalar()
+    else:
+        result = connection.execute(
+            update(table).where(table.c.user_id == user_id).values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(user_id=user_id, version=1))
+        version = connection.execute(select(table.c.version).where(table.c.user_id == user_id)).scalar()
+
+    if has_app_context():
+        g.pop('_data_versions', None)
+    return version
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        # {% cache name, user_id[, extra key parts...] %}
+        args = [nodes.Const(parser.name), parser.parse_expression()]
+        parser.stream.expect('comma')
+        args.append(parser.parse_expression())
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render_cached', args), [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, template_name, name, user_id, *extra, caller):
+        key = (template_name, name, user_id, get_data_version(user_id), datetime.utcnow().date()) + extra
+        rendered = fragment_cache.get(key)
+        if rendered is None:
+            rendered = caller()
+            fragment_cache.set(key, rendered)
+        return rendered
+
+
+def init_fragment_cache(app):
+    """Size the fragment store and enable the {% cache %} tag"""
+    fragment_cache.max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', fragment_cache.max_entries)
+    fragment_cache.max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', fragment_cache.max_bytes)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    logging.info(f"Fragment cache enabled ({fragment_cache.max_entries} entries, {fragment_cache.max_bytes} bytes)")
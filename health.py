@@ -0,0 +1,50 @@
+import os
+import sys
+import logging
+from sqlalchemy import text
+
+from . import db
+from .sharding import get_router
+
+# Helpers for the /healthz and /readyz probes. Liveness only says the process
+# answers; readiness also needs warmed-up analyzer models and reachable
+# databases, so orchestrators keep traffic away from a worker until its first
+# real check-in would be served at normal speed.
+
+
+def process_memory():
+    """Current and peak resident memory of this process in MiB"""
+    memory = {}
+    try:
+        with open('/proc/self/statm') as statm:
+            memory['rss_mb'] = round(int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        memory['peak_rss_mb'] = round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        pass
+    return memory
+
+
+def _ping(engine):
+    try:
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        return 'ok'
+    except Exception as e:
+        logging.error(f"Readiness check failed for {engine.url.render_as_string()}: {e}")
+        return 'error'
+
+
+def database_status():
+    """'ok' or 'error' for the primary database and every shard"""
+    status = {'primary': _ping(db.engine)}
+    router = get_router()
+    if router is not None:
+        for index, engine in enumerate(router.engines):
+            status[f'shard_{index}'] = _ping(engine)
+    return status
\ No newline at end of file
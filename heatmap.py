@@ -0,0 +1,240 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, select, update, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+from .models import MoodEntry, MoodAggregate, MoodAggregateMember
+from .db_routing import RoutingSession
+from .sharding import shard_sessions
+
+# Community mood heatmap.
+#
+# Every check-in adds itself to an hourly row of mood_aggregates (entry and
+# distinct user counts, score sum, sentiment histogram) in the same flush as
+# the MoodEntry insert. The heatmap endpoint never touches mood_entries: it
+# reads at most 24 rows per day from the aggregate table, keeps the finished
+# payload in memory for HEATMAP_REFRESH_SECONDS, and drops every hour with
+# fewer than HEATMAP_MIN_USERS distinct people before anything leaves the
+# server. A background job in each process rebuilds the cached payloads every
+# HEATMAP_REFRESH_SECONDS and prunes member rows of closed hours, so the
+# endpoint itself never writes.
+#
+# Distinct users are counted through mood_aggregate_members, which only keeps
+# the last MEMBER_RETENTION of hours. A check-in dated earlier than that (an
+# offline client's backlog, or a forged timestamp) could no longer be matched
+# against its hour's members and would count as one more person, so it is left
+# out of the live aggregates; `flask rebuild-heatmap` counts it exactly.
+
+SENTIMENT_COLUMNS = {
+    'positive': 'positive_count',
+    'neutral': 'neutral_count',
+    'negative': 'negative_count',
+}
+
+# Member rows are only needed while an hour can still receive check-ins
+MEMBER_RETENTION = timedelta(hours=2)
+
+
+def bucket_for(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _insert_for(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert
+    if dialect == 'postgresql':
+        return postgresql.insert
+    return None
+
+
+def record_checkin(connection, user_id, mood_score, sentiment, created_at=None):
+    """Add one check-in to its hour's aggregate row"""
+    bucket = bucket_for(created_at or datetime.utcnow())
+    if bucket < bucket_for(datetime.utcnow()) - MEMBER_RETENTION:
+        return
+    members, aggregates = MoodAggregateMember.__table__, MoodAggregate.__table__
+    dialect_insert = _insert_for(connection)
+
+    # Only a user's first check-in in an hour raises the distinct user count
+    if dialect_insert is not None:
+        new_member = connection.execute(
+            dialect_insert(members).values(bucket_start=bucket, user_id=user_id).on_conflict_do_nothing()
+        ).rowcount == 1
+    else:
+        new_member = connection.execute(select(members.c.user_id).where(
+            members.c.bucket_start == bucket, members.c.user_id == user_id
+        )).first() is None
+        if new_member:
+            connection.execute(insert(members).values(bucket_start=bucket, user_id=user_id))
+
+    sentiment_column = SENTIMENT_COLUMNS.get((sentiment or '').lower(), 'unlabeled_count')
+    increments = {
+        'entry_count': 1,
+        'user_count': 1 if new_member else 0,
+        'score_sum': mood_score or 0.0,
+        sentiment_column: 1,
+    }
+    if dialect_insert is not None:
+        stmt = dialect_insert(aggregates).values(bucket_start=bucket, **increments)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[aggregates.c.bucket_start],
+            set_={name: aggregates.c[name] + value for name, value in increments.items()}
+        ))
+    else:
+        result = connection.execute(update(aggregates).where(aggregates.c.bucket_start == bucket).values(
+            **{name: aggregates.c[name] + value for name, value in increments.items()}
+        ))
+        if result.rowcount == 0:
+            connection.execute(insert(aggregates).values(bucket_start=bucket, **increments))
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _aggregate_checkins(session, flush_context):
+    checkins = [obj for obj in session.new if isinstance(obj, MoodEntry)]
+    if not checkins:
+        return
+    # Aggregates live on the primary even when entries are sharded
+    connection = session.connection(bind_arguments={'mapper': MoodAggregate})
+    for entry in checkins:
+        record_checkin(connection, entry.user_id, entry.mood_score, entry.ai_sentiment, entry.created_at)
+
+
+class HeatmapCache:
+    def __init__(self, refresh_seconds=60.0, min_users=5):
+        self.refresh_seconds = refresh_seconds
+        self.min_users = min_users
+        self.app = None
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def get(self, days):
+        self._ensure_refreshing()
+        now = time.monotonic()
+        cached = self._payloads.get(days)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        payload = self._build(days)
+        with self._lock:
+            self._payloads[days] = (now + self.refresh_seconds, payload)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+
+    def _build(self, days):
+        start = bucket_for(datetime.utcnow()) - timedelta(days=days) + timedelta(hours=1)
+        rows = db.session.execute(
+            select(MoodAggregate).where(MoodAggregate.bucket_start >= start).order_by(MoodAggregate.bucket_start)
+        ).scalars().all()
+
+        cells = []
+        for row in rows:
+            # k-anonymity: hours with too few people are left out entirely
+            if row.user_count < self.min_users:
+                continue
+            cells.append({
+                'hour': row.bucket_start.strftime('%Y-%m-%dT%H:00Z'),
+                'entries': row.entry_count,
+                'avg_score': round(row.score_sum / row.entry_count, 3),
+                'sentiment': {
+                    'positive': row.positive_count,
+                    'neutral': row.neutral_count,
+                    'negative': row.negative_count,
+                    'unlabeled': row.unlabeled_count,
+                },
+            })
+
+        return {
+            'start': start.strftime('%Y-%m-%dT%H:00Z'),
+            'days': days,
+            'min_users': self.min_users,
+            'cells': cells,
+        }
+
+    def _ensure_refreshing(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self.app is None or (self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._refresh, name='heatmap-refresh', daemon=True)
+                self._thread.start()
+
+    def _refresh(self):
+        stopped = threading.Event()
+        while not stopped.wait(self.refresh_seconds):
+            with self.app.app_context():
+                try:
+                    self._prune_members()
+                    for days in list(self._payloads):
+                        payload = self._build(days)
+                        with self._lock:
+                            self._payloads[days] = (time.monotonic() + self.refresh_seconds, payload)
+                except Exception:
+                    logging.exception("Mood heatmap refresh failed")
+
+    def _prune_members(self):
+        cutoff = bucket_for(datetime.utcnow()) - MEMBER_RETENTION
+        with db.engine.begin() as connection:
+            connection.execute(delete(MoodAggregateMember.__table__).where(
+                MoodAggregateMember.__table__.c.bucket_start < cutoff
+            ))
+
+
+# Global heatmap payload cache
+heatmap_cache = HeatmapCache()
+
+
+def rebuild_aggregates(app):
+    """Recompute every hourly aggregate from the stored check-ins"""
+    totals = defaultdict(lambda: {'entry_count': 0, 'score_sum': 0.0, 'users': set(),
+                                  'positive_count': 0, 'neutral_count': 0,
+                                  'negative_count': 0, 'unlabeled_count': 0})
+    with app.app_context():
+        for shard, session in shard_sessions(db):
+            table = MoodEntry.__table__
+            rows = session.execute(select(table.c.user_id, table.c.mood_score,
+                                          table.c.ai_sentiment, table.c.created_at)
+                                   .where(table.c.created_at.is_not(None)))
+            for user_id, mood_score, sentiment, created_at in rows:
+                bucket = totals[bucket_for(created_at)]
+                bucket['entry_count'] += 1
+                bucket['score_sum'] += mood_score or 0.0
+                bucket['users'].add(user_id)
+                bucket[SENTIMENT_COLUMNS.get((sentiment or '').lower(), 'unlabeled_count')] += 1
+            if shard is not None:
+                session.close()
+
+        recent = bucket_for(datetime.utcnow()) - MEMBER_RETENTION
+        with db.engine.begin() as connection:
+            connection.execute(delete(MoodAggregate.__table__))
+            connection.execute(delete(MoodAggregateMember.__table__))
+            for bucket_start, values in totals.items():
+                users = values.pop('users')
+                connection.execute(insert(MoodAggregate.__table__).values(
+                    bucket_start=bucket_start, user_count=len(users), **values
+                ))
+                if bucket_start >= recent:
+                    connection.execute(insert(MoodAggregateMember.__table__), [
+                        {'bucket_start': bucket_start, 'user_id': user_id} for user_id in users
+                    ])
+        heatmap_cache.clear()
+
+    logging.info(f"Rebuilt mood heatmap aggregates for {len(totals)} hours")
+    return len(totals)
+
+
+def init_heatmap(app):
+    heatmap_cache.app = app
+    heatmap_cache.refresh_seconds = app.config.get('HEATMAP_REFRESH_SECONDS', heatmap_cache.refresh_seconds)
+    heatmap_cache.min_users = app.config.get('HEATMAP_MIN_USERS', heatmap_cache.min_users)
\ No newline at end of file
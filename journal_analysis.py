@@ -0,0 +1,166 @@
+import re
+import json
+import hashlib
+from sqlalchemy import delete
+
+from . import db
+from .models import JournalSentence
+from .ai_analyzer import mood_analyzer
+
+# Passage-level analysis of journal entries.
+#
+# An entry is split into sentences, and runs of consecutive sentences are
+# grouped into passages of up to PASSAGE_CHARS, well inside one model window,
+# so the models see sentences in context. A passage ends after a sentence whose
+# hash picks it as a boundary (about every BOUNDARY_EVERY sentences), so an edit
+# only regroups the passage it touches. Passage results are stored in
+# journal_sentences keyed by a hash of the passage. When the entry is edited
+# only passages whose hash is not already stored for it go through the models
+# (one batched call per model), and the entry's sentiment score and emotions
+# are recomputed from the passage results, weighted by length. Every new
+# passage is classified, so the scores always cover the whole entry; the
+# analyzer sorts them by length before batching, so a long entry's passages
+# share batches with little padding. Crisis keywords are matched against the
+# whole text, which costs no model time.
+#
+# analyze_journal() only reads, so the model calls run outside any write
+# transaction; save_sentences() then stores the results next to the entry.
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\s*\n\s*')
+
+# About 400 tokens of English prose, so a passage fits one 512-token window
+PASSAGE_CHARS = 1600
+BOUNDARY_EVERY = 12
+
+
+def split_sentences(text):
+    """Sentences of a text, with run-ons longer than a passage cut at word boundaries"""
+    sentences = []
+    for sentence in _SENTENCE_BREAK.split(text or ''):
+        sentence = sentence.strip()
+        while len(sentence) > PASSAGE_CHARS:
+            cut = sentence.rfind(' ', 0, PASSAGE_CHARS)
+            cut = cut if cut > 0 else PASSAGE_CHARS
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def split_passages(text):
+    """Consecutive sentences grouped into passages of at most PASSAGE_CHARS"""
+    passages = []
+    current = []
+    length = 0
+    for sentence in split_sentences(text):
+        if current and length + 1 + len(sentence) > PASSAGE_CHARS:
+            passages.append(' '.join(current))
+            current, length = [], 0
+        current.append(sentence)
+        length += len(sentence) + (1 if length else 0)
+        if int(sentence_hash(sentence)[:8], 16) % BOUNDARY_EVERY == 0:
+            passages.append(' '.join(current))
+            current, length = [], 0
+    if current:
+        passages.append(' '.join(current))
+    return passages
+
+
+def sentence_hash(sentence):
+    return hashlib.sha1(' '.join(sentence.split()).encode('utf-8')).hexdigest()
+
+
+def cached_sentences(entry):
+    """Stored passage results of a saved entry by content hash"""
+    if entry is None or entry.id is None:
+        return {}
+    rows = JournalSentence.query.filter(JournalSentence.user_id == entry.user_id,
+                                        JournalSentence.journal_entry_id == entry.id)
+    return {row.content_hash: {
+        'hash': row.content_hash,
+        'score': row.sentiment_score or 0.0,
+        'detailed_scores': json.loads(row.sentiment_scores or '{}'),
+        'emotions': json.loads(row.emotions or '[]')
+    } for row in rows}
+
+
+def analyze_journal(content, entry=None):
+    """Entry-level analysis built from per-passage results, re-running the models only for new passages"""
+    passages = split_passages(content)
+    hashes = [sentence_hash(passage) for passage in passages]
+    known = cached_sentences(entry)
+
+    # Repeated passages are analyzed once; each fits one window, batched by length in _classify
+    missing = {digest: passage for digest, passage in zip(hashes, passages) if digest not in known}
+    texts = list(missing.values())
+    if texts:
+        sentiments = mood_analyzer.analyze_sentiment_batch(texts)
+        emotions = mood_analyzer.detect_emotions_batch(texts)
+        for digest, sentiment, sentence_emotions in zip(missing, sentiments, emotions):
+            known[digest] = {
+                'hash': digest,
+                'score': sentiment['score'],
+                'detailed_scores': sentiment['detailed_scores'],
+                'emotions': sentence_emotions
+            }
+
+    results = [dict(known[digest], length=len(passage), position=position)
+               for position, (digest, passage) in enumerate(zip(hashes, passages))]
+    analysis = summarize(results)
+    lexicon = mood_analyzer.lexicons.current
+    is_emergency, emergency_keywords = mood_analyzer.check_emergency_keywords(content, lexicon)
+    analysis.update({
+        'is_emergency': is_emergency,
+        'emergency_keywords': emergency_keywords,
+        'lexicon_version': lexicon.version,
+        'passages': len(passages),
+        'reanalyzed': len(texts)
+    })
+    return analysis, results
+
+
+def summarize(results):
+    """Length-weighted sentiment and emotions of a whole entry"""
+    total = sum(result['length'] for result in results)
+    if not total:
+        return {'sentiment': 'neutral', 'confidence': 0.0, 'mood_score': 0.0, 'detailed_scores': {}, 'emotions': []}
+
+    score = sum(result['score'] * result['length'] for result in results) / total
+    detailed_scores = {}
+    emotion_scores = {}
+    for result in results:
+        weight = result['length'] / total
+        for label, value in result['detailed_scores'].items():
+            detailed_scores[label] = detailed_scores.get(label, 0.0) + value * weight
+        for emotion in result['emotions']:
+            emotion_scores[emotion['emotion']] = emotion_scores.get(emotion['emotion'], 0.0) + emotion['confidence'] * weight
+
+    sentiment, confidence = max(detailed_scores.items(), key=lambda x: x[1]) if detailed_scores else ('neutral', 0.0)
+    emotions = [{'emotion': emotion, 'confidence': value}
+                for emotion, value in sorted(emotion_scores.items(), key=lambda x: x[1], reverse=True)[:3]]
+    return {
+        'sentiment': sentiment,
+        'confidence': confidence,
+        'mood_score': score,
+        'detailed_scores': detailed_scores,
+        'emotions': emotions
+    }
+
+
+def save_sentences(entry, results):
+    """Replace an entry's stored passage results; call inside the transaction that saves the entry"""
+    if entry.id is None:
+        db.session.flush()
+    db.session.execute(delete(JournalSentence).where(JournalSentence.user_id == entry.user_id,
+                                                     JournalSentence.journal_entry_id == entry.id))
+    db.session.add_all(JournalSentence(
+        user_id=entry.user_id,
+        journal_entry_id=entry.id,
+        position=result['position'],
+        content_hash=result['hash'],
+        length=result['length'],
+        sentiment_score=result['score'],
+        sentiment_scores=json.dumps(result['detailed_scores']),
+        emotions=json.dumps(result['emotions'])
+    ) for result in results)
\ No newline at end of file
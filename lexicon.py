@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import logging
+import threading
+
+# Keyword lexicons for the mood analyzers.
+#
+# Crisis phrases, sentiment words and the emotion keyword map live in a JSON
+# data file carrying its own "version". Each process compiles the file into an
+# immutable Lexicon (frozensets for word lookups, one regex for the crisis
+# phrases) on a background thread and swaps it in with a single reference
+# assignment, so an analysis never sees half of an old and half of a new
+# lexicon. Every worker watches the same file, so publishing a new version is
+#
+#     cp new.json lexicons/mood.json.tmp && mv lexicons/mood.json.tmp lexicons/mood.json
+#
+# and all workers pick it up within LEXICON_RELOAD_SECONDS, without a restart
+# and without reloading the models. A file that does not parse or validate is
+# logged and the previous lexicon stays active; that includes a file whose
+# "emergency" list is missing or empty.
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons', 'mood.json')
+
+
+class LexiconError(ValueError):
+    pass
+
+
+def _words(data, key, required=False):
+    words = data.get(key, [])
+    if not isinstance(words, list) or not all(isinstance(word, str) and word.strip() for word in words):
+        raise LexiconError(f"'{key}' must be a list of non-empty strings")
+    if required and not words:
+        raise LexiconError(f"'{key}' must not be empty")
+    return [word.strip().lower() for word in words]
+
+
+class Lexicon:
+    """One compiled, read-only version of the lexicon file"""
+
+    def __init__(self, version, emergency, positive, negative, emotions):
+        self.version = version
+        # Kept in file order, which is the order matches are reported in
+        self.emergency_keywords = tuple(dict.fromkeys(emergency))
+        self.positive_keywords = frozenset(positive)
+        self.negative_keywords = frozenset(negative)
+        self.emotion_keywords = {emotion: frozenset(words) for emotion, words in emotions.items()}
+        # One pass over the text rules out the common case of no crisis phrase at all
+        alternatives = sorted(self.emergency_keywords, key=len, reverse=True)
+        self._emergency_pattern = re.compile('|'.join(map(re.escape, alternatives))) if alternatives else None
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise LexiconError("the lexicon must be a JSON object")
+        version = data.get('version')
+        if not isinstance(version, (str, int)) or isinstance(version, bool) or str(version) == '':
+            raise LexiconError("'version' must be a non-empty string or number")
+        emotions = data.get('emotions', {})
+        if not isinstance(emotions, dict):
+            raise LexiconError("'emotions' must map emotion names to keyword lists")
+        # A lexicon without crisis phrases would silently switch off emergency detection
+        return cls(str(version), _words(data, 'emergency', required=True), _words(data, 'positive'), _words(data, 'negative'),
+                   {emotion: _words(emotions, emotion) for emotion in emotions})
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as source:
+            try:
+                data = json.load(source)
+            except ValueError as e:
+                raise LexiconError(f"not valid JSON: {e}")
+        return cls.from_dict(data)
+
+    def emergency_matches(self, text):
+        """Crisis phrases contained in the text, in lexicon order"""
+        if not text or self._emergency_pattern is None:
+            return []
+        text_lower = text.lower()
+        if not self._emergency_pattern.search(text_lower):
+            return []
+        # Phrases can overlap ('kill me', 'kill myself'), so report each one the regex could have hidden
+        return [keyword for keyword in self.emergency_keywords if keyword in text_lower]
+
+
+class LexiconStore:
+    def __init__(self, path=DEFAULT_PATH, reload_seconds=5.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.reloads = 0
+        self.last_error = None
+        self._lexicon = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def configure(self, path, reload_seconds):
+        with self._lock:
+            changed = os.path.abspath(path) != os.path.abspath(self.path)
+            self.path = path
+            self.reload_seconds = reload_seconds
+        if changed or self._lexicon is None:
+            self.reload(force=True)
+
+    @property
+    def current(self):
+        """The active lexicon; read it once per analysis so one result never mixes versions"""
+        lexicon = self._lexicon
+        if lexicon is None:
+            self.reload(force=True)
+            lexicon = self._lexicon
+        self._ensure_watching()
+        return lexicon
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload(self, force=False):
+        """Recompile the lexicon file if it changed; returns True when a new lexicon was swapped in"""
+        with self._lock:
+            try:
+                signature = self._file_signature()
+                if not force and signature == self._signature:
+                    return False
+                lexicon = Lexicon.load(self.path)
+            except (OSError, LexiconError) as e:
+                if self._lexicon is None:
+                    raise
+                if self.last_error != str(e):
+                    logging.error(f"Could not load lexicon {self.path}, keeping version {self._lexicon.version}: {e}")
+                self.last_error = str(e)
+                return False
+            previous = self._lexicon
+            self._signature = signature
+            self.last_error = None
+            # A plain attribute assignment: readers get either the old object or the new one
+            self._lexicon = lexicon
+            self.reloads += 1
+        if previous is None or previous.version != lexicon.version:
+            logging.info(f"Lexicon version {lexicon.version} active (pid {os.getpid()})")
+        return True
+
+    def _ensure_watching(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self.reload_seconds <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._watch, name='lexicon-reload', daemon=True)
+                self._thread.start()
+
+    def _watch(self):
+        stopped = threading.Event()
+        while not stopped.wait(self.reload_seconds):
+            try:
+                self.reload()
+            except Exception:
+                logging.exception("Lexicon reload failed")
+
+    def status(self):
+        lexicon = self._lexicon
+        return {
+            'version': lexicon.version if lexicon is not None else None,
+            'path': self.path,
+            'reloads': self.reloads,
+            'error': self.last_error
+        }
+
+
+# Global lexicon shared by both analyzers
+lexicons = LexiconStore()
+
+
+def init_lexicons(app):
+    lexicons.configure(app.config.get('LEXICON_PATH', lexicons.path),
+                       app.config.get('LEXICON_RELOAD_SECONDS', lexicons.reload_seconds))
\ No newline at end of file
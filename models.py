@@ -42,6 +42,9 @@ class MoodEntry(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_emergency_flagged = db.Column(db.Boolean, default=False)
 
+    # Covers per-user date range scans and the count/max validators
+    __table_args__ = (db.Index("ix_mood_entries_user_created", "user_id", "created_at"),)
+
 # ✅ JournalEntry Model
 class JournalEntry(db.Model):
     __tablename__ = "journal_entries"
@@ -55,6 +58,9 @@ class JournalEntry(db.Model):
     sentiment_score = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Per-user listing, and narrows Postgres full-text matches to one user
+    __table_args__ = (db.Index("ix_journal_entries_user_created", "user_id", "created_at"),)
+
 # ✅ CommunityPost Model
 class CommunityPost(db.Model):
     __tablename__ = "community_posts"
@@ -66,7 +72,7 @@ class CommunityPost(db.Model):
     hearts_count = db.Column(db.Integer, default=0)
     hugs_count = db.Column(db.Integer, default=0)
     support_count = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 # ✅ PostReaction Model
 class PostReaction(db.Model):
@@ -92,4 +98,164 @@ class EmergencyAlert(db.Model):
     is_resolved = db.Column(db.Boolean, default=False)
     emergency_contact_notified = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
\ No newline at end of file
+
+    # Partial index so the triage console only ever touches open alerts
+    __table_args__ = (
+        db.Index(
+            "ix_emergency_alerts_unresolved",
+            "created_at",
+            sqlite_where=db.text("is_resolved = 0"),
+            postgresql_where=db.text("is_resolved = false"),
+        ),
+    )
+
+# ✅ UserDataVersion Model
+class UserDataVersion(db.Model):
+    __tablename__ = "user_data_versions"
+
+    # Bumped whenever a user's mood or journal data changes
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# ✅ UserShard Model
+class UserShard(db.Model):
+    __tablename__ = "user_shards"
+
+    # Directory of users placed on a shard other than user_id % shard count
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    shard = db.Column(db.Integer, nullable=False)
+
+# ✅ UserMove Model
+class UserMove(db.Model):
+    __tablename__ = "user_moves"
+
+    # Users whose rows are being copied to another shard; their writes are refused until the move ends
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    target_shard = db.Column(db.Integer, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ✅ ArchiveSegment Model
+class ArchiveSegment(db.Model):
+    __tablename__ = "archive_segments"
+
+    # Append-only, gzip-compressed JSON lines of old mood or journal rows for one user
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    start_at = db.Column(db.DateTime, nullable=False)
+    end_at = db.Column(db.DateTime, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_archive_segments_user_kind_end", "user_id", "kind", "end_at"),)
+
+# ✅ ArchivedJournalText Model
+class ArchivedJournalText(db.Model):
+    __tablename__ = "archived_journal_texts"
+
+    # Searchable copy of an archived journal entry's text, pointing at the segment holding the row (see search.py)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    segment_id = db.Column(db.Integer, db.ForeignKey("archive_segments.id"), nullable=False)
+    entry_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200))
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index("ix_archived_journal_texts_user_entry", "user_id", "entry_id"),)
+
+# ✅ MoodAggregate Model
+class MoodAggregate(db.Model):
+    __tablename__ = "mood_aggregates"
+
+    # Community-wide check-in totals for one hour, maintained on every check-in
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    positive_count = db.Column(db.Integer, nullable=False, default=0)
+    neutral_count = db.Column(db.Integer, nullable=False, default=0)
+    negative_count = db.Column(db.Integer, nullable=False, default=0)
+    unlabeled_count = db.Column(db.Integer, nullable=False, default=0)
+
+# ✅ MoodAggregateMember Model
+class MoodAggregateMember(db.Model):
+    __tablename__ = "mood_aggregate_members"
+
+    # Who already counted towards an hour's user_count; pruned once the hour is over
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+
+# ✅ PostModeration Model
+class PostModeration(db.Model):
+    __tablename__ = "post_moderation"
+
+    # Screening result for a community post; posts stay off the wall until approved
+    post_id = db.Column(db.Integer, db.ForeignKey("community_posts.id"), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    sentiment = db.Column(db.String(20))
+    sentiment_score = db.Column(db.Float)
+    crisis_keywords = db.Column(db.String(200))
+    claimed_by = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    screened_at = db.Column(db.DateTime)
+
+    post = db.relationship("CommunityPost", backref=db.backref("moderation", uselist=False))
+
+    __table_args__ = (db.Index("ix_post_moderation_status", "status", "post_id"),)
+
+# ✅ PostRanking Model
+class PostRanking(db.Model):
+    __tablename__ = "post_rankings"
+
+    # Materialized trending order for visible community posts (see trending.py)
+    post_id = db.Column(db.Integer, db.ForeignKey("community_posts.id"), primary_key=True)
+    trending_key = db.Column(db.Float, nullable=False, index=True)
+
+# ✅ ChangeLog Model
+class ChangeLog(db.Model):
+    __tablename__ = "change_log"
+
+    # Latest change to each of a user's mood and journal entries, for delta sync (see sync.py)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(40), nullable=False)
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_change_log_user_seq", "user_id", "seq"),
+        db.Index("ix_change_log_user_entity", "user_id", "entity", "entity_id"),
+    )
+
+# ✅ JournalSentence Model
+class JournalSentence(db.Model):
+    __tablename__ = "journal_sentences"
+
+    # Cached analysis of one passage (a run of sentences) of a journal entry, reused when the entry is edited (see journal_analysis.py)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    journal_entry_id = db.Column(db.Integer, db.ForeignKey("journal_entries.id"), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(40), nullable=False)
+    length = db.Column(db.Integer, nullable=False)
+    sentiment_score = db.Column(db.Float)
+    sentiment_scores = db.Column(db.Text)
+    emotions = db.Column(db.Text)
+
+    __table_args__ = (db.Index("ix_journal_sentences_entry", "user_id", "journal_entry_id", "position"),)
+
+# ✅ BroadcastEvent Model
+class BroadcastEvent(db.Model):
+    __tablename__ = "broadcast_events"
+
+    # Live update relayed to the other worker processes (see broadcast.py)
+    id = db.Column(db.Integer, primary_key=True)
+    origin = db.Column(db.String(80), nullable=False)
+    channel = db.Column(db.String(40), nullable=False)
+    event = db.Column(db.String(40), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_
+
+from . import db
+from .models import CommunityPost, PostModeration
+
+# Background screening of community posts.
+#
+# A new post is saved together with a 'pending' post_moderation row and is
+# only visible to its author until screened. The posting request just wakes
+# the worker thread, which waits a few milliseconds so a burst of posts lands
+# in one batch, claims up to MODERATION_BATCH_SIZE pending rows, runs crisis
+# keyword detection and one batched sentiment call over them, and marks each
+# post 'approved' or 'flagged'. Pending rows live in the database, so posts
+# from a worker process that died are picked up by the next poll.
+#
+# Every process runs its own worker thread, started with the app so pending
+# posts are polled for even in a process that never receives one. serve.py
+# preloads the app in a master process that must not run threads across the
+# fork, so there it sets MODERATION_AUTOSTART=0 and starts the thread in each
+# worker after the fork instead.
+
+PENDING = 'pending'
+APPROVED = 'approved'
+FLAGGED = 'flagged'
+HIDDEN = 'hidden'
+
+
+def visible_posts(query, viewer_id):
+    """Limit a CommunityPost query to what a viewer may see on the wall"""
+    return query.outerjoin(PostModeration, PostModeration.post_id == CommunityPost.id).filter(or_(
+        # Posts from before moderation existed have no row
+        PostModeration.status.is_(None),
+        PostModeration.status == APPROVED,
+        and_(PostModeration.status == PENDING, CommunityPost.user_id == viewer_id)
+    ))
+
+
+class ModerationWorker:
+    def __init__(self, batch_size=32, linger=0.05, poll_interval=5.0, claim_timeout=300.0):
+        self.batch_size = batch_size
+        self.linger = linger
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.app = None
+        self.analyzer = None
+        self.on_screened = None
+        self.screened = 0
+        self.batches = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app, analyzer, on_screened=None):
+        self.app = app
+        self.analyzer = analyzer
+        self.on_screened = on_screened
+        self.batch_size = app.config.get('MODERATION_BATCH_SIZE', self.batch_size)
+        self.linger = app.config.get('MODERATION_LINGER_MS', self.linger * 1000) / 1000.0
+        self.poll_interval = app.config.get('MODERATION_POLL_SECONDS', self.poll_interval)
+        if app.config.get('MODERATION_AUTOSTART', True):
+            self.start()
+
+    def notify(self):
+        """Wake the worker after queueing a post"""
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """Run the worker thread in this process, if it is not running yet"""
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='post-moderation', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            # Give a burst of posts a moment to arrive so they share a batch
+            time.sleep(self.linger)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    while self.screen_pending():
+                        pass
+                except Exception:
+                    logging.exception("Post moderation batch failed")
+                    db.session.rollback()
+
+    def _claim(self):
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.claim_timeout)
+        claimable = and_(PostModeration.status == PENDING,
+                         or_(PostModeration.claimed_at.is_(None), PostModeration.claimed_at < stale))
+        ids = db.session.execute(
+            select(PostModeration.post_id).where(claimable).order_by(PostModeration.post_id).limit(self.batch_size)
+        ).scalars().all()
+        if not ids:
+            return []
+
+        # Another process may have raced us to some of these rows; keep only the ones we won
+        token = uuid.uuid4().hex
+        db.session.execute(update(PostModeration).where(PostModeration.post_id.in_(ids), claimable)
+                           .values(claimed_by=token, claimed_at=now))
+        db.session.commit()
+        return PostModeration.query.filter_by(claimed_by=token, status=PENDING).all()
+
+    def screen_pending(self):
+        """Claim and screen one batch of pending posts, returning how many were screened"""
+        claimed = self._claim()
+        if not claimed:
+            return 0
+
+        texts = [row.post.content for row in claimed]
+        sentiments = self.analyzer.analyze_sentiment_batch(texts)
+        screened_at = datetime.utcnow()
+        for row, text, sentiment in zip(claimed, texts, sentiments):
+            is_crisis, keywords = self.analyzer.check_emergency_keywords(text)
+            row.sentiment = sentiment['sentiment']
+            row.sentiment_score = sentiment['score']
+            row.crisis_keywords = ','.join(keywords)[:200] or None
+            # Crisis posts stay off the wall until a counselor has looked at them
+            row.status = FLAGGED if is_crisis else APPROVED
+            row.screened_at = screened_at
+        db.session.commit()
+
+        self.screened += len(claimed)
+        self.batches += 1
+        if self.on_screened:
+            for row in claimed:
+                try:
+                    self.on_screened(row.post, row)
+                except Exception:
+                    logging.exception(f"Post-screening action failed for post {row.post_id}")
+        return len(claimed)
+
+    def stats(self):
+        return {
+            'screened': self.screened,
+            'batches': self.batches,
+            'avg_batch': self.screened / self.batches if self.batches else 0.0,
+            'batch_size': self.batch_size,
+        }
+
+
+# Global worker, wired up by the routes
+moderation_worker = ModerationWorker()
\ No newline at end of file
@@ -0,0 +1,125 @@
+import os
+import time
+import hashlib
+import threading
+from functools import wraps
+from flask import request, session, current_app, make_response
+from flask_login import current_user
+
+# Whole-page cache for routes whose HTML is identical for every visitor (or
+# every logged-in visitor). Pages are rendered on first hit and replayed from
+# memory afterwards; the cache is dropped whenever a template file changes.
+
+class PageCache:
+    def __init__(self, check_interval=2.0):
+        self.check_interval = check_interval
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _template_stamp(self, app):
+        """Newest modification time across the template folders"""
+        newest = 0.0
+        folders = [os.path.join(app.root_path, app.template_folder)] if app.template_folder else []
+        for blueprint in app.blueprints.values():
+            if blueprint.template_folder:
+                folders.append(os.path.join(blueprint.root_path, blueprint.template_folder))
+        for folder in folders:
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    try:
+                        newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+                    except OSError:
+                        pass
+        return newest
+
+    def _check_templates(self, app):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        stamp = self._template_stamp(app)
+        if stamp != self._stamp:
+            with self._lock:
+                self._pages.clear()
+                # Jinja only reloads templates itself in debug mode
+                if self._stamp is not None and app.jinja_env.cache is not None:
+                    app.jinja_env.cache.clear()
+            self._stamp = stamp
+
+    def get(self, app, key):
+        self._check_templates(app)
+        page = self._pages.get(key)
+        if page is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return page
+
+    def set(self, key, page):
+        with self._lock:
+            self._pages[key] = page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'pages': len(self._pages),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global page store
+page_cache = PageCache()
+
+
+def _build_response(page):
+    body, status, mimetype, etag = page
+    response = make_response(body, status)
+    response.mimetype = mimetype
+    # The page differs for anonymous and logged-in visitors
+    response.vary.add('Cookie')
+    response.headers['Cache-Control'] = 'no-cache'
+    if not 200 <= status < 300:
+        # A matching If-None-Match must never turn an error page into a 304
+        return response
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def cached_page(view):
+    """Serve a view's rendered HTML from memory, one copy per login state"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        app = current_app._get_current_object()
+        # Pending flash messages are rendered into the page, so never cache those
+        if not app.config.get('PAGE_CACHE_ENABLED', True) or request.method not in ('GET', 'HEAD') \
+                or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        key = (view.__module__, view.__qualname__, repr(args), repr(sorted(kwargs.items())),
+               current_user.is_authenticated)
+        page = page_cache.get(app, key)
+        if page is None:
+            response = make_response(view(*args, **kwargs))
+            # Redirects, streams and non-HTML responses are passed straight through
+            if response.direct_passthrough or response.mimetype != 'text/html' \
+                    or 300 <= response.status_code < 400:
+                return response
+            body = response.get_data()
+            page = (body, response.status_code, response.mimetype, hashlib.sha1(body).hexdigest()[:20])
+            page_cache.set(key, page)
+        return _build_response(page)
+    return wrapped
+
+
+def init_page_cache(app):
+    page_cache.check_interval = app.config.get('PAGE_CACHE_CHECK_SECONDS', page_cache.check_interval)
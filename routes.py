@@ -1,7 +1,9 @@
+import os
 import logging
 import sys
-from datetime import datetime, timedelta
-from flask import render_template, request, redirect, url_for, flash, jsonify, session, abort, current_app
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import render_template, request, redirect, url_for, flash, jsonify, session, abort, current_app, Response, make_response
 from flask_login import login_user, logout_user, login_required, current_user
 from email_validator import validate_email, EmailNotValidError
 from sqlalchemy import func, desc
@@ -9,15 +11,37 @@ from sqlalchemy.exc import IntegrityError
 
 # Import from the package
 from . import db
-from .ai_analyzer import MoodAnalyzer
-from .models import User, MoodEntry, JournalEntry, CommunityPost, PostReaction, EmergencyAlert
+from .ai_analyzer import mood_analyzer
+from .models import User, MoodEntry, JournalEntry, CommunityPost, PostReaction, EmergencyAlert, PostModeration, PostRanking, ArchivedJournalText
+from .broadcast import hub, sse_stream, HubFull, init_broadcast, thread_streams
+from .conditional import make_etag, is_not_modified, not_modified, set_validators
+from .fragment_cache import fragment_cache
+from .page_cache import cached_page, page_cache
+from .db_routing import use_replica
+from .sharding import get_router, shard_sessions, shard_index_for, UserMovingError
+from .archive import recent_entries, entries_between, archive_stamp
+from .search import search_journals
+from .vector_index import vector_index
+from .heatmap import heatmap_cache
+from .embeddings import embedding_worker
+from .moderation import moderation_worker, visible_posts, APPROVED, FLAGGED, HIDDEN
+from .sharding import using_shard
+from .trending import trending_feed
+from .sync import changes_since
+from .health import process_memory, database_status
+from .journal_analysis import analyze_journal, save_sentences
+from sqlalchemy.orm import Session
 
-# Initialize AI analyzer
-mood_analyzer = MoodAnalyzer()
+# Apply live update limits to the shared broadcast hub and relay it between workers
+init_broadcast(current_app, db.engine)
+
+# Journal embeddings for "similar entries"
+vector_index.directory = current_app.config['VECTOR_INDEX_DIR']
 
 from flask import current_app as app
 
 @app.route('/')
+@cached_page
 def index():
     """Home page"""
     return render_template('index.html')
@@ -112,12 +136,11 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@use_replica
 def dashboard():
     """User dashboard with mood trends"""
     # Get recent mood entries for chart
-    recent_moods = MoodEntry.query.filter_by(user_id=current_user.id)\
-                                 .order_by(desc(MoodEntry.created_at))\
-                                 .limit(30).all()
+    recent_moods = recent_entries(MoodEntry, current_user.id, 30)
     
     # Calculate statistics
     total_entries = len(recent_moods)
@@ -129,9 +152,7 @@ def dashboard():
     trend = mood_analyzer.calculate_mood_trend([entry.mood_score for entry in week_moods])
     
     # Get recent journal entries
-    recent_journals = JournalEntry.query.filter_by(user_id=current_user.id)\
-                                       .order_by(desc(JournalEntry.created_at))\
-                                       .limit(3).all()
+    recent_journals = recent_entries(JournalEntry, current_user.id, 3)
     
     return render_template('dashboard.html', 
                          mood_entries=recent_moods[:7],
@@ -162,8 +183,8 @@ def mood_checkin():
             emotions_list = ai_analysis.get('emotions', [])
             
             # Check for emergency keywords
-            emergency_keywords = mood_analyzer.check_emergency_keywords(mood_text)
-            if emergency_keywords:
+            is_emergency, emergency_keywords = mood_analyzer.check_emergency_keywords(mood_text)
+            if is_emergency:
                 # Create mood entry first
                 mood_entry = MoodEntry(
                     user_id=current_user.id,
@@ -208,10 +229,62 @@ def mood_checkin():
     
     return render_template('mood_checkin.html')
 
-@app.route('/journal', methods=['GET', 'POST'])
+JOURNAL_PAGE_SIZE = 20
+
+@app.route('/journal', methods=['POST'])
 @login_required
+def save_journal_entry():
+    """Save a new journal entry"""
+    title = request.form.get('title', '').strip()
+    content = request.form.get('content', '').strip()
+    mood_tags = request.form.get('mood_tags', '').strip()
+    
+    if not content:
+        flash('Journal content is required.', 'danger')
+        return render_template('journal.html')
+    
+    # Analyze content with AI, passage by passage so later edits can reuse the results
+    ai_analysis, sentences = analyze_journal(content)
+    
+    journal_entry = JournalEntry(
+        user_id=current_user.id,
+        title=title or f"Journal Entry - {datetime.utcnow().strftime('%B %d, %Y')}",
+        content=content,
+        mood_tags=mood_tags,
+        ai_analysis=str(ai_analysis),
+        sentiment_score=ai_analysis['mood_score']
+    )
+    
+    db.session.add(journal_entry)
+    save_sentences(journal_entry, sentences)
+    db.session.commit()
+    embedding_worker.enqueue(journal_entry)
+    
+    flash('Journal entry saved successfully!', 'success')
+    return redirect(url_for('mood_journal'))
+
+# Reads only, so it can be served from a replica; saving goes through save_journal_entry
+@app.route('/journal')
+@login_required
+@use_replica
 def mood_journal():
     """Mood journal for detailed reflections"""
+    # One page of the user's journal entries, newest first; archive segments are only
+    # decoded once the page reaches past the hot rows
+    page = max(request.args.get('page', 1, type=int), 1)
+    end = page * JOURNAL_PAGE_SIZE
+    entries = recent_entries(JournalEntry, current_user.id, end + 1)
+    has_more = len(entries) > end
+    entries = entries[end - JOURNAL_PAGE_SIZE:end]
+    
+    return render_template('journal.html', entries=entries, page=page, has_more=has_more)
+
+@app.route('/journal/<int:entry_id>/edit', methods=['GET', 'POST'])
+@login_required
+def edit_journal_entry(entry_id):
+    """Edit a journal entry, re-analyzing only the passages that changed"""
+    entry = JournalEntry.query.filter_by(id=entry_id, user_id=current_user.id).first_or_404()
+    
     if request.method == 'POST':
         title = request.form.get('title', '').strip()
         content = request.form.get('content', '').strip()
@@ -219,72 +292,146 @@ def mood_journal():
         
         if not content:
             flash('Journal content is required.', 'danger')
-            return render_template('journal.html')
-        
-        # Analyze content with AI
-        ai_analysis = mood_analyzer.analyze_mood_text(content)
+            return render_template('journal_edit.html', entry=entry)
         
-        journal_entry = JournalEntry(
-            user_id=current_user.id,
-            title=title or f"Journal Entry - {datetime.utcnow().strftime('%B %d, %Y')}",
-            content=content,
-            mood_tags=mood_tags,
-            ai_analysis=str(ai_analysis),
-            sentiment_score=ai_analysis.get('score', 0.0)
-        )
-        
-        db.session.add(journal_entry)
+        content_changed = content != entry.content
+        if content_changed:
+            ai_analysis, sentences = analyze_journal(content, entry)
+            entry.content = content
+            entry.ai_analysis = str(ai_analysis)
+            entry.sentiment_score = ai_analysis['mood_score']
+            save_sentences(entry, sentences)
+        title_changed = (title or entry.title) != entry.title
+        entry.title = title or entry.title
+        entry.mood_tags = mood_tags
         db.session.commit()
+        if content_changed or title_changed:
+            embedding_worker.enqueue(entry)
         
-        flash('Journal entry saved successfully!', 'success')
+        flash('Journal entry updated successfully!', 'success')
         return redirect(url_for('mood_journal'))
     
-    # Get user's journal entries
-    entries = JournalEntry.query.filter_by(user_id=current_user.id)\
-                               .order_by(desc(JournalEntry.created_at))\
-                               .all()
+    return render_template('journal_edit.html', entry=entry)
+
+def journal_embedding_text(entry):
+    return f"{entry.title or ''}\n{entry.content}"
+
+def index_journal_embedding(entry):
+    """Add a saved journal entry to its owner's vector index"""
+    embedding = mood_analyzer.embed_text(journal_embedding_text(entry))
+    if embedding is None:
+        return False
+    try:
+        vector_index.add(entry.user_id, entry.id, embedding)
+        return True
+    except OSError as e:
+        logging.error(f"Could not index journal entry {entry.id}: {e}")
+        return False
+
+embedding_worker.init_app(current_app._get_current_object(), index_journal_embedding)
+
+@app.route('/community', methods=['POST'])
+@login_required
+def share_community_post():
+    """Share a post on the community wall"""
+    content = request.form.get('content', '').strip()
+    is_anonymous = request.form.get('is_anonymous') == 'on'
+    
+    if not content:
+        flash('Please enter some content to share.', 'danger')
+        return redirect(url_for('community'))
+    
+    post = CommunityPost(
+        user_id=current_user.id,
+        content=content,
+        is_anonymous=is_anonymous
+    )
+    
+    # Screened in the background; only the author sees it until then
+    db.session.add(post)
+    db.session.add(PostModeration(post=post))
+    db.session.commit()
+    moderation_worker.notify()
     
-    return render_template('journal.html', entries=entries)
+    flash('Your post has been shared with the community.', 'success')
+    return redirect(url_for('community'))
 
-@app.route('/community', methods=['GET', 'POST'])
+# Reads only, so it can be served from a replica; posting goes through share_community_post
+@app.route('/community')
 @login_required
+@use_replica
 def community():
     """Anonymous community support wall"""
-    if request.method == 'POST':
-        content = request.form.get('content', '').strip()
-        is_anonymous = request.form.get('is_anonymous') == 'on'
-        
-        if not content:
-            flash('Please enter some content to share.', 'danger')
-            return redirect(url_for('community'))
-        
-        post = CommunityPost(
-            user_id=current_user.id,
-            content=content,
-            is_anonymous=is_anonymous
-        )
-        
-        db.session.add(post)
-        db.session.commit()
-        
-        flash('Your post has been shared with the community.', 'success')
-        return redirect(url_for('community'))
+    # The trending order comes from the in-memory top list; the default stays newest first
+    feed = 'trending' if request.args.get('feed') == 'trending' else 'latest'
+    ranked_ids = trending_feed.top(20) if feed == 'trending' else None
+    
+    def wall(query):
+        query = visible_posts(query, current_user.id)
+        if ranked_ids is not None:
+            return query.filter(CommunityPost.id.in_(ranked_ids))
+        return query.order_by(desc(CommunityPost.created_at)).limit(20)
+    
+    def in_feed_order(rows):
+        if ranked_ids is None:
+            return rows
+        position = {post_id: index for index, post_id in enumerate(ranked_ids)}
+        return sorted(rows, key=lambda row: position[row.id])
+    
+    # Cheap validator: ids and reaction counts of the posts on the wall
+    feed_state = in_feed_order(wall(db.session.query(CommunityPost.id,
+                                                     CommunityPost.hearts_count,
+                                                     CommunityPost.hugs_count,
+                                                     CommunityPost.support_count)).all())
+    etag = make_etag('community', feed, current_user.id, [tuple(row) for row in feed_state])
+    # Pending flash messages still have to be rendered into the page
+    if not session.get('_flashes') and is_not_modified(etag):
+        return not_modified(etag)
     
     # Get community posts
-    posts = CommunityPost.query.order_by(desc(CommunityPost.created_at)).limit(20).all()
+    posts = in_feed_order(wall(CommunityPost.query).all())
+    reaction_masks = viewer_reaction_masks(current_user.id, [post.id for post in posts])
+    
+    response = make_response(render_template('community.html',
+                                             posts=posts,
+                                             reaction_masks=reaction_masks,
+                                             reaction_bits=REACTION_BITS,
+                                             feed=feed))
+    return set_validators(response, etag)
+
+# Bit per reaction type in a viewer's per-post reaction mask
+REACTION_BITS = {'heart': 1, 'hug': 2, 'support': 4}
+
+def viewer_reaction_masks(user_id, post_ids):
+    """Map post id to a bitmask of the viewer's reactions, in one index-only lookup"""
+    if not post_ids:
+        return {}
     
-    return render_template('community.html', posts=posts)
+    # (user_id, post_id, reaction_type) is the unique constraint's index, so this never reads the table
+    rows = db.session.query(PostReaction.post_id, PostReaction.reaction_type)\
+                     .filter(PostReaction.user_id == user_id, PostReaction.post_id.in_(post_ids))\
+                     .all()
+    masks = dict.fromkeys(post_ids, 0)
+    for post_id, reaction_type in rows:
+        masks[post_id] |= REACTION_BITS.get(reaction_type, 0)
+    return masks
 
 @app.route('/react/<int:post_id>/<reaction_type>')
 @login_required
 def react_to_post(post_id, reaction_type):
     """React to a community post"""
-    if reaction_type not in ['heart', 'hug', 'support']:
+    if reaction_type not in REACTION_BITS:
         flash('Invalid reaction type.', 'danger')
         return redirect(url_for('community'))
     
     post = CommunityPost.query.get_or_404(post_id)
     
+    # Only posts on the wall take reactions; the rest must not show up in the live stream
+    moderation = db.session.get(PostModeration, post_id)
+    if moderation is not None and moderation.status != APPROVED:
+        flash('This post is not available for reactions.', 'warning')
+        return redirect(url_for('community'))
+    
     # Check if user already reacted with this type
     existing_reaction = PostReaction.query.filter_by(
         user_id=current_user.id,
@@ -294,6 +441,7 @@ def react_to_post(post_id, reaction_type):
     
     if existing_reaction:
         # Remove reaction
+        delta = -1
         db.session.delete(existing_reaction)
         if reaction_type == 'heart':
             post.hearts_count = max(0, post.hearts_count - 1)
@@ -303,6 +451,7 @@ def react_to_post(post_id, reaction_type):
             post.support_count = max(0, post.support_count - 1)
     else:
         # Add reaction
+        delta = 1
         reaction = PostReaction(
             user_id=current_user.id,
             post_id=post_id,
@@ -317,11 +466,99 @@ def react_to_post(post_id, reaction_type):
         elif reaction_type == 'support':
             post.support_count += 1
     
+    # Only posts on the wall have a trending key to refresh
+    key = trending_feed.rank(post) if db.session.get(PostRanking, post.id) is not None else None
     db.session.commit()
+    if key is not None:
+        trending_feed.remember(post.id, key)
+    
+    hub.publish('community', 'reaction', {
+        'post_id': post.id,
+        'reaction_type': reaction_type,
+        'delta': delta,
+        'hearts_count': post.hearts_count,
+        'hugs_count': post.hugs_count,
+        'support_count': post.support_count
+    })
     return redirect(url_for('community'))
 
+def serialize_post(post):
+    """JSON payload for a community post, never exposing anonymous authors"""
+    return {
+        'id': post.id,
+        'content': post.content,
+        'author': None if post.is_anonymous else post.user.username,
+        'hearts_count': post.hearts_count,
+        'hugs_count': post.hugs_count,
+        'support_count': post.support_count,
+        'created_at': post.created_at.isoformat() if post.created_at else None
+    }
+
+def on_post_screened(post, moderation):
+    """Publish approved posts and raise alerts for crisis posts"""
+    if moderation.status == APPROVED:
+        key = trending_feed.rank(post)
+        db.session.commit()
+        trending_feed.remember(post.id, key)
+        # Push the new post to everyone watching the wall
+        hub.publish('community', 'post', serialize_post(post))
+    elif moderation.status == FLAGGED:
+        handle_emergency_alert(post.user, None, moderation.crisis_keywords.split(','),
+                               alert_type='community_post')
+
+moderation_worker.init_app(current_app._get_current_object(), mood_analyzer, on_post_screened)
+
+def streams_unavailable():
+    response = Response('Too many live connections, please retry shortly.', status=503, mimetype='text/plain')
+    response.headers['Retry-After'] = '30'
+    return response
+
+def event_stream_response(channel, initial=None):
+    """Open an SSE response on a hub channel, or 503 when the worker is saturated"""
+    # Each stream served here pins a worker thread for its whole life, so only a few may be
+    # open at once; the ASGI app (serve.py's default) serves them from its event loop instead
+    if not thread_streams.acquire():
+        logging.warning(f"Rejecting live stream on '{channel}': {thread_streams.limit} streams already hold worker threads")
+        return streams_unavailable()
+    try:
+        subscription = hub.subscribe(channel)
+    except HubFull:
+        thread_streams.release()
+        logging.warning(f"Rejecting live stream on '{channel}': subscriber limit reached")
+        return streams_unavailable()
+    
+    try:
+        initial = initial() if callable(initial) else initial
+    except Exception:
+        subscription.close()
+        thread_streams.release()
+        raise
+    
+    # Initial data is loaded up front so the stream itself never touches the database
+    heartbeat = current_app.config.get('SSE_HEARTBEAT_SECONDS', 15.0)
+    response = Response(sse_stream(subscription, heartbeat=heartbeat, initial=initial), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(thread_streams.release)
+    return response
+
+@app.route('/api/community/mood-heatmap')
+def mood_heatmap():
+    """Anonymized community mood by hour, served from in-memory aggregates"""
+    days = min(max(request.args.get('days', 7, type=int), 1), 90)
+    response = jsonify(heatmap_cache.get(days))
+    response.headers['Cache-Control'] = f'public, max-age={int(heatmap_cache.refresh_seconds)}'
+    return response
+
+@app.route('/community/stream')
+@login_required
+def community_stream():
+    """Server-Sent Events stream of new posts and reaction counts"""
+    return event_stream_response('community')
+
 @app.route('/therapy')
 @login_required
+@cached_page
 def therapy():
     """Micro-therapy and wellness activities"""
     return render_template('therapy.html')
@@ -345,25 +582,36 @@ def emergency_settings():
     
     return render_template('emergency_settings.html')
 
-def handle_emergency_alert(user, mood_entry, keywords):
-    """Handle emergency situation detection"""
+def handle_emergency_alert(user, mood_entry, keywords, alert_type='keyword_detected', commit=True):
+    """Handle emergency situation detection; with commit=False the caller commits, then calls publish_alert"""
     alert = EmergencyAlert(
         user_id=user.id,
-        mood_entry_id=mood_entry.id,
-        alert_type='keyword_detected',
+        mood_entry_id=mood_entry.id if mood_entry else None,
+        alert_type=alert_type,
         alert_content=f"Emergency keywords detected: {', '.join(keywords)}"
     )
-    db.session.add(alert)
     
-    # Send notification if enabled
-    if user.is_emergency_enabled and user.emergency_contact:
-        try:
-            send_emergency_notification(user, keywords)
-            alert.emergency_contact_notified = True
-        except Exception as e:
-            logging.error(f"Failed to send emergency notification: {e}")
-    
-    db.session.commit()
+    # Also called from the moderation worker, where there is no logged-in user to route by
+    with using_shard(db.session, user.id):
+        db.session.add(alert)
+        
+        # Send notification if enabled
+        if user.is_emergency_enabled and user.emergency_contact:
+            try:
+                send_emergency_notification(user, keywords)
+                alert.emergency_contact_notified = True
+            except Exception as e:
+                logging.error(f"Failed to send emergency notification: {e}")
+        
+        if not commit:
+            return alert
+        db.session.commit()
+        publish_alert(alert, user)
+    return alert
+
+def publish_alert(alert, user):
+    """Push a committed alert to any open triage consoles"""
+    hub.publish('triage', 'alert', serialize_alert(alert, user, shard_index_for(user.id)))
 
 def send_emergency_notification(user, keywords):
     """Send emergency notification to designated contact"""
@@ -371,17 +619,191 @@ def send_emergency_notification(user, keywords):
     # For now, just log the alert
     logging.warning(f"EMERGENCY ALERT for user {user.username}: Keywords detected - {keywords}")
 
+def staff_required(view):
+    """Restrict a view to counselors listed in TRIAGE_STAFF_USERNAMES"""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.username not in current_app.config.get('TRIAGE_STAFF_USERNAMES', []):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
+def serialize_alert(alert, user=None, shard=None):
+    """JSON payload describing an emergency alert for the triage console"""
+    user = user or User.query.get(alert.user_id)
+    return {
+        'id': alert.id,
+        'shard': shard,
+        'user_id': alert.user_id,
+        'username': user.username if user else None,
+        'mood_entry_id': alert.mood_entry_id,
+        'alert_type': alert.alert_type,
+        'alert_content': alert.alert_content,
+        'emergency_contact_notified': alert.emergency_contact_notified,
+        'is_resolved': alert.is_resolved,
+        'created_at': alert.created_at.isoformat() if alert.created_at else None
+    }
+
+def get_unresolved_alerts(limit=100):
+    """Newest open alerts across all shards, served from the partial unresolved-alert index"""
+    alerts = []
+    for shard, shard_session in shard_sessions(db):
+        shard_alerts = shard_session.query(EmergencyAlert).filter(EmergencyAlert.is_resolved == False)\
+                                    .order_by(desc(EmergencyAlert.created_at))\
+                                    .limit(limit).all()
+        alerts.extend((alert, shard) for alert in shard_alerts)
+        if shard is not None:
+            shard_session.close()
+    
+    # Merge the per-shard lists, newest first
+    alerts.sort(key=lambda pair: pair[0].created_at or datetime.min, reverse=True)
+    alerts = alerts[:limit]
+    
+    # Load all alert owners in one query instead of one per alert
+    user_ids = {alert.user_id for alert, _ in alerts}
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    return [serialize_alert(alert, users.get(alert.user_id), shard) for alert, shard in alerts]
+
+@app.route('/api/triage/alerts')
+@staff_required
+def triage_alerts():
+    """Unresolved emergency alerts for counselors"""
+    limit = min(request.args.get('limit', 100, type=int), 500)
+    return jsonify(get_unresolved_alerts(limit))
+
+@app.route('/api/triage/alerts/<int:alert_id>/resolve', methods=['POST'])
+@staff_required
+def resolve_alert(alert_id):
+    """Mark an emergency alert as handled"""
+    # With sharding enabled alert ids are only unique within their shard
+    router = get_router()
+    shard = request.args.get('shard', type=int)
+    if router is not None and (shard is None or not 0 <= shard < len(router.engines)):
+        abort(400)
+    
+    alert_session = Session(bind=router.engines[shard]) if router is not None else db.session
+    try:
+        alert = alert_session.get(EmergencyAlert, alert_id)
+        if alert is None:
+            abort(404)
+        alert.is_resolved = True
+        alert_session.commit()
+        payload = serialize_alert(alert, shard=shard)
+    finally:
+        if router is not None:
+            alert_session.close()
+    
+    hub.publish('triage', 'resolved', {'id': alert_id, 'shard': shard})
+    return jsonify(payload)
+
+@app.route('/api/triage/stream')
+@staff_required
+def triage_stream():
+    """Server-Sent Events stream of new and resolved emergency alerts"""
+    # The snapshot is taken after subscribing so no alert falls in between
+    return event_stream_response('triage', lambda: [{'id': 0, 'event': 'snapshot', 'data': get_unresolved_alerts()}])
+
+@app.before_request
+def warm_analyzer():
+    # Processes not started by serve.py warm the models up on their first request
+    mood_analyzer.start_warm_up()
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the process is up and answering"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: models loaded and warmed up, databases reachable"""
+    analyzer = mood_analyzer.status()
+    databases = database_status()
+    ready = analyzer['ready'] and all(status == 'ok' for status in databases.values())
+    response = jsonify({
+        'ready': ready,
+        'pid': os.getpid(),
+        'analyzer': analyzer,
+        'databases': databases,
+        'memory': process_memory()
+    })
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/cache-stats')
+@staff_required
+def cache_stats():
+    """Hit-rate metrics for the template fragment cache"""
+    return jsonify({'fragments': fragment_cache.stats(), 'pages': page_cache.stats()})
+
+@app.route('/api/moderation/posts')
+@staff_required
+def moderation_queue():
+    """Community posts held back by screening, for counselor review"""
+    status = request.args.get('status', FLAGGED)
+    rows = PostModeration.query.filter_by(status=status)\
+                               .order_by(desc(PostModeration.post_id))\
+                               .limit(100).all()
+    return jsonify({
+        'posts': [dict(serialize_post(row.post),
+                       user_id=row.post.user_id,
+                       status=row.status,
+                       sentiment=row.sentiment,
+                       crisis_keywords=row.crisis_keywords.split(',') if row.crisis_keywords else [])
+                  for row in rows],
+        'stats': moderation_worker.stats()
+    })
+
+@app.route('/api/moderation/posts/<int:post_id>', methods=['POST'])
+@staff_required
+def moderate_post(post_id):
+    """Approve or hide a screened community post"""
+    action = request.form.get('action') or (request.get_json(silent=True) or {}).get('action')
+    if action not in ('approve', 'hide'):
+        abort(400)
+    
+    moderation = PostModeration.query.get_or_404(post_id)
+    was_visible = moderation.status == APPROVED
+    moderation.status = APPROVED if action == 'approve' else HIDDEN
+    key = trending_feed.rank(moderation.post) if moderation.status == APPROVED else None
+    if key is None:
+        trending_feed.unrank(post_id)
+    db.session.commit()
+    trending_feed.remember(post_id, key)
+    
+    if moderation.status == APPROVED and not was_visible:
+        hub.publish('community', 'post', serialize_post(moderation.post))
+    return jsonify({'post_id': post_id, 'status': moderation.status})
+
 @app.route('/api/mood-data')
 @login_required
+@use_replica
 def api_mood_data():
     """API endpoint for mood chart data"""
     days = request.args.get('days', 30, type=int)
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    mood_entries = MoodEntry.query.filter(
+    # Validators come from index-only aggregates, far cheaper than the full payload
+    entry_count, newest = db.session.query(func.count(MoodEntry.id), func.max(MoodEntry.created_at)).filter(
         MoodEntry.user_id == current_user.id,
         MoodEntry.created_at >= start_date
-    ).order_by(MoodEntry.created_at).all()
+    ).one()
+    newest_expired = db.session.query(func.max(MoodEntry.created_at)).filter(
+        MoodEntry.user_id == current_user.id,
+        MoodEntry.created_at < start_date
+    ).scalar()
+    
+    # The data last changed either when an entry was added or when one aged out of the window
+    last_modified = max(filter(None, [newest, newest_expired and newest_expired + timedelta(days=days)]), default=None)
+    etag = make_etag('mood-data', current_user.id, days, entry_count, newest,
+                     archive_stamp(MoodEntry, current_user.id, since=start_date))
+    # Weak: the ASGI server answers this route natively with the same data, not the same bytes
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified, weak=True)
+    
+    # Falls through to the archive only when the window reaches archived dates
+    mood_entries = entries_between(MoodEntry, current_user.id, since=start_date)
     
     data = [{
         'date': entry.created_at.strftime('%Y-%m-%d'),
@@ -389,26 +811,199 @@ def api_mood_data():
         'sentiment': entry.ai_sentiment
     } for entry in mood_entries]
     
-    return jsonify(data)
+    return set_validators(jsonify(data), etag, last_modified, weak=True)
+
+def parse_checkin(item):
+    """Validate one JSON check-in, returning (MoodEntry fields, errors)"""
+    if not isinstance(item, dict):
+        return None, ['entry must be an object']
+    
+    errors = []
+    mood_score = item.get('mood_score')
+    if isinstance(mood_score, bool) or not isinstance(mood_score, (int, float)) or not -1 <= mood_score <= 1:
+        errors.append('mood_score must be a number between -1 and 1')
+    
+    mood_text = item.get('mood_text') or ''
+    if not isinstance(mood_text, str):
+        errors.append('mood_text must be a string')
+        mood_text = ''
+    
+    voice_analysis_score = item.get('voice_analysis_score')
+    if voice_analysis_score is not None and (isinstance(voice_analysis_score, bool) or
+                                             not isinstance(voice_analysis_score, (int, float))):
+        errors.append('voice_analysis_score must be a number')
+    
+    # Offline clients send the time the check-in was made
+    created_at = None
+    if item.get('created_at') is not None:
+        try:
+            created_at = datetime.fromisoformat(str(item['created_at']).replace('Z', '+00:00'))
+            if created_at.tzinfo is not None:
+                created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+            if created_at > datetime.utcnow() + timedelta(minutes=5):
+                errors.append('created_at is in the future')
+        except ValueError:
+            errors.append('created_at must be an ISO 8601 timestamp')
+    
+    if errors:
+        return None, errors
+    return {
+        'mood_score': float(mood_score),
+        'mood_text': mood_text.strip() or None,
+        'voice_analysis_score': voice_analysis_score,
+        'created_at': created_at or datetime.utcnow()
+    }, []
+
+@app.route('/api/mood-checkins', methods=['POST'])
+@login_required
+def api_mood_checkins():
+    """Save a batch of queued check-ins with one analyzer pass and one commit"""
+    payload = request.get_json(silent=True)
+    items = payload.get('entries') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a non-empty list of entries'}), 400
+    max_batch = current_app.config.get('MOOD_CHECKIN_BATCH_MAX', 100)
+    if len(items) > max_batch:
+        return jsonify({'error': f'At most {max_batch} entries per request'}), 413
+    
+    results = []
+    accepted = []
+    for index, item in enumerate(items):
+        client_id = item.get('client_id') if isinstance(item, dict) else None
+        fields, errors = parse_checkin(item)
+        results.append({'index': index, 'client_id': client_id,
+                        'status': 'invalid' if errors else 'created'})
+        if errors:
+            results[-1]['errors'] = errors
+        else:
+            accepted.append((results[-1], fields))
+    
+    # One batched model call per analyzer for every text in the request
+    texts = [fields['mood_text'] for _, fields in accepted if fields['mood_text']]
+    analyses = iter(mood_analyzer.analyze_mood_texts(texts)) if texts else iter(())
+    
+    entries = []
+    for result, fields in accepted:
+        entry = MoodEntry(user_id=current_user.id, **fields)
+        if fields['mood_text']:
+            analysis = next(analyses)
+            entry.ai_sentiment = analysis.get('sentiment', 'neutral')
+            entry.ai_confidence = analysis.get('confidence', 0.0)
+            entry.emotions_detected = ','.join([e['emotion'] for e in analysis['emotions']])
+            entry.is_emergency_flagged = analysis['is_emergency']
+            result['emergency_keywords'] = analysis['emergency_keywords']
+        entries.append((result, entry))
+    
+    # Same-table rows go out as one multi-row INSERT in a single transaction
+    db.session.add_all(entry for _, entry in entries)
+    db.session.flush()
+    
+    alerts = []
+    for result, entry in entries:
+        result['id'] = entry.id
+        result['sentiment'] = entry.ai_sentiment
+        keywords = result.pop('emergency_keywords', None)
+        if keywords:
+            alerts.append(handle_emergency_alert(current_user, entry, keywords, commit=False))
+            result['emergency_flagged'] = True
+    db.session.commit()
+    
+    for alert in alerts:
+        publish_alert(alert, current_user)
+    
+    status = 201 if entries else 400
+    return jsonify({'created': len(entries), 'invalid': len(items) - len(entries), 'results': results}), status
+
+@app.route('/api/sync')
+@login_required
+@use_replica
+def api_sync():
+    """Mood and journal changes since the client's cursor"""
+    limit = min(max(request.args.get('limit', 200, type=int), 1), 1000)
+    return jsonify(changes_since(current_user.id, request.args.get('cursor'), limit))
+
+@app.route('/api/journal/search')
+@login_required
+@use_replica
+def search_journal():
+    """Ranked full-text search over the current user's journal entries"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    results, has_more = search_journals(current_user.id, query, page, per_page)
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'results': results
+    })
+
+@app.route('/api/journal/<int:entry_id>/similar')
+@login_required
+@use_replica
+def similar_journal_entries(entry_id):
+    """Past journal entries that read most like the given one"""
+    entry = JournalEntry.query.filter_by(id=entry_id, user_id=current_user.id).first_or_404()
+    k = min(max(request.args.get('k', 5, type=int), 1), 50)
+    
+    # An entry still queued for indexing (or saved before the index existed) has no matches yet
+    vector = vector_index.get(current_user.id, entry.id)
+    if vector is None:
+        return jsonify([])
+    
+    matches = vector_index.search(current_user.id, vector, k, exclude=[entry.id])
+    ids = [match_id for match_id, _ in matches]
+    entries = {e.id: e for e in JournalEntry.query.filter(JournalEntry.user_id == current_user.id,
+                                                          JournalEntry.id.in_(ids))} if ids else {}
+    if len(entries) < len(ids):
+        # Older matches may have moved to the archive, whose searchable copy has all we show
+        missing = [match_id for match_id in ids if match_id not in entries]
+        entries.update({e.entry_id: e for e in ArchivedJournalText.query.filter(
+            ArchivedJournalText.user_id == current_user.id, ArchivedJournalText.entry_id.in_(missing))})
+    
+    return jsonify([{
+        'id': match_id,
+        'title': entries[match_id].title,
+        'excerpt': (entries[match_id].content or '')[:200],
+        'created_at': entries[match_id].created_at.isoformat() if entries[match_id].created_at else None,
+        'similarity': round(score, 4)
+    } for match_id, score in matches if match_id in entries])
+
+@cached_page
+def render_error_page(error_code, error_message, error_description):
+    """Error pages only depend on the code, so they are served from the page cache"""
+    return render_template('error.html', 
+                          error_code=error_code,
+                          error_message=error_message,
+                          error_description=error_description), error_code
 
 @app.errorhandler(404)
 def not_found(error):
-    return render_template('error.html', 
-                          error_code=404,
-                          error_message="Page Not Found",
-                          error_description="The page you're looking for doesn't exist."), 404
+    return render_error_page(404, "Page Not Found",
+                             "The page you're looking for doesn't exist.")
 
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
-    return render_template('error.html', 
-                          error_code=500,
-                          error_message="Internal Server Error",
-                          error_description="Something went wrong on our end. Please try again later."), 500
+    return render_error_page(500, "Internal Server Error",
+                             "Something went wrong on our end. Please try again later.")
 
 @app.errorhandler(403)
 def forbidden(error):
-    return render_template('error.html', 
-                          error_code=403,
-                          error_message="Access Forbidden",
-                          error_description="You don't have permission to access this resource."), 403
\ No newline at end of file
+    return render_error_page(403, "Access Forbidden",
+                             "You don't have permission to access this resource.")
+
+@app.errorhandler(UserMovingError)
+def user_moving(error):
+    # Writes are refused for the few seconds a shard move takes
+    db.session.rollback()
+    if request.path.startswith('/api/'):
+        response = jsonify({'error': 'Your data is being moved, please retry shortly'})
+        response.status_code = 503
+    else:
+        response = make_response(render_error_page(503, "Temporarily Unavailable",
+                                                   "Your data is being moved. Please try again in a few seconds."))
+    response.headers['Retry-After'] = '5'
+    return response
\ No newline at end of file
@@ -0,0 +1,8 @@
+from mind import create_app
+from mind.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='127.0.0.1', port=5000)
\ No newline at end of file
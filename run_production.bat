@@ -4,6 +4,8 @@ echo.
 
 REM Set environment variables
 set DATABASE_URL=sqlite:///mindcare.db
+set SQLITE_JOURNAL_MODE=WAL
+set SQLITE_SYNCHRONOUS=NORMAL
 set SESSION_SECRET=mindcare-secret-key-2024-production
 set PYTHONPATH=%CD%
 set FLASK_ENV=production
@@ -0,0 +1,238 @@
+import re
+import logging
+from sqlalchemy import text, desc, func
+from sqlalchemy.exc import OperationalError
+
+from . import db
+from .models import JournalEntry, ArchivedJournalText
+from .archive import index_archived_journals
+from .sharding import using_shard
+
+# Full-text search over a user's journal entries.
+#
+# SQLite gets an FTS5 index (journal_search) that reads its text from
+# journal_entries and is kept in sync by triggers, so ORM writes, archive
+# moves and shard rebalancing all update it. The owning user id is an indexed
+# column of its own, which lets FTS5 intersect the user's posting list with
+# the query terms instead of scanning every match. Postgres uses a GIN index
+# over a weighted tsvector expression. Other databases fall back to a per-user
+# LIKE scan.
+#
+# Archiving keeps a copy of each journal entry's text in archived_journal_texts
+# with an index of its own, so archived entries are searched the same way and
+# only shown after the hot matches, without decompressing any segment.
+
+SQLITE_INDEXES = {'journal_search': [
+    """CREATE VIRTUAL TABLE journal_search USING fts5(
+        user_id, title, content, content='journal_entries', content_rowid='id'
+    )""",
+    """CREATE TRIGGER journal_search_insert AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_search(rowid, user_id, title, content)
+        VALUES (new.id, new.user_id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER journal_search_delete AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_search(journal_search, rowid, user_id, title, content)
+        VALUES ('delete', old.id, old.user_id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER journal_search_update AFTER UPDATE ON journal_entries BEGIN
+        INSERT INTO journal_search(journal_search, rowid, user_id, title, content)
+        VALUES ('delete', old.id, old.user_id, old.title, old.content);
+        INSERT INTO journal_search(rowid, user_id, title, content)
+        VALUES (new.id, new.user_id, new.title, new.content);
+    END""",
+    # Index whatever was written before search existed
+    "INSERT INTO journal_search(journal_search) VALUES ('rebuild')",
+], 'journal_archive_search': [
+    """CREATE VIRTUAL TABLE journal_archive_search USING fts5(
+        user_id, title, content, content='archived_journal_texts', content_rowid='id'
+    )""",
+    # Archived text is never updated, only copied away on shard moves
+    """CREATE TRIGGER journal_archive_search_insert AFTER INSERT ON archived_journal_texts BEGIN
+        INSERT INTO journal_archive_search(rowid, user_id, title, content)
+        VALUES (new.id, new.user_id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER journal_archive_search_delete AFTER DELETE ON archived_journal_texts BEGIN
+        INSERT INTO journal_archive_search(journal_archive_search, rowid, user_id, title, content)
+        VALUES ('delete', old.id, old.user_id, old.title, old.content);
+    END""",
+    "INSERT INTO journal_archive_search(journal_archive_search) VALUES ('rebuild')",
+]}
+
+# Full-text index of each searchable model on SQLite
+FTS5_TABLES = {JournalEntry: 'journal_search', ArchivedJournalText: 'journal_archive_search'}
+
+# Must match the indexed expression exactly for Postgres to use the index
+POSTGRES_DOCUMENT = ("setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                     "setweight(to_tsvector('english', content), 'B')")
+
+POSTGRES_STATEMENTS = [
+    f"CREATE INDEX IF NOT EXISTS ix_journal_entries_search ON journal_entries USING GIN (({POSTGRES_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_archived_journal_texts_search ON archived_journal_texts "
+    f"USING GIN (({POSTGRES_DOCUMENT}))",
+]
+
+_backends = {}
+
+
+def install_search(engine):
+    """Create the journal full-text index on one database, backfilling it once"""
+    dialect = engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return False
+    try:
+        with engine.begin() as conn:
+            if dialect == 'sqlite':
+                for name, statements in SQLITE_INDEXES.items():
+                    if not conn.exec_driver_sql(f"SELECT 1 FROM sqlite_master WHERE name = '{name}'").first():
+                        for statement in statements:
+                            conn.exec_driver_sql(statement)
+            else:
+                for statement in POSTGRES_STATEMENTS:
+                    conn.exec_driver_sql(statement)
+    except OperationalError as e:
+        logging.warning(f"Full-text index unavailable on {engine.url.database}, journal search will scan entries: {e}")
+        return False
+    finally:
+        _backends.pop(engine, None)
+    return True
+
+
+def init_search(app):
+    """Install the search index on every database holding journal entries"""
+    router = app.extensions.get('shard_router')
+    for engine in (router.engines if router is not None else [db.engine]):
+        # Segments archived before their text was kept for search
+        with engine.begin() as conn:
+            index_archived_journals(conn)
+        install_search(engine)
+
+
+def _backend(engine):
+    if engine not in _backends:
+        backend = None
+        if engine.dialect.name == 'postgresql':
+            backend = 'postgresql'
+        elif engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'journal_search'").first():
+                    backend = 'fts5'
+        _backends[engine] = backend
+    return _backends[engine]
+
+
+def search_terms(query):
+    """Lower-cased words of a search box query"""
+    return re.findall(r'\w+', query.lower())[:20]
+
+
+def _fts5_match(user_id, terms):
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the last one is a prefix so partially typed words still match
+    phrase = ' '.join(f'"{term}"' for term in terms) + '*'
+    return f'user_id : "{int(user_id)}" AND {{title content}} : ({phrase})'
+
+
+def _fts5_hits(model, user_id, terms, limit, offset):
+    index = FTS5_TABLES[model]
+    rows = db.session.execute(text(
+        f"SELECT rowid, bm25({index}, 0.0, 10.0, 1.0) AS score FROM {index} "
+        f"WHERE {index} MATCH :match ORDER BY score LIMIT :limit OFFSET :offset"
+    ), {'match': _fts5_match(user_id, terms), 'limit': limit, 'offset': offset}, bind_arguments={'mapper': model})
+    # bm25 is lower-is-better, flip it so scores read naturally
+    return [(row.rowid, -row.score) for row in rows]
+
+
+def _fts5_count(model, user_id, terms):
+    index = FTS5_TABLES[model]
+    return db.session.execute(text(f"SELECT COUNT(*) FROM {index} WHERE {index} MATCH :match"),
+                              {'match': _fts5_match(user_id, terms)}, bind_arguments={'mapper': model}).scalar()
+
+
+_POSTGRES_MATCH = f"user_id = :user_id AND ({POSTGRES_DOCUMENT}) @@ to_tsquery('english', :query)"
+
+
+def _postgres_hits(model, user_id, terms, limit, offset):
+    rows = db.session.execute(text(
+        f"SELECT id, ts_rank_cd({POSTGRES_DOCUMENT}, to_tsquery('english', :query)) AS score "
+        f"FROM {model.__tablename__} WHERE {_POSTGRES_MATCH} "
+        f"ORDER BY score DESC, created_at DESC LIMIT :limit OFFSET :offset"
+    ), {'query': ' & '.join(terms) + ':*', 'user_id': user_id, 'limit': limit, 'offset': offset},
+        bind_arguments={'mapper': model})
+    return [(row.id, float(row.score)) for row in rows]
+
+
+def _postgres_count(model, user_id, terms):
+    return db.session.execute(text(f"SELECT COUNT(*) FROM {model.__tablename__} WHERE {_POSTGRES_MATCH}"),
+                              {'query': ' & '.join(terms) + ':*', 'user_id': user_id},
+                              bind_arguments={'mapper': model}).scalar()
+
+
+def _scan_query(query, model, user_id, terms):
+    query = query.filter(model.user_id == user_id)
+    for term in terms:
+        # Words can contain '_', which LIKE would read as a wildcard
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(model.title.ilike(pattern, escape='\\') | model.content.ilike(pattern, escape='\\'))
+    return query
+
+
+def _scan_hits(model, user_id, terms, limit, offset):
+    query = _scan_query(db.session.query(model.id), model, user_id, terms)
+    rows = query.order_by(desc(model.created_at)).limit(limit).offset(offset).all()
+    return [(row.id, None) for row in rows]
+
+
+def _scan_count(model, user_id, terms):
+    return _scan_query(db.session.query(func.count(model.id)), model, user_id, terms).scalar()
+
+
+_HIT_FINDERS = {'fts5': _fts5_hits, 'postgresql': _postgres_hits, None: _scan_hits}
+
+# COUNT(*) over the same predicate as each backend's hit finder
+_HIT_COUNTERS = {'fts5': _fts5_count, 'postgresql': _postgres_count, None: _scan_count}
+
+
+def _serialize(entry, score):
+    archived = isinstance(entry, ArchivedJournalText)
+    return {
+        'id': entry.entry_id if archived else entry.id,
+        'title': entry.title,
+        'excerpt': (entry.content or '')[:200],
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+        'score': score,
+        'archived': archived
+    }
+
+
+def search_journals(user_id, query, page=1, per_page=20):
+    """One page of a user's journal entries matching a query, best matches first"""
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+    offset = (page - 1) * per_page
+
+    with using_shard(db.session, user_id):
+        engine = db.session.get_bind(mapper=JournalEntry)
+        backend = _backend(engine)
+        find_hits = _HIT_FINDERS[backend]
+        # One extra row tells us whether there is a next page without counting
+        hits = find_hits(JournalEntry, user_id, terms, per_page + 1, offset)
+        results = _load_hits(JournalEntry, hits)
+
+        # Archived entries follow the indexed matches
+        if len(hits) <= per_page:
+            hot_total = offset + len(hits) if hits or offset == 0 else \
+                _HIT_COUNTERS[backend](JournalEntry, user_id, terms)
+            start = max(0, offset - hot_total)
+            archived_hits = find_hits(ArchivedJournalText, user_id, terms, per_page + 1 - len(results), start)
+            results.extend(_load_hits(ArchivedJournalText, archived_hits))
+
+    return results[:per_page], len(results) > per_page
+
+
+def _load_hits(model, hits):
+    """Serialized rows for (id, score) hits, in hit order"""
+    if not hits:
+        return []
+    rows = {row.id: row for row in model.query.filter(model.id.in_([row_id for row_id, _ in hits]))}
+    return [_serialize(rows[row_id], score) for row_id, score in hits if row_id in rows]
\ No newline at end of file
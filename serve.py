@@ -0,0 +1,160 @@
+import gc
+import os
+import sys
+import signal
+import logging
+import threading
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+
+# Production entry point: a pre-forking gunicorn server.
+#
+#   python serve.py            # uvicorn workers serving run_asgi's app
+#   python serve.py --wsgi     # WSGI workers with threads (gthread)
+#
+# ASGI is the default because the live update streams are served from the
+# event loop there and cost no thread while idle. Under --wsgi every open
+# stream holds one of the WEB_THREADS threads, so a worker accepts at most
+# SSE_MAX_THREAD_STREAMS of them (half its threads by default) and answers
+# 503 past that.
+#
+# The master process builds the app and loads the analyzer models once, then
+# freezes the garbage collector so forked workers share those pages
+# copy-on-write instead of each holding its own copy of the weights. Workers
+# are recycled gracefully once their private (unshared) memory passes
+# WORKER_MAX_MEMORY_MB, and `kill -HUP <master>` starts fresh workers and
+# retires the old ones gracefully without dropping connections. To deploy new
+# code, send USR2 to start a new master next to the old one, then QUIT the old
+# master.
+#
+# Live update streams work with any number of workers: events published in one
+# worker are relayed to the streams held by the others through the database
+# (see broadcast.py).
+#
+# gunicorn needs a POSIX system; on Windows use run.py for development.
+
+
+def private_memory_mb():
+    """Memory this process does not share with the master, in MiB"""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            kib = sum(int(line.split()[1]) for line in smaps
+                      if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+        return kib / 1024.0
+    except OSError:
+        # Peak RSS also counts shared pages, so it overstates; still better than no limit
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def flask_app_of(app):
+    """The Flask app behind either the WSGI app or the ASGI wrapper"""
+    return getattr(app, 'flask_app', app)
+
+
+def dispose_inherited_connections(flask_app):
+    """Drop pooled connections opened by the master; a child must never reuse them"""
+    from mind import db
+    with flask_app.app_context():
+        engines = list(db.engines.values())
+    router = flask_app.extensions.get('shard_router')
+    if router is not None:
+        engines.extend(router.engines)
+    engines.extend(replica.engine for replica in flask_app.extensions.get('db_replicas', []))
+    for engine in engines:
+        engine.dispose(close=False)
+
+
+def when_ready(server):
+    # Everything loaded so far (app, models) moves to the permanent generation,
+    # so collections in the workers never touch and copy those pages
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded app frozen for sharing; starting {server.cfg.workers} workers")
+
+
+def post_fork(server, worker):
+    dispose_inherited_connections(flask_app_of(server.app.wsgi()))
+
+
+def post_worker_init(worker):
+    # Warm the models up before this worker accepts its first connection
+    from mind.ai_analyzer import mood_analyzer
+    mood_analyzer.warm_up()
+
+    # Not started in the master (see load), so each worker screens pending posts itself
+    from mind.moderation import moderation_worker
+    moderation_worker.start()
+
+    limit = float(os.environ.get('WORKER_MAX_MEMORY_MB', 0))
+    if limit <= 0:
+        return
+    interval = float(os.environ.get('WORKER_MEMORY_CHECK_SECONDS', 10))
+
+    def watch():
+        stopped = threading.Event()
+        while not stopped.wait(interval):
+            used = private_memory_mb()
+            if used > limit:
+                worker.log.warning(f"Worker {worker.pid} uses {used:.0f} MiB of private memory "
+                                   f"(limit {limit:.0f} MiB), recycling it")
+                # The same signal the master sends for a graceful stop: finish in-flight requests, then exit
+                os.kill(worker.pid, signal.SIGTERM)
+                return
+
+    threading.Thread(target=watch, name='memory-watchdog', daemon=True).start()
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, options, asgi=False):
+        self.options = options
+        self.asgi = asgi
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from mind import create_app
+        # Background threads must not be running when the master forks
+        os.environ['MODERATION_AUTOSTART'] = '0'
+        app = create_app()
+        if self.asgi:
+            from mind.asgi import create_asgi_app
+            return create_asgi_app(app)
+        return app
+
+
+def options_from_env(asgi=False):
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+    options = {
+        'bind': os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}"),
+        'workers': workers,
+        'threads': int(os.environ.get('WEB_THREADS', 4)),
+        'worker_class': 'uvicorn.workers.UvicornWorker' if asgi else 'gthread',
+        # Load the app and models in the master so workers share them
+        'preload_app': True,
+        'timeout': int(os.environ.get('WORKER_TIMEOUT', 60)),
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', 30)),
+        'keepalive': int(os.environ.get('KEEPALIVE_SECONDS', 5)),
+        # Optional request-count recycling, jittered so workers do not restart together
+        'max_requests': int(os.environ.get('MAX_REQUESTS', 0)),
+        'max_requests_jitter': int(os.environ.get('MAX_REQUESTS_JITTER', 0)),
+        'when_ready': when_ready,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'accesslog': os.environ.get('ACCESS_LOG', '-'),
+        'loglevel': os.environ.get('LOG_LEVEL', 'info'),
+    }
+    if os.path.isdir('/dev/shm'):
+        # Heartbeat files on disk can stall workers when the disk is slow
+        options['worker_tmp_dir'] = '/dev/shm'
+    return options
+
+
+if __name__ == '__main__':
+    asgi = '--wsgi' not in sys.argv[1:]
+    logging.info(f"Starting production server ({'ASGI' if asgi else 'WSGI'})")
+    ProductionServer(options_from_env(asgi), asgi=asgi).run()
\ No newline at end of file
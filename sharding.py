@@ -0,0 +1,329 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from flask import current_app, has_request_context
+from flask_login import current_user
+from sqlalchemy import MetaData, create_engine, select, delete, insert, text
+from sqlalchemy.orm import Session
+
+# Horizontal sharding of per-user data.
+#
+# Rows that belong to a single user live on one of the databases listed in
+# DATABASE_SHARD_URLS; users, community posts and the shard directory stay on
+# the primary. A user is placed on shard `user_id % N` unless the directory
+# (user_shards) says otherwise, which is how rebalanced users are tracked.
+# Sharding is off when no shard URLs are configured.
+#
+# Moving a user (move_user) first fences them in user_moves: once every
+# process has re-read the directory, writes to the user's tables are refused
+# with UserMovingError, so the rows copied under the source's write lock are
+# final. The directory is flipped and the fence lifted together, and the source
+# rows are only deleted if they are still exactly what was copied.
+
+SHARDED_TABLES = ['mood_entries', 'journal_entries', 'emergency_alerts', 'post_reactions', 'user_data_versions',
+                  'archive_segments', 'change_log', 'journal_sentences', 'archived_journal_texts']
+
+# Foreign keys that point at other sharded rows and must be remapped on moves
+SHARD_REFERENCES = {
+    'emergency_alerts': {'mood_entry_id': 'mood_entries'},
+    'journal_sentences': {'journal_entry_id': 'journal_entries'},
+    'archived_journal_texts': {'segment_id': 'archive_segments'},
+}
+
+# Rows whose id column points at whichever sharded table another column names
+SHARD_ENTITY_REFERENCES = {
+    'change_log': ('entity', 'entity_id'),
+}
+
+
+class ShardingError(Exception):
+    """Raised when a sharded table is queried without a user to route by"""
+
+
+class UserMovingError(ShardingError):
+    """Raised when a user's rows are written while they are being moved to another shard"""
+
+
+class ShardRouter:
+    def __init__(self, primary, engines, directory_table, moves_table=None, directory_ttl=5.0):
+        self.primary = primary
+        self.engines = engines
+        self.directory = directory_table
+        self.moves = moves_table
+        self.directory_ttl = directory_ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def default_shard(self, user_id):
+        return user_id % len(self.engines)
+
+    def _lookup(self, user_id):
+        """(shard index, move in progress) for a user, cached for directory_ttl seconds"""
+        now = time.monotonic()
+        cached = self._cache.get(user_id)
+        if cached and cached[2] > now:
+            return cached[0], cached[1]
+
+        with self.primary.connect() as conn:
+            shard = conn.execute(
+                select(self.directory.c.shard).where(self.directory.c.user_id == user_id)
+            ).scalar()
+            moving = self.moves is not None and conn.execute(
+                select(self.moves.c.user_id).where(self.moves.c.user_id == user_id)
+            ).first() is not None
+        if shard is None or shard >= len(self.engines):
+            shard = self.default_shard(user_id)
+
+        with self._lock:
+            self._cache[user_id] = (shard, moving, now + self.directory_ttl)
+        return shard, moving
+
+    def shard_for(self, user_id):
+        """Shard index holding a user's data, cached for directory_ttl seconds"""
+        return self._lookup(user_id)[0]
+
+    def check_writable(self, user_id):
+        if self._lookup(user_id)[1]:
+            raise UserMovingError(f'User {user_id} is being moved to another shard')
+
+    def cached_shard(self, user_id):
+        """Shard index from the directory cache without touching the database, None on a miss"""
+        cached = self._cache.get(user_id)
+        if cached and cached[2] > time.monotonic():
+            return cached[0]
+        return None
+
+    def engine_for(self, user_id):
+        return self.engines[self.shard_for(user_id)]
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+
+def get_router():
+    return current_app.extensions.get('shard_router')
+
+
+def shard_index_for(user_id):
+    """Shard number holding a user's data, None when sharding is off"""
+    router = get_router()
+    return router.shard_for(user_id) if router is not None else None
+
+
+def routed_user_id(session):
+    """User whose shard a session's per-user queries should go to"""
+    user_id = session.info.get('shard_user_id')
+    if user_id is None and has_request_context() and current_user.is_authenticated:
+        user_id = current_user.id
+    if user_id is None:
+        raise ShardingError('Per-user tables need a logged-in user or using_shard()')
+    return user_id
+
+
+@contextmanager
+def using_shard(session, user_id):
+    """Route a session's per-user queries to another user's shard"""
+    previous = session.info.get('shard_user_id')
+    session.info['shard_user_id'] = user_id
+    try:
+        yield session
+    finally:
+        session.info['shard_user_id'] = previous
+
+
+def shard_sessions(db):
+    """(shard index, session) pairs covering every database with per-user data"""
+    router = get_router()
+    if router is None:
+        return [(None, db.session)]
+    return [(index, Session(bind=engine)) for index, engine in enumerate(router.engines)]
+
+
+def shard_metadata(metadata):
+    """Copy of the sharded tables without foreign keys into the primary"""
+    shard_md = MetaData()
+    for name in SHARDED_TABLES:
+        metadata.tables[name].to_metadata(shard_md)
+    for table in shard_md.tables.values():
+        for constraint in list(table.foreign_key_constraints):
+            table.constraints.discard(constraint)
+        for column in table.columns:
+            column.foreign_keys.clear()
+        table.foreign_keys.clear()
+    return shard_md
+
+
+def init_sharding(app, db, engine_options_for, on_engine_created=None):
+    """Create shard engines and tables when DATABASE_SHARD_URLS is set"""
+    urls = app.config.get('SQLALCHEMY_SHARD_URIS', [])
+    if not urls:
+        app.extensions['shard_router'] = None
+        return None
+
+    from .models import UserShard, UserMove
+    engines = []
+    shard_md = shard_metadata(db.metadata)
+    for url in urls:
+        engine = create_engine(url, **engine_options_for(url))
+        if on_engine_created:
+            on_engine_created(engine)
+        shard_md.create_all(engine)
+        engines.append(engine)
+
+    router = ShardRouter(db.engine, engines, UserShard.__table__, UserMove.__table__,
+                         directory_ttl=app.config.get('SHARD_DIRECTORY_TTL', 5.0))
+    app.extensions['shard_router'] = router
+    app.extensions['shard_metadata'] = shard_md
+    logging.info(f"Per-user data sharded across {len(engines)} database(s)")
+    return router
+
+
+def _lock_for_cutover(conn, tables):
+    """Block writers on the source shard while the final copy runs"""
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+    elif conn.dialect.name == 'postgresql':
+        names = ', '.join(table.name for table in tables)
+        conn.execute(text(f'LOCK TABLE {names} IN SHARE ROW EXCLUSIVE MODE'))
+
+
+def _copy_user_rows(source, target, tables, user_id, id_maps):
+    """Copy one user's rows, giving them fresh ids on the target shard"""
+    for table in tables:
+        query = select(table).where(table.c.user_id == user_id)
+        has_id = 'id' in table.c and table.c.id.primary_key
+        if has_id:
+            query = query.order_by(table.c.id)
+        mapping = id_maps.setdefault(table.name, {})
+        for row in source.execute(query).mappings():
+            values = dict(row)
+            if 'version' in values and not has_id:
+                # Force fresh fragment cache keys on the new shard
+                values['version'] = (values['version'] or 0) + 1
+            for column, referenced in SHARD_REFERENCES.get(table.name, {}).items():
+                if values.get(column) is not None:
+                    values[column] = id_maps.get(referenced, {}).get(values[column], values[column])
+            if table.name in SHARD_ENTITY_REFERENCES:
+                entity_column, id_column = SHARD_ENTITY_REFERENCES[table.name]
+                if values.get(id_column) is not None:
+                    new_id = id_maps.get(values[entity_column], {}).get(values[id_column])
+                    if new_id is None:
+                        # Points at a row that no longer exists, whose old id may be reused on the target
+                        continue
+                    values[id_column] = new_id
+            if has_id:
+                old_id = values.pop('id')
+                mapping[old_id] = target.execute(insert(table).values(**values)).inserted_primary_key[0]
+            else:
+                target.execute(delete(table).where(table.c.user_id == user_id))
+                target.execute(insert(table).values(**values))
+
+
+def _user_rows_fingerprint(conn, tables, user_id):
+    """Hash of every row a user has on a shard, to tell whether anything changed since the copy"""
+    fingerprint = {}
+    for table in tables:
+        rows = conn.execute(select(table).where(table.c.user_id == user_id)
+                            .order_by(*table.primary_key.columns)).all()
+        fingerprint[table.name] = hash(tuple(tuple(row) for row in rows))
+    return fingerprint
+
+
+def _delete_user_rows(conn, tables, user_id):
+    for table in reversed(tables):
+        conn.execute(delete(table).where(table.c.user_id == user_id))
+
+
+def _mark_sync_reset(connection, metadata, user_id):
+    """Entry ids change on the new shard, so delta-sync clients have to start over"""
+    versions, log = metadata.tables['user_data_versions'], metadata.tables['change_log']
+    seq = connection.execute(select(versions.c.version).where(versions.c.user_id == user_id)).scalar()
+    if seq is not None:
+        connection.execute(insert(log).values(user_id=user_id, seq=seq, entity='*', op='reset',
+                                              changed_at=datetime.utcnow()))
+
+
+def move_user(app, user_id, target_shard):
+    """Move a user's rows to another shard while the app keeps serving traffic"""
+    router = app.extensions.get('shard_router')
+    if router is None:
+        raise ShardingError('Sharding is not enabled')
+    if not 0 <= target_shard < len(router.engines):
+        raise ShardingError(f'No shard {target_shard}')
+
+    from .models import UserShard, UserMove
+    directory, moves = UserShard.__table__, UserMove.__table__
+    router.invalidate(user_id)
+    source_shard = router.shard_for(user_id)
+    if source_shard == target_shard:
+        return 0
+
+    tables = [app.extensions['shard_metadata'].tables[name] for name in SHARDED_TABLES]
+    source_engine, target_engine = router.engines[source_shard], router.engines[target_shard]
+    id_maps = {}
+
+    # Fence the user; a fence left behind by an interrupted move is simply replaced
+    with router.primary.begin() as primary:
+        primary.execute(delete(moves).where(moves.c.user_id == user_id))
+        primary.execute(insert(moves).values(user_id=user_id, target_shard=target_shard,
+                                             started_at=datetime.utcnow()))
+    router.invalidate(user_id)
+    try:
+        # Every process re-reads the directory within one TTL and from then on refuses the user's writes
+        time.sleep(router.directory_ttl)
+
+        # The source's write lock waits for writes that were already under way
+        with source_engine.connect() as source, target_engine.connect() as target:
+            _lock_for_cutover(source, tables)
+            _copy_user_rows(source, target, tables, user_id, id_maps)
+            _mark_sync_reset(target, app.extensions['shard_metadata'], user_id)
+            fingerprint = _user_rows_fingerprint(source, tables, user_id)
+            target.commit()
+            try:
+                _remap_vector_index(app, user_id, id_maps.get('journal_entries', {}))
+                with router.primary.begin() as primary:
+                    primary.execute(delete(directory).where(directory.c.user_id == user_id))
+                    primary.execute(insert(directory).values(user_id=user_id, shard=target_shard))
+                    primary.execute(delete(moves).where(moves.c.user_id == user_id))
+            except Exception:
+                # The directory still points at the source, so the copy must not linger on the target
+                _delete_user_rows(target, tables, user_id)
+                target.commit()
+                raise
+            source.rollback()
+    except Exception:
+        with router.primary.begin() as primary:
+            primary.execute(delete(moves).where(moves.c.user_id == user_id))
+        router.invalidate(user_id)
+        raise
+    router.invalidate(user_id)
+    logging.info(f"User {user_id} moved from shard {source_shard} to shard {target_shard}")
+
+    # Processes with the old directory entry cached keep reading the source for up to
+    # one TTL (their writes stay refused until they re-read it), then it can go
+    time.sleep(router.directory_ttl)
+    with source_engine.connect() as source:
+        _lock_for_cutover(source, tables)
+        if _user_rows_fingerprint(source, tables, user_id) != fingerprint:
+            source.rollback()
+            logging.error(f"User {user_id}'s rows on shard {source_shard} changed during the move; "
+                          f"they were left in place for review")
+        else:
+            _delete_user_rows(source, tables, user_id)
+            source.commit()
+
+    return sum(len(mapping) for mapping in id_maps.values())
+
+
+def _remap_vector_index(app, user_id, journal_ids):
+    """Rewrite the user's similar-entry index for the journal ids assigned on the new shard"""
+    from .vector_index import vector_index
+    if vector_index.directory is None:
+        return
+    vector_index.remap(user_id, journal_ids)
\ No newline at end of file
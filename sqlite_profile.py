@@ -0,0 +1,145 @@
+import os
+import logging
+import time
+import threading
+import weakref
+from sqlalchemy import event
+
+# Production profile for SQLite databases.
+#
+# Every pooled connection is switched to WAL journaling with tuned pragmas,
+# and write transactions open with BEGIN IMMEDIATE so they take the database
+# write lock up front instead of failing half way through. Inside one process
+# writers are additionally queued on a lock per engine, so threads wait their
+# turn instead of spinning on SQLite's busy handler. The lock is taken by the
+# connection when it runs its first INSERT/UPDATE/DELETE, whether that comes
+# from a session flush, session.execute() or a Core engine.begin() block, and
+# released when the connection's transaction commits or rolls back.
+#
+# The lock is a semaphore so that any thread can release it: the pool may hand
+# a connection back on another thread than the one that wrote. Reentrancy is
+# tracked per thread, so a second connection opened by the thread holding the
+# lock goes straight on to SQLite (whose busy timeout then applies) instead of
+# waiting for itself forever. Acquiring gives up after SQLITE_WRITE_LOCK_TIMEOUT_MS.
+# Transactions that keep it longer than that are logged: do slow work (model
+# calls, I/O) before the first write, not between the write and the commit.
+
+_write_locks = weakref.WeakKeyDictionary()
+
+
+class WriteLock:
+    """A one-writer lock that any thread may release, reentrant for the thread holding it"""
+
+    def __init__(self):
+        self._semaphore = threading.Semaphore(1)
+        self._guard = threading.Lock()
+        self._local = threading.local()
+
+    def acquire(self, timeout):
+        """Take the lock (or nest in this thread's hold); returns the hold, or None on timeout"""
+        hold = getattr(self._local, 'hold', None)
+        with self._guard:
+            if hold is not None and hold['depth'] > 0:
+                hold['depth'] += 1
+                return hold
+        if not self._semaphore.acquire(timeout=timeout):
+            return None
+        hold = self._local.hold = {'depth': 1}
+        return hold
+
+    def release(self, hold):
+        """Drop one level of a hold, from any thread, freeing the lock at the outermost"""
+        with self._guard:
+            hold['depth'] -= 1
+            if hold['depth'] > 0:
+                return
+        self._semaphore.release()
+
+_WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'BEGIN IMMEDIATE')
+
+def sqlite_settings_from_env():
+    """Pragma settings for the SQLite profile, overridable from the environment"""
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        # Negative values are KiB rather than pages
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+        # How long a writer waits for the in-process write lock before going on to SQLite's own locking
+        'write_lock_timeout': int(os.environ.get('SQLITE_WRITE_LOCK_TIMEOUT_MS',
+                                                 os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+    }
+
+def sqlite_engine_options(settings, options=None):
+    """Engine options for a file-backed SQLite database"""
+    options = dict(options or {})
+    connect_args = dict(options.get('connect_args', {}))
+    connect_args.setdefault('timeout', settings['busy_timeout'] / 1000.0)
+    # Writes open with BEGIN IMMEDIATE; plain reads stay outside transactions
+    connect_args.setdefault('isolation_level', 'IMMEDIATE')
+    connect_args.setdefault('check_same_thread', False)
+    options['connect_args'] = connect_args
+    return options
+
+def install_sqlite_profile(engine, settings):
+    """Apply pragmas on every new connection and serialize in-process writers"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    in_memory = engine.url.database in (None, '', ':memory:')
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory:
+                cursor.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+            cursor.execute(f"PRAGMA synchronous={settings['synchronous']}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout'])}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+            cursor.execute(f"PRAGMA cache_size={int(settings['cache_size'])}")
+            cursor.execute(f"PRAGMA temp_store={settings['temp_store']}")
+        finally:
+            cursor.close()
+
+    lock = _write_locks[engine] = WriteLock()
+    timeout = settings.get('write_lock_timeout', settings['busy_timeout']) / 1000.0
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _acquire_write_lock(conn, cursor, statement, parameters, context, executemany):
+        if 'sqlite_write_lock' in conn.info:
+            return
+        head = statement.lstrip()[:15].upper()
+        if not head.startswith(_WRITE_VERBS):
+            return
+        hold = lock.acquire(timeout)
+        if hold is None:
+            logging.warning(f"Waited {timeout:.1f}s for the write lock on {engine.url.database}; "
+                            f"continuing with SQLite's busy timeout")
+        conn.info['sqlite_write_lock'] = (hold, time.monotonic())
+
+    def _release_write_lock(info):
+        held = info.pop('sqlite_write_lock', None)
+        if held is None:
+            return
+        hold, since = held
+        if hold is None:
+            return
+        held_for = time.monotonic() - since
+        if held_for > timeout:
+            logging.warning(f"A transaction held the write lock on {engine.url.database} for {held_for:.1f}s")
+        lock.release(hold)
+
+    @event.listens_for(engine, 'commit')
+    @event.listens_for(engine, 'rollback')
+    def _transaction_ended(conn):
+        _release_write_lock(conn.info)
+
+    @event.listens_for(engine, 'checkin')
+    def _connection_returned(dbapi_connection, connection_record):
+        # Safety net for connections returned to the pool without an explicit commit or rollback
+        _release_write_lock(connection_record.info)
+
+    logging.info(f"SQLite profile enabled for {engine.url.database}: {settings}")
\ No newline at end of file
@@ -0,0 +1,9 @@
+// Add some interactive effects
+document.addEventListener('DOMContentLoaded', function() {
+    // Floating animation for cards
+    const cards = document.querySelectorAll('.mood-card, .glass-card');
+    cards.forEach((card, index) => {
+        card.style.animationDelay = `${index * 0.1}s`;
+        card.style.animation = 'float 6s ease-in-out infinite';
+    });
+});
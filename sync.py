@@ -0,0 +1,179 @@
+import base64
+import binascii
+import logging
+from datetime import datetime
+from sqlalchemy import event, select, insert, delete, exists
+
+from . import db
+from .models import MoodEntry, JournalEntry, ChangeLog
+from .sharding import using_shard, shard_sessions
+from .fragment_cache import bump_data_version
+
+# Delta sync for mobile and offline clients.
+#
+# Every insert, update or delete of a mood or journal entry bumps the owner's
+# data version (see fragment_cache.py) and writes a change_log row stamped
+# with the new version, in the same transaction. Older log rows for the same
+# entry are dropped, so the log holds one row per entry (a tombstone once it
+# is deleted) and a client that syncs from scratch reads O(entries) rows,
+# while one that polls with a cursor reads only what changed since.
+#
+# Cursors are opaque to clients. When a user is moved to another shard their
+# entry ids change, so the move leaves a 'reset' marker behind and clients
+# holding an older cursor are told to drop their copy and start over.
+#
+# Archived entries are not part of delta sync. Archiving (archive.py) drops an
+# entry's log row along with the row itself and sends no tombstone, so clients
+# keep what they already have, but a client syncing from scratch only receives
+# entries newer than ARCHIVE_AFTER_DAYS. Older ones are read through the
+# history views and /api/mood-data, which include the archive.
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+RESET = 'reset'
+
+SYNCED_MODELS = {'mood': MoodEntry, 'journal': JournalEntry}
+_TABLE_KINDS = {model.__tablename__: kind for kind, model in SYNCED_MODELS.items()}
+
+
+def record_change(connection, target, op, seq):
+    """Log the latest change to a mood or journal entry, replacing its previous row"""
+    table = ChangeLog.__table__
+    entity = target.__tablename__
+    connection.execute(delete(table).where(
+        table.c.user_id == target.user_id, table.c.entity == entity, table.c.entity_id == target.id
+    ))
+    connection.execute(insert(table).values(
+        user_id=target.user_id, seq=seq, entity=entity, entity_id=target.id, op=op, changed_at=datetime.utcnow()
+    ))
+
+
+@event.listens_for(MoodEntry, 'after_insert')
+@event.listens_for(JournalEntry, 'after_insert')
+@event.listens_for(MoodEntry, 'after_update')
+@event.listens_for(JournalEntry, 'after_update')
+def _entry_saved(mapper, connection, target):
+    record_change(connection, target, UPSERT, bump_data_version(connection, target.user_id))
+
+
+@event.listens_for(MoodEntry, 'after_delete')
+@event.listens_for(JournalEntry, 'after_delete')
+def _entry_deleted(mapper, connection, target):
+    record_change(connection, target, DELETE, bump_data_version(connection, target.user_id))
+
+
+def encode_cursor(user_id, seq):
+    return base64.urlsafe_b64encode(f'{user_id}:{seq}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, user_id):
+    """Sequence number behind a cursor, 0 for none, or None when it is not usable"""
+    if not cursor:
+        return 0
+    try:
+        owner, seq = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+        owner, seq = int(owner), int(seq)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    return seq if owner == user_id and seq >= 0 else None
+
+
+def serialize_entry(kind, entry):
+    created_at = entry.created_at.isoformat() if entry.created_at else None
+    if kind == 'mood':
+        return {
+            'created_at': created_at,
+            'mood_score': entry.mood_score,
+            'mood_text': entry.mood_text,
+            'voice_analysis_score': entry.voice_analysis_score,
+            'sentiment': entry.ai_sentiment,
+            'emotions': entry.emotions_detected.split(',') if entry.emotions_detected else [],
+            'emergency_flagged': bool(entry.is_emergency_flagged)
+        }
+    return {
+        'created_at': created_at,
+        'title': entry.title,
+        'content': entry.content,
+        'mood_tags': entry.mood_tags,
+        'sentiment_score': entry.sentiment_score
+    }
+
+
+def changes_since(user_id, cursor, limit=200):
+    """One page of a user's changes after a cursor, oldest first"""
+    seq = decode_cursor(cursor, user_id)
+    reset = seq is None
+    seq = seq or 0
+
+    with using_shard(db.session, user_id):
+        if seq:
+            reset = db.session.execute(select(ChangeLog.id).where(
+                ChangeLog.user_id == user_id, ChangeLog.op == RESET, ChangeLog.seq > seq
+            ).limit(1)).first() is not None
+            if reset:
+                seq = 0
+
+        rows = db.session.execute(
+            select(ChangeLog).where(ChangeLog.user_id == user_id, ChangeLog.seq > seq)
+            .order_by(ChangeLog.seq).limit(limit + 1)
+        ).scalars().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # One IN lookup per entry type for everything that still exists
+        entries = {}
+        for kind, model in SYNCED_MODELS.items():
+            wanted = [row.entity_id for row in rows if row.entity == model.__tablename__ and row.op == UPSERT]
+            if wanted:
+                entries[kind] = {entry.id: entry for entry in model.query.filter(model.user_id == user_id,
+                                                                                 model.id.in_(wanted))}
+
+    changes = []
+    for row in rows:
+        kind = _TABLE_KINDS.get(row.entity)
+        if kind is None:
+            continue
+        if row.op == DELETE:
+            changes.append({'type': kind, 'id': row.entity_id, 'deleted': True})
+            continue
+        entry = entries.get(kind, {}).get(row.entity_id)
+        if entry is not None:
+            changes.append({'type': kind, 'id': row.entity_id, 'data': serialize_entry(kind, entry)})
+
+    return {
+        'cursor': encode_cursor(user_id, rows[-1].seq if rows else seq),
+        'reset': reset,
+        'has_more': has_more,
+        'changes': changes
+    }
+
+
+def backfill_change_log(app):
+    """Log entries saved before delta sync existed, so fresh clients receive them"""
+    log = ChangeLog.__table__
+    logged = 0
+
+    with app.app_context():
+        for shard, session in shard_sessions(db):
+            try:
+                for model in SYNCED_MODELS.values():
+                    table = model.__table__
+                    missing = session.execute(
+                        select(table.c.user_id, table.c.id).where(~exists().where(
+                            log.c.user_id == table.c.user_id, log.c.entity == table.name, log.c.entity_id == table.c.id
+                        )).order_by(table.c.user_id, table.c.id)
+                    ).all()
+                    connection = session.connection(bind_arguments={'mapper': ChangeLog})
+                    for user_id, entry_id in missing:
+                        connection.execute(insert(log).values(
+                            user_id=user_id, seq=bump_data_version(connection, user_id), entity=table.name,
+                            entity_id=entry_id, op=UPSERT, changed_at=datetime.utcnow()
+                        ))
+                    session.commit()
+                    logged += len(missing)
+            finally:
+                if shard is not None:
+                    session.close()
+
+    logging.info(f"Added {logged} existing entries to the change log")
+    return logged
\ No newline at end of file
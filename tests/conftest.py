@@ -0,0 +1,55 @@
+import os
+import sys
+import pytest
+from flask import Flask
+
+# The checkout is the `mind` package itself, so tests import it from the directory above:
+#
+#   cd .. && python -m pytest mind/tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from mind import db
+from mind.sharding import init_sharding
+
+
+def make_app(**config):
+    """A bare app over in-memory SQLite: models and tables, without the routes or the models' weights"""
+    app = Flask('mind')
+    app.config.update(SECRET_KEY='test', TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite://', **config)
+    db.init_app(app)
+    with app.app_context():
+        # Modules whose listeners the routes would have registered
+        from mind import models, sync, heatmap  # noqa: F401
+        db.create_all()
+        init_sharding(app, db, lambda uri: {})
+    return app
+
+
+@pytest.fixture
+def app():
+    app = make_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def sharded_app(tmp_path):
+    # Shards are files so a move can hold connections to both at once
+    app = make_app(SQLALCHEMY_SHARD_URIS=[f'sqlite:///{tmp_path}/shard0.db', f'sqlite:///{tmp_path}/shard1.db'],
+                   SHARD_DIRECTORY_TTL=0)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        for engine in app.extensions['shard_router'].engines:
+            engine.dispose()
+
+
+@pytest.fixture
+def user(app):
+    from mind.models import User
+    user = User(username='alice', email='alice@example.com')
+    user.set_password('correct horse')
+    db.session.add(user)
+    db.session.commit()
+    return user
\ No newline at end of file
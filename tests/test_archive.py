@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from mind import db
+from mind.archive import archive_old_entries, entries_between, recent_entries
+from mind.models import MoodEntry, JournalEntry, EmergencyAlert, ArchiveSegment, ArchivedJournalText
+
+
+def days_ago(days):
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def test_old_rows_move_to_segments_and_still_read_back(app, user):
+    db.session.add_all([JournalEntry(user_id=user.id, title=f'Entry {age}', content='Notes', created_at=days_ago(age))
+                        for age in (400, 300, 10, 1)])
+    db.session.commit()
+
+    assert archive_old_entries(app, 30) == 2
+    assert JournalEntry.query.count() == 2
+    assert ArchiveSegment.query.filter_by(kind='journal').count() == 1
+    # Searchable copies of the archived text
+    assert ArchivedJournalText.query.count() == 2
+
+    entries = entries_between(JournalEntry, user.id)
+    assert [entry.title for entry in entries] == ['Entry 400', 'Entry 300', 'Entry 10', 'Entry 1']
+    assert [getattr(entry, 'is_archived', False) for entry in entries] == [True, True, False, False]
+
+
+def test_recent_entries_only_reach_into_the_archive_when_needed(app, user):
+    db.session.add_all([JournalEntry(user_id=user.id, title=f'Entry {age}', content='Notes', created_at=days_ago(age))
+                        for age in (400, 300, 2, 1)])
+    db.session.commit()
+    archive_old_entries(app, 30)
+
+    assert [entry.title for entry in recent_entries(JournalEntry, user.id, 2)] == ['Entry 1', 'Entry 2']
+    assert [entry.title for entry in recent_entries(JournalEntry, user.id, 3)] == ['Entry 1', 'Entry 2', 'Entry 300']
+
+
+def test_alerted_checkins_stay_hot(app, user):
+    alerted = MoodEntry(user_id=user.id, mood_score=1, created_at=days_ago(400))
+    db.session.add_all([alerted, MoodEntry(user_id=user.id, mood_score=5, created_at=days_ago(400))])
+    db.session.flush()
+    db.session.add(EmergencyAlert(user_id=user.id, mood_entry_id=alerted.id, alert_type='keyword',
+                                  alert_content='Emergency keywords detected'))
+    db.session.commit()
+
+    assert archive_old_entries(app, 30) == 1
+    assert [entry.id for entry in MoodEntry.query] == [alerted.id]
+    assert len(entries_between(MoodEntry, user.id, since=days_ago(500))) == 2
\ No newline at end of file
@@ -0,0 +1,63 @@
+import asyncio
+from flask import session
+from sqlalchemy.engine import make_url
+
+from mind.asgi import AsgiApp, async_url, wsgi_environ
+from mind.sqlite_profile import sqlite_settings_from_env
+
+
+def http_scope(path, headers=()):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': list(headers)}
+
+
+def call(asgi_app, scope):
+    sent = []
+    requests = [{'type': 'http.request', 'body': b''}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asyncio.wait_for(asgi_app(scope, receive, send), 5))
+    body = b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+    return sent[0]['status'], dict(sent[0]['headers']), body
+
+
+def test_async_urls_keep_the_database():
+    assert str(async_url(make_url('sqlite:////tmp/mind.db'))) == 'sqlite+aiosqlite:////tmp/mind.db'
+    assert async_url(make_url('postgresql://db/mind')).drivername == 'postgresql+asyncpg'
+
+
+def test_repeated_headers_are_joined():
+    environ = wsgi_environ(http_scope('/', [(b'cookie', b'a=1'), (b'cookie', b'b=2'), (b'content-type', b'text/plain')]), b'')
+    assert environ['HTTP_COOKIE'] == 'a=1; b=2'
+    assert environ['CONTENT_TYPE'] == 'text/plain'
+
+
+def test_other_routes_are_served_by_flask(app):
+    app.config['SQLITE_SETTINGS'] = sqlite_settings_from_env()
+
+    @app.route('/hello')
+    def hello():
+        return 'hello from flask'
+
+    status, headers, body = call(AsgiApp(app), http_scope('/hello'))
+    assert (status, body) == (200, b'hello from flask')
+
+
+def test_session_cookie_is_read_like_flask_does(app):
+    app.config['SQLITE_SETTINGS'] = sqlite_settings_from_env()
+
+    @app.route('/login-as/<int:user_id>')
+    def login_as(user_id):
+        session['_user_id'] = str(user_id)
+        return ''
+
+    cookie = app.test_client().get('/login-as/7').headers['Set-Cookie'].split(';')[0]
+    asgi_app = AsgiApp(app)
+    assert asgi_app.load_session(http_scope('/', [(b'cookie', cookie.encode())]))['_user_id'] == '7'
+    assert asgi_app.load_session(http_scope('/', [(b'cookie', cookie.encode() + b'x')])) == {}
\ No newline at end of file
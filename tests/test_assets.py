@@ -0,0 +1,28 @@
+import gzip
+from flask import Flask
+
+from mind.assets import build_assets, init_assets
+
+
+def test_built_assets_are_fingerprinted_and_precompressed(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    (static / 'css' / 'app.css').write_text('body { color: teal; }')
+
+    manifest = build_assets(str(static))
+    fingerprinted = manifest['css/app.css']
+    assert fingerprinted.startswith('css/app.') and fingerprinted.endswith('.css')
+
+    app = Flask(__name__, static_folder=str(static))
+    asset_url = init_assets(app)
+    with app.test_request_context():
+        url = asset_url('css/app.css')
+        assert url == f'/assets/{fingerprinted}'
+        assert asset_url('css/other.css') == '/static/css/other.css'
+
+    client = app.test_client()
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.data) == b'body { color: teal; }'
+    assert client.get('/assets/../static/css/app.css').status_code == 404
\ No newline at end of file
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, func, insert
+
+from mind import db
+from mind.broadcast import BroadcastHub, EventRelay, StreamSlots, HubFull, sse_stream
+from mind.models import BroadcastEvent
+
+
+def test_published_events_reach_every_listener():
+    hub = BroadcastHub()
+    first, second = hub.subscribe('community'), hub.subscribe('community')
+    other = hub.subscribe('triage')
+    hub.publish('community', 'post', {'id': 1})
+    assert first.get(0) == second.get(0) == {'id': 1, 'event': 'post', 'data': {'id': 1}}
+    assert other.get(0) is None
+
+
+def test_subscriber_limit():
+    hub = BroadcastHub(max_subscribers=1)
+    subscription = hub.subscribe('community')
+    with pytest.raises(HubFull):
+        hub.subscribe('community')
+    subscription.close()
+    hub.subscribe('community')
+
+
+def test_slow_listener_is_told_to_resync():
+    hub = BroadcastHub(max_queue=2)
+    subscription = hub.subscribe('community')
+    for post_id in range(3):
+        hub.publish('community', 'post', {'id': post_id})
+    assert subscription.get(0)['event'] == 'resync'
+    assert subscription.get(0) is None
+
+
+def test_stream_frames_and_cleanup():
+    hub = BroadcastHub()
+    subscription = hub.subscribe('community')
+    stream = sse_stream(subscription, heartbeat=0, initial=[{'id': None, 'event': 'snapshot', 'data': []}])
+    assert next(stream) == 'retry: 3000\n\n'
+    assert next(stream) == 'event: snapshot\ndata: []\n\n'
+    hub.publish('community', 'post', {'id': 7})
+    assert next(stream) == 'id: 1\nevent: post\ndata: {"id": 7}\n\n'
+    assert next(stream) == ': keep-alive\n\n'
+    stream.close()
+    assert hub.subscriber_count('community') == 0
+
+
+def test_stream_slots_cap_thread_held_streams():
+    slots = StreamSlots(limit=2)
+    assert slots.acquire() and slots.acquire()
+    assert not slots.acquire()
+    slots.release()
+    assert slots.acquire()
+
+
+def test_publishing_prunes_expired_relay_rows(app):
+    table = BroadcastEvent.__table__
+    with db.engine.begin() as conn:
+        conn.execute(insert(table).values(origin='elsewhere:1', channel='community', event='post', data='{}',
+                                          created_at=datetime.utcnow() - timedelta(minutes=10)))
+    relay = EventRelay(BroadcastHub(), db.engine, table, retention_seconds=60)
+    relay.send('community', 'post', {'id': 1})
+    with db.engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(table)).scalar() == 1
\ No newline at end of file
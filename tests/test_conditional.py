@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from flask import Flask
+
+from mind.conditional import make_etag, as_utc, is_not_modified, not_modified, set_validators
+
+
+def test_etag_changes_with_the_data():
+    assert make_etag('mood', 1, [3, 4]) == make_etag('mood', 1, [3, 4])
+    assert make_etag('mood', 1, [3, 4]) != make_etag('mood', 1, [3, 5])
+
+
+def test_matching_etag_is_not_modified():
+    app = Flask(__name__)
+    etag = make_etag('mood', 1)
+    with app.test_request_context(headers={'If-None-Match': f'"{etag}"'}):
+        assert is_not_modified(etag)
+    with app.test_request_context(headers={'If-None-Match': '"stale"'}):
+        assert not is_not_modified(etag)
+    with app.test_request_context():
+        assert not is_not_modified(etag)
+
+
+def test_weak_etag_from_the_client_still_matches():
+    app = Flask(__name__)
+    etag = make_etag('mood', 1)
+    with app.test_request_context(headers={'If-None-Match': f'W/"{etag}"'}):
+        assert is_not_modified(etag)
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    app = Flask(__name__)
+    changed = datetime(2024, 5, 1, 12, 0, 0)
+    headers = {'If-None-Match': '"stale"', 'If-Modified-Since': 'Thu, 02 May 2024 00:00:00 GMT'}
+    with app.test_request_context(headers=headers):
+        assert not is_not_modified('current', changed)
+    with app.test_request_context(headers={'If-Modified-Since': 'Thu, 02 May 2024 00:00:00 GMT'}):
+        assert is_not_modified('current', changed)
+        assert not is_not_modified('current', datetime(2024, 5, 3))
+
+
+def test_304_carries_validators():
+    changed = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    response = not_modified('abc', changed, weak=True)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == 'W/"abc"'
+    assert response.last_modified == datetime(2024, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Cookie' in response.vary
+
+
+def test_naive_timestamps_read_as_utc():
+    assert as_utc(datetime(2024, 1, 1, 8, 30, 15, 999)) == datetime(2024, 1, 1, 8, 30, 15, tzinfo=timezone.utc)
+    assert as_utc(None) is None
\ No newline at end of file
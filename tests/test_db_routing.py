@@ -0,0 +1,60 @@
+from flask import Flask
+from sqlalchemy import create_engine, insert
+
+from mind import db
+from mind.db_routing import init_replicas, use_replica, Replica
+from mind.models import User
+
+
+def replica_with_user(tmp_path, username):
+    url = f'sqlite:///{tmp_path}/replica.db'
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__).values(username=username, email=f'{username}@example.com',
+                                                   password_hash='-'))
+    engine.dispose()
+    return url
+
+
+@use_replica
+def usernames():
+    return [user.username for user in User.query.order_by(User.id)]
+
+
+def test_read_only_requests_go_to_the_replica(app, user, tmp_path):
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [replica_with_user(tmp_path, 'copy')]
+    init_replicas(app, lambda uri: {})
+
+    with app.test_request_context('/'):
+        assert usernames() == ['copy']
+    db.session.remove()
+    with app.test_request_context('/', method='POST'):
+        assert usernames() == ['alice']
+    db.session.remove()
+
+
+def test_users_read_their_own_writes_from_the_primary(app, user, tmp_path):
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [replica_with_user(tmp_path, 'copy')]
+    init_replicas(app, lambda uri: {})
+
+    with app.test_request_context('/', method='POST') as request_context:
+        user.email = 'new@example.com'
+        db.session.commit()
+        session = dict(request_context.session)
+    db.session.remove()
+    with app.test_request_context('/') as request_context:
+        request_context.session.update(session)
+        assert usernames() == ['alice']
+    db.session.remove()
+
+
+def test_lagging_replicas_are_skipped(app, user, tmp_path):
+    app.config['SQLALCHEMY_REPLICA_URIS'] = [replica_with_user(tmp_path, 'copy')]
+    replica, = init_replicas(app, lambda uri: {})
+    replica.max_lag = -1
+
+    with app.test_request_context('/'):
+        assert usernames() == ['alice']
+    db.session.remove()
+    assert not replica.last_known_healthy
\ No newline at end of file
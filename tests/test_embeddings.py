@@ -0,0 +1,45 @@
+import time
+
+from mind import db
+from mind.embeddings import EmbeddingWorker
+from mind.models import JournalEntry
+
+
+def test_queued_entries_are_indexed_in_the_background(app, user):
+    entry = JournalEntry(user_id=user.id, title='Today', content='A quiet walk.')
+    db.session.add(entry)
+    db.session.commit()
+    indexed = []
+    worker = EmbeddingWorker(linger=0)
+    worker.init_app(app, lambda entry: indexed.append((entry.id, entry.content)) or True)
+
+    worker.enqueue(entry)
+    worker.enqueue(entry)
+    deadline = time.monotonic() + 5
+    while worker.stats()['indexed'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert indexed == [(entry.id, 'A quiet walk.')]
+
+
+def test_missing_or_foreign_entries_are_skipped(app, user):
+    entry = JournalEntry(user_id=user.id, title='Today', content='A quiet walk.')
+    db.session.add(entry)
+    db.session.commit()
+    worker = EmbeddingWorker()
+    worker.init_app(app, lambda entry: True)
+    assert not worker.index_pending(user.id, entry.id + 1)
+    assert not worker.index_pending(user.id + 1, entry.id)
+    assert worker.index_pending(user.id, entry.id)
+
+
+def test_queue_is_bounded(app):
+    worker = EmbeddingWorker(max_pending=2)
+    worker.start = lambda: None
+
+    class Entry:
+        def __init__(self, entry_id):
+            self.user_id, self.id = 1, entry_id
+
+    for entry_id in (1, 2, 3):
+        worker.enqueue(Entry(entry_id))
+    assert worker.stats() == {'indexed': 0, 'pending': 2, 'dropped': 1}
\ No newline at end of file
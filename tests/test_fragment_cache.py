@@ -0,0 +1,38 @@
+from flask import render_template_string
+
+from mind import db
+from mind.fragment_cache import LRUCache, fragment_cache, init_fragment_cache, get_data_version
+from mind.models import MoodEntry
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    cache.get('a')
+    cache.set('c', 'C')
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_fragments_are_rerendered_after_the_users_data_changes(app, user):
+    init_fragment_cache(app)
+    fragment_cache.clear()
+    renders = []
+    template = "{% cache 'widget', user_id %}{{ render() }}{% endcache %}"
+
+    def render():
+        renders.append(get_data_version(user.id))
+        return f'render {len(renders)}'
+
+    with app.test_request_context():
+        assert render_template_string(template, user_id=user.id, render=render) == 'render 1'
+    with app.test_request_context():
+        assert render_template_string(template, user_id=user.id, render=render) == 'render 1'
+
+    db.session.add(MoodEntry(user_id=user.id, mood_score=5))
+    db.session.commit()
+    with app.test_request_context():
+        assert render_template_string(template, user_id=user.id, render=render) == 'render 2'
+    assert renders == [0, 1]
\ No newline at end of file
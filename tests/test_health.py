@@ -0,0 +1,16 @@
+from mind.health import database_status, process_memory
+
+
+def test_every_database_is_pinged(sharded_app):
+    assert database_status() == {'primary': 'ok', 'shard_0': 'ok', 'shard_1': 'ok'}
+
+
+def test_unreachable_shard_is_reported(sharded_app, tmp_path):
+    from sqlalchemy import create_engine
+    sharded_app.extensions['shard_router'].engines[1] = create_engine(f'sqlite:///{tmp_path}/missing/shard.db')
+    assert database_status()['shard_1'] == 'error'
+
+
+def test_process_memory_is_reported_in_mib():
+    memory = process_memory()
+    assert all(value > 0 for value in memory.values())
\ No newline at end of file
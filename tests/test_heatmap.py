@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from mind import db
+from mind.heatmap import HeatmapCache, record_checkin, bucket_for, MEMBER_RETENTION
+from mind.models import MoodAggregate
+
+
+def checkin(user_id, score=0.5, sentiment='positive', created_at=None):
+    with db.engine.begin() as connection:
+        record_checkin(connection, user_id, score, sentiment, created_at)
+
+
+def test_hours_with_too_few_people_are_left_out(app):
+    for user_id in (1, 2):
+        checkin(user_id)
+    payload = HeatmapCache(min_users=3).get(1)
+    assert payload['cells'] == []
+
+    checkin(3, score=-0.5, sentiment='negative')
+    cell, = HeatmapCache(min_users=3).get(1)['cells']
+    assert cell['entries'] == 3
+    assert cell['sentiment']['negative'] == 1
+
+
+def test_repeat_checkins_count_one_person(app):
+    for _ in range(4):
+        checkin(1)
+    row = db.session.query(MoodAggregate).one()
+    assert (row.entry_count, row.user_count) == (4, 1)
+    assert HeatmapCache(min_users=2).get(1)['cells'] == []
+
+
+def test_backdated_checkins_stay_out_of_live_aggregates(app):
+    checkin(1, created_at=datetime.utcnow() - MEMBER_RETENTION - timedelta(hours=1))
+    assert db.session.query(MoodAggregate).count() == 0
+
+
+def test_buckets_are_hours():
+    assert bucket_for(datetime(2024, 5, 1, 13, 47, 5, 12)) == datetime(2024, 5, 1, 13)
\ No newline at end of file
@@ -0,0 +1,30 @@
+import pytest
+
+# Importing the analysis loads the analyzer models
+pytest.importorskip('transformers')
+
+from mind.journal_analysis import split_passages, split_sentences, sentence_hash, PASSAGE_CHARS
+
+
+def test_passages_stay_within_one_window():
+    text = ' '.join(f'Sentence number {n} describes a small part of the day.' for n in range(400))
+    passages = split_passages(text)
+    assert len(passages) > 1
+    assert all(len(passage) <= PASSAGE_CHARS for passage in passages)
+    assert ' '.join(passages) == text
+
+
+def test_editing_one_sentence_keeps_the_other_passages():
+    sentences = [f'Sentence number {n} describes a small part of the day.' for n in range(200)]
+    before = split_passages(' '.join(sentences))
+    sentences[150] = 'This sentence was rewritten later.'
+    after = split_passages(' '.join(sentences))
+    unchanged = {sentence_hash(p) for p in before} & {sentence_hash(p) for p in after}
+    assert len(unchanged) >= len(before) - 2
+
+
+def test_run_on_sentences_are_cut_at_words():
+    sentence = 'word ' * (PASSAGE_CHARS // 2)
+    pieces = split_sentences(sentence)
+    assert len(pieces) == 3 and all(len(piece) <= PASSAGE_CHARS for piece in pieces)
+    assert all(set(piece.split()) == {'word'} for piece in pieces)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import json
+import pytest
+
+from mind.lexicon import Lexicon, LexiconError, LexiconStore
+
+
+def lexicon_data(**overrides):
+    data = {'version': '1', 'emergency': ['want to die', 'die', 'hopeless'],
+            'positive': ['happy'], 'negative': ['sad'], 'emotions': {'joy': ['happy']}}
+    data.update(overrides)
+    return data
+
+
+def test_overlapping_crisis_phrases_are_all_reported():
+    lexicon = Lexicon.from_dict(lexicon_data())
+    assert lexicon.emergency_matches('Some days I WANT TO DIE') == ['want to die', 'die']
+    assert lexicon.emergency_matches('A good day') == []
+
+
+def test_emergency_list_is_required():
+    with pytest.raises(LexiconError):
+        Lexicon.from_dict(lexicon_data(emergency=[]))
+    with pytest.raises(LexiconError):
+        Lexicon.from_dict(lexicon_data(positive='happy'))
+
+
+def test_store_keeps_the_last_good_version(tmp_path):
+    path = tmp_path / 'mood.json'
+    path.write_text(json.dumps(lexicon_data()))
+    store = LexiconStore(str(path), reload_seconds=0)
+    assert store.current.version == '1'
+
+    path.write_text('{"version": "2", "emergency": []}')
+    assert not store.reload(force=True)
+    assert store.current.version == '1'
+    assert store.status()['error']
+
+    path.write_text(json.dumps(lexicon_data(version='3')))
+    assert store.reload(force=True)
+    assert store.current.version == '3'
+
+
+def test_shipped_lexicon_is_valid():
+    lexicon = LexiconStore(reload_seconds=0).current
+    assert lexicon.emergency_keywords
\ No newline at end of file
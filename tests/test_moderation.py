@@ -0,0 +1,52 @@
+from mind import db
+from mind.models import CommunityPost, PostModeration
+from mind.moderation import ModerationWorker, visible_posts, APPROVED, FLAGGED, PENDING
+
+
+class KeywordAnalyzer:
+    """Stands in for the models: every post reads as neutral, 'hopeless' is a crisis phrase"""
+
+    def analyze_sentiment_batch(self, texts):
+        return [{'sentiment': 'neutral', 'score': 0.0} for _ in texts]
+
+    def check_emergency_keywords(self, text):
+        found = [keyword for keyword in ('hopeless',) if keyword in text.lower()]
+        return bool(found), found
+
+
+def share(user_id, content):
+    post = CommunityPost(user_id=user_id, content=content)
+    db.session.add_all([post, PostModeration(post=post)])
+    db.session.commit()
+    return post
+
+
+def test_pending_posts_are_only_visible_to_their_author(app):
+    post = share(1, 'First post')
+    assert [p.id for p in visible_posts(CommunityPost.query, 1)] == [post.id]
+    assert visible_posts(CommunityPost.query, 2).count() == 0
+
+
+def test_one_batch_screens_every_pending_post(app):
+    calm, crisis = share(1, 'A good day'), share(2, 'Feeling hopeless')
+    screened = []
+    worker = ModerationWorker()
+    worker.init_app(app, KeywordAnalyzer(), on_screened=lambda post, row: screened.append(post.id))
+    worker.start = lambda: None
+
+    assert worker.screen_pending() == 2
+    assert db.session.get(PostModeration, calm.id).status == APPROVED
+    flagged = db.session.get(PostModeration, crisis.id)
+    assert (flagged.status, flagged.crisis_keywords) == (FLAGGED, 'hopeless')
+    assert sorted(screened) == [calm.id, crisis.id]
+    assert worker.screen_pending() == 0
+    assert [p.id for p in visible_posts(CommunityPost.query, 3)] == [calm.id]
+
+
+def test_claimed_posts_are_not_screened_twice(app):
+    post = share(1, 'A good day')
+    first, second = ModerationWorker(), ModerationWorker()
+    claimed = first._claim()
+    assert [row.post_id for row in claimed] == [post.id]
+    assert second._claim() == []
+    assert db.session.get(PostModeration, post.id).status == PENDING
\ No newline at end of file
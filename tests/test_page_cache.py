@@ -0,0 +1,47 @@
+from flask import Flask, abort
+from flask_login import LoginManager
+
+from mind.page_cache import cached_page, page_cache
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    LoginManager(app).user_loader(lambda user_id: None)
+    renders = []
+
+    @app.route('/about')
+    @cached_page
+    def about():
+        renders.append('about')
+        return '<h1>About</h1>'
+
+    @app.route('/missing')
+    @cached_page
+    def missing():
+        renders.append('missing')
+        return '<h1>Gone</h1>', 404
+
+    page_cache.clear()
+    return app, renders
+
+
+def test_pages_render_once_and_revalidate():
+    app, renders = make_app()
+    client = app.test_client()
+    first = client.get('/about')
+    assert client.get('/about').data == first.data == b'<h1>About</h1>'
+    assert renders == ['about']
+
+    revalidated = client.get('/about', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert 'Cookie' in revalidated.headers['Vary']
+
+
+def test_error_pages_are_never_304():
+    app, renders = make_app()
+    client = app.test_client()
+    first = client.get('/missing')
+    assert first.status_code == 404 and 'ETag' not in first.headers
+    assert client.get('/missing', headers={'If-None-Match': '*'}).status_code == 404
+    assert renders == ['missing']
\ No newline at end of file
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from mind import db
+from mind.archive import archive_old_entries
+from mind.models import JournalEntry
+from mind.search import init_search, search_journals, search_terms, _HIT_COUNTERS, _backend
+
+
+def write(user_id, content, days_ago=0):
+    db.session.add(JournalEntry(user_id=user_id, title='Entry', content=content,
+                                created_at=datetime.utcnow() - timedelta(days=days_ago)))
+
+
+def test_search_finds_only_the_users_entries(app, user):
+    init_search(app)
+    write(user.id, 'Walked the dog by the river')
+    write(user.id, 'Stayed in and read')
+    write(user.id + 1, 'Walked the dog too')
+    db.session.commit()
+
+    results, has_more = search_journals(user.id, 'walk')
+    assert [result['excerpt'] for result in results] == ['Walked the dog by the river']
+    assert not has_more
+
+
+def test_paging_continues_into_archived_entries(app, user):
+    init_search(app)
+    for days_ago in (400, 300, 3, 2, 1):
+        write(user.id, f'Morning run, {days_ago} days ago', days_ago)
+    db.session.commit()
+    archive_old_entries(app, 30)
+
+    pages = [search_journals(user.id, 'run', page, per_page=2) for page in (1, 2, 3)]
+    assert [[result['archived'] for result in results] for results, _ in pages] == \
+        [[False, False], [False, True], [True]]
+    assert [has_more for _, has_more in pages] == [True, True, False]
+
+
+def test_counters_match_the_hit_finders(app, user):
+    init_search(app)
+    for content in ('Rainy day', 'Rain again', 'Sunny'):
+        write(user.id, content)
+    db.session.commit()
+    assert _backend(db.engine) == 'fts5'
+    for backend in ('fts5', None):
+        assert _HIT_COUNTERS[backend](JournalEntry, user.id, ['rain']) == 2
+
+
+def test_search_terms_are_plain_words():
+    assert search_terms('"Dog" OR cat* -fish') == ['dog', 'or', 'cat', 'fish']
\ No newline at end of file
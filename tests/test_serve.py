@@ -0,0 +1,13 @@
+import pytest
+
+pytest.importorskip('gunicorn')
+
+from mind.serve import options_from_env
+
+
+def test_asgi_workers_by_default(monkeypatch):
+    monkeypatch.setenv('WEB_THREADS', '8')
+    assert options_from_env(asgi=True)['worker_class'] == 'uvicorn.workers.UvicornWorker'
+    options = options_from_env(asgi=False)
+    assert (options['worker_class'], options['threads']) == ('gthread', 8)
+    assert options['preload_app']
\ No newline at end of file
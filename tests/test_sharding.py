@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import select, func
+
+from mind import db
+from mind.models import User, MoodEntry, JournalEntry, UserMove, ChangeLog
+from mind.sharding import move_user, shard_index_for, using_shard, UserMovingError, ShardingError
+
+
+def add_user(name):
+    user = User(username=name, email=f'{name}@example.com')
+    user.set_password('correct horse')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def rows_on(app, shard, model, user_id):
+    engine = app.extensions['shard_router'].engines[shard]
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model.__table__)
+                            .where(model.__table__.c.user_id == user_id)).scalar()
+
+
+def test_rows_live_on_the_users_shard(sharded_app):
+    user_id = add_user('alice')
+    with using_shard(db.session, user_id):
+        db.session.add(MoodEntry(user_id=user_id, mood_score=6))
+        db.session.commit()
+    shard = shard_index_for(user_id)
+    assert shard == user_id % 2
+    assert rows_on(sharded_app, shard, MoodEntry, user_id) == 1
+    assert rows_on(sharded_app, 1 - shard, MoodEntry, user_id) == 0
+
+
+def test_writes_are_refused_while_the_user_is_fenced(sharded_app):
+    user_id = add_user('alice')
+    db.session.add(UserMove(user_id=user_id, target_shard=1 - shard_index_for(user_id)))
+    db.session.commit()
+    sharded_app.extensions['shard_router'].invalidate(user_id)
+
+    with using_shard(db.session, user_id):
+        # Reads still go through
+        assert MoodEntry.query.filter_by(user_id=user_id).count() == 0
+        db.session.add(MoodEntry(user_id=user_id, mood_score=6))
+        with pytest.raises(UserMovingError):
+            db.session.commit()
+        db.session.rollback()
+
+
+def test_move_user_copies_rows_and_lifts_the_fence(sharded_app):
+    user_id = add_user('alice')
+    with using_shard(db.session, user_id):
+        db.session.add(MoodEntry(user_id=user_id, mood_score=6))
+        db.session.add(JournalEntry(user_id=user_id, title='Moving', content='Packing boxes.'))
+        db.session.commit()
+    source = shard_index_for(user_id)
+
+    assert move_user(sharded_app, user_id, 1 - source) >= 2
+
+    assert shard_index_for(user_id) == 1 - source
+    assert db.session.get(UserMove, user_id) is None
+    assert rows_on(sharded_app, source, JournalEntry, user_id) == 0
+    with using_shard(db.session, user_id):
+        assert JournalEntry.query.filter_by(user_id=user_id).one().content == 'Packing boxes.'
+        # Writable again once the fence is gone
+        db.session.add(MoodEntry(user_id=user_id, mood_score=7))
+        db.session.commit()
+        # Entry ids changed, so delta-sync clients are told to start over
+        assert ChangeLog.query.filter_by(user_id=user_id, op='reset').count() == 1
+
+
+def test_move_to_an_unknown_shard_is_refused(sharded_app):
+    user_id = add_user('alice')
+    with pytest.raises(ShardingError):
+        move_user(sharded_app, user_id, 5)
\ No newline at end of file
@@ -0,0 +1,46 @@
+import threading
+
+from sqlalchemy import create_engine, text
+
+from mind.sqlite_profile import WriteLock, install_sqlite_profile, sqlite_settings_from_env
+
+
+def test_write_lock_is_reentrant_in_one_thread():
+    lock = WriteLock()
+    hold = lock.acquire(1)
+    assert lock.acquire(1) is hold
+    lock.release(hold)
+    # Still held by the outer level
+    taken = []
+    thread = threading.Thread(target=lambda: taken.append(lock.acquire(0.05)))
+    thread.start()
+    thread.join()
+    assert taken == [None]
+    lock.release(hold)
+    assert lock.acquire(0.05) is not None
+
+
+def test_write_lock_can_be_released_from_another_thread():
+    lock = WriteLock()
+    hold = lock.acquire(1)
+    thread = threading.Thread(target=lock.release, args=(hold,))
+    thread.start()
+    thread.join()
+    taken = []
+    thread = threading.Thread(target=lambda: taken.append(lock.acquire(0.05)))
+    thread.start()
+    thread.join()
+    assert taken[0] is not None
+
+
+def test_writes_take_and_return_the_engine_lock(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/profile.db')
+    install_sqlite_profile(engine, sqlite_settings_from_env())
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE notes (body TEXT)'))
+        conn.execute(text("INSERT INTO notes VALUES ('hello')"))
+        assert 'sqlite_write_lock' in conn.info
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert 'sqlite_write_lock' not in conn.info
+    engine.dispose()
\ No newline at end of file
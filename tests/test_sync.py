@@ -0,0 +1,66 @@
+from mind import db
+from mind.models import MoodEntry, JournalEntry
+from mind.sync import changes_since, encode_cursor, decode_cursor
+
+
+def test_first_sync_returns_every_entry(app, user):
+    db.session.add(MoodEntry(user_id=user.id, mood_score=7))
+    db.session.add(JournalEntry(user_id=user.id, title='Monday', content='A long day.'))
+    db.session.commit()
+
+    page = changes_since(user.id, None)
+    assert not page['reset'] and not page['has_more']
+    assert sorted(change['type'] for change in page['changes']) == ['journal', 'mood']
+
+
+def test_cursor_only_returns_later_changes(app, user):
+    entry = JournalEntry(user_id=user.id, title='Draft', content='First try.')
+    db.session.add(entry)
+    db.session.commit()
+    cursor = changes_since(user.id, None)['cursor']
+    assert changes_since(user.id, cursor)['changes'] == []
+
+    entry.content = 'Second try.'
+    db.session.commit()
+    page = changes_since(user.id, cursor)
+    assert [change['data']['content'] for change in page['changes']] == ['Second try.']
+
+    db.session.delete(entry)
+    db.session.commit()
+    page = changes_since(user.id, page['cursor'])
+    assert page['changes'] == [{'type': 'journal', 'id': entry.id, 'deleted': True}]
+
+
+def test_log_keeps_one_row_per_entry(app, user):
+    entry = MoodEntry(user_id=user.id, mood_score=3)
+    db.session.add(entry)
+    db.session.commit()
+    for score in (4, 5, 6):
+        entry.mood_score = score
+        db.session.commit()
+    changes = changes_since(user.id, None)['changes']
+    assert len(changes) == 1 and changes[0]['data']['mood_score'] == 6
+
+
+def test_paging(app, user):
+    db.session.add_all([MoodEntry(user_id=user.id, mood_score=score) for score in range(5)])
+    db.session.commit()
+    first = changes_since(user.id, None, limit=3)
+    assert first['has_more'] and len(first['changes']) == 3
+    second = changes_since(user.id, first['cursor'], limit=3)
+    assert not second['has_more'] and len(second['changes']) == 2
+
+
+def test_unusable_cursors_reset_the_client():
+    assert decode_cursor(encode_cursor(1, 42), 1) == 42
+    assert decode_cursor(None, 1) == 0
+    # Another user's cursor, or garbage, means starting over
+    assert decode_cursor(encode_cursor(2, 42), 1) is None
+    assert decode_cursor('not a cursor!', 1) is None
+
+
+def test_foreign_cursor_starts_over(app, user):
+    db.session.add(MoodEntry(user_id=user.id, mood_score=5))
+    db.session.commit()
+    page = changes_since(user.id, encode_cursor(user.id + 1, 10))
+    assert page['reset'] and len(page['changes']) == 1
\ No newline at end of file
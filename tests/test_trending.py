@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from mind import db
+from mind.models import CommunityPost, PostModeration
+from mind.trending import TrendingFeed, trending_key
+
+
+def post(created_at, hearts=0):
+    return CommunityPost(user_id=1, content='Hello', created_at=created_at, hearts_count=hearts)
+
+
+def test_doubling_reactions_is_worth_one_half_life():
+    now = datetime(2024, 5, 1, 12)
+    half_life = 3600.0
+    older = post(now - timedelta(seconds=half_life), hearts=3)
+    newer = post(now, hearts=1)
+    assert abs(trending_key(older, half_life) - trending_key(newer, half_life)) < 1e-9
+
+
+def test_rebuild_ranks_only_visible_posts(app):
+    now = datetime.utcnow()
+    hidden = post(now)
+    db.session.add_all([post(now - timedelta(hours=1), hearts=50), post(now), hidden])
+    db.session.flush()
+    db.session.add(PostModeration(post_id=hidden.id, status='hidden'))
+    db.session.commit()
+
+    feed = TrendingFeed(half_life_hours=1)
+    assert feed.rebuild() == 2
+    assert feed.top(10) == [1, 2]
+
+
+def test_remember_keeps_the_top_list_bounded():
+    feed = TrendingFeed(size=2)
+    feed._loaded_at = float('inf')
+    feed.remember(1, 1.0)
+    feed.remember(2, 3.0)
+    feed.remember(3, 2.0)
+    assert feed.top() == [2, 3]
+    feed.remember(2, None)
+    assert feed.top() == [3]
\ No newline at end of file
@@ -0,0 +1,33 @@
+import numpy as np
+
+from mind.vector_index import VectorIndex
+
+
+def test_search_ranks_by_cosine_similarity(tmp_path):
+    index = VectorIndex(str(tmp_path), block_rows=2)
+    index.add(1, 10, [1, 0, 0])
+    index.add(1, 11, [0.9, 0.1, 0])
+    index.add(1, 12, [0, 1, 0])
+    index.add(2, 20, [1, 0, 0])
+
+    matches = index.search(1, [1, 0, 0], k=2)
+    assert [entry_id for entry_id, _ in matches] == [10, 11]
+    assert index.search(1, [1, 0, 0], k=5, exclude=[10])[0][0] == 11
+
+
+def test_newest_record_wins(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    index.add(1, 10, [1, 0])
+    index.add(1, 10, [0, 1])
+    assert np.allclose(index.get(1, 10), [0, 1], atol=1e-3)
+    assert len(index.search(1, [0, 1], k=5)) == 1
+    assert index.get(1, 99) is None
+
+
+def test_remap_renumbers_and_drops_unmapped_entries(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    index.add(1, 10, [1, 0])
+    index.add(1, 11, [0, 1])
+    index.remap(1, {10: 100})
+    assert index.get(1, 100) is not None
+    assert index.get(1, 10) is None and index.get(1, 11) is None
\ No newline at end of file
@@ -0,0 +1,108 @@
+import math
+import time
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import select, delete, desc
+
+from . import db
+from .models import CommunityPost, PostRanking, PostModeration
+from .moderation import APPROVED
+
+# Trending order for the community wall.
+#
+# A post's trending key is
+#
+#     log2(1 + weighted reactions) + created_at / half_life
+#
+# Doubling a post's reactions is worth exactly one half-life of freshness, and
+# because time only enters through the creation date the key never changes
+# while a post sits untouched. That makes the order materializable: the key is
+# stored in post_rankings (indexed), rewritten only when a post is approved
+# or reacted to, and the top of the order is kept in memory. Other processes'
+# updates are picked up by re-reading the top rows every few seconds.
+
+REACTION_WEIGHTS = {'heart': 1.0, 'hug': 1.0, 'support': 1.5}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def trending_key(post, half_life_seconds):
+    weighted = (REACTION_WEIGHTS['heart'] * (post.hearts_count or 0) +
+                REACTION_WEIGHTS['hug'] * (post.hugs_count or 0) +
+                REACTION_WEIGHTS['support'] * (post.support_count or 0))
+    created_at = post.created_at or datetime.utcnow()
+    return math.log2(1 + weighted) + (created_at - EPOCH).total_seconds() / half_life_seconds
+
+
+class TrendingFeed:
+    def __init__(self, size=200, refresh_seconds=10.0, half_life_hours=12.0):
+        self.size = size
+        self.refresh_seconds = refresh_seconds
+        self.half_life_hours = half_life_hours
+        self._top = []
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def half_life_seconds(self):
+        return self.half_life_hours * 3600.0
+
+    def key_for(self, post):
+        return trending_key(post, self.half_life_seconds)
+
+    def rank(self, post):
+        """Write a visible post's current key; call inside the transaction that changed it"""
+        key = self.key_for(post)
+        db.session.merge(PostRanking(post_id=post.id, trending_key=key))
+        return key
+
+    def unrank(self, post_id):
+        db.session.execute(delete(PostRanking).where(PostRanking.post_id == post_id))
+
+    def remember(self, post_id, key):
+        """Apply a committed key change to this process's in-memory top list"""
+        with self._lock:
+            top = [entry for entry in self._top if entry[1] != post_id]
+            if key is not None and (len(top) < self.size or key > top[-1][0]):
+                top.append((key, post_id))
+                top.sort(reverse=True)
+                del top[self.size:]
+            self._top = top
+
+    def _reload(self):
+        rows = db.session.execute(
+            select(PostRanking.trending_key, PostRanking.post_id)
+            .order_by(desc(PostRanking.trending_key)).limit(self.size)
+        ).all()
+        with self._lock:
+            self._top = [(key, post_id) for key, post_id in rows]
+            self._loaded_at = time.monotonic()
+
+    def top(self, limit=20, offset=0):
+        """Post ids of the hottest posts, best first"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self._reload()
+        return [post_id for _, post_id in self._top[offset:offset + limit]]
+
+    def rebuild(self):
+        """Recompute every ranking from the visible posts"""
+        approved = PostModeration.status.is_(None) | (PostModeration.status == APPROVED)
+        posts = CommunityPost.query.outerjoin(PostModeration, PostModeration.post_id == CommunityPost.id)\
+                                   .filter(approved).all()
+        db.session.execute(delete(PostRanking))
+        db.session.add_all(PostRanking(post_id=post.id, trending_key=self.key_for(post)) for post in posts)
+        db.session.commit()
+        self._loaded_at = None
+        logging.info(f"Ranked {len(posts)} community posts for the trending feed")
+        return len(posts)
+
+
+# Global trending order
+trending_feed = TrendingFeed()
+
+
+def init_trending(app):
+    trending_feed.size = app.config.get('TRENDING_CACHE_SIZE', trending_feed.size)
+    trending_feed.refresh_seconds = app.config.get('TRENDING_REFRESH_SECONDS', trending_feed.refresh_seconds)
+    trending_feed.half_life_hours = app.config.get('TRENDING_HALF_LIFE_HOURS', trending_feed.half_life_hours)
\ No newline at end of file
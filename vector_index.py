@@ -0,0 +1,151 @@
+import os
+import glob
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Per-user vector index for "entries like this" search.
+#
+# Each user has one append-only file of fixed-size records (entry id plus a
+# float16 unit vector) that is memory-mapped for search. Saving a journal
+# appends one record with a single O_APPEND write, so concurrent workers never
+# interleave partial records; re-embedding an entry appends a newer record
+# that shadows the old one. The embedding width is part of the file name, so
+# switching encoders starts a fresh file instead of corrupting the old one.
+# Moving a user to another shard renumbers their entries; remap() rewrites the
+# files under a new name and renames them into place.
+
+class VectorIndex:
+    def __init__(self, directory=None, block_rows=4096, max_open=256):
+        self.directory = directory
+        self.block_rows = block_rows
+        self.max_open = max_open
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def record_dtype(dim):
+        return np.dtype([('id', '<i8'), ('vector', '<f2', (dim,))])
+
+    def _path(self, user_id, dim):
+        return os.path.join(self.directory, f'user_{int(user_id)}_{int(dim)}.vec')
+
+    def add(self, user_id, entry_id, vector):
+        """Append an entry's embedding to the owner's index"""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        record = np.zeros(1, dtype=self.record_dtype(vector.size))
+        record['id'] = entry_id
+        record['vector'] = vector
+
+        os.makedirs(self.directory, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+        fd = os.open(self._path(user_id, vector.size), flags, 0o600)
+        try:
+            os.write(fd, record.tobytes())
+        finally:
+            os.close(fd)
+
+    def _load(self, user_id, dim):
+        """Memory-mapped records and a mask of the newest record per entry"""
+        path = self._path(user_id, dim)
+        dtype = self.record_dtype(dim)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None
+        # A half-written trailing record is ignored until it is complete
+        count = stat.st_size // dtype.itemsize
+        if count == 0:
+            return None, None
+
+        # A remapped file replaces the old one, so the inode is part of the key
+        key = (stat.st_ino, count)
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == key:
+                self._maps.move_to_end(path)
+                return cached[1], cached[2]
+
+        records = np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+        ids = np.asarray(records['id'])
+        _, newest_reversed = np.unique(ids[::-1], return_index=True)
+        live = np.zeros(count, dtype=bool)
+        live[count - 1 - newest_reversed] = True
+
+        with self._lock:
+            self._maps[path] = (key, records, live)
+            while len(self._maps) > self.max_open:
+                self._maps.popitem(last=False)
+        return records, live
+
+    def remap(self, user_id, id_map):
+        """Rewrite a user's files with entry ids translated by id_map, dropping entries it does not cover"""
+        pattern = os.path.join(self.directory, f'user_{int(user_id)}_*.vec')
+        for path in glob.glob(pattern):
+            dim = int(path.rsplit('_', 1)[1].split('.')[0])
+            records, live = self._load(user_id, dim)
+            if records is None:
+                continue
+            ids = np.asarray(records['id'])
+            mapped = np.array([id_map.get(int(entry_id), -1) for entry_id in ids], dtype=np.int64)
+            keep = live & (mapped >= 0)
+            remapped = np.array(records[keep])
+            remapped['id'] = mapped[keep]
+            temporary = f'{path}.{os.getpid()}.tmp'
+            remapped.tofile(temporary)
+            os.replace(temporary, path)
+
+    def get(self, user_id, entry_id):
+        """Stored embedding of an entry as float32, or None when it was never indexed"""
+        pattern = os.path.join(self.directory, f'user_{int(user_id)}_*.vec')
+        # Newest file first, in case the encoder changed
+        for path in sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True):
+            dim = int(path.rsplit('_', 1)[1].split('.')[0])
+            records, live = self._load(user_id, dim)
+            if records is None:
+                continue
+            matches = np.flatnonzero((records['id'] == entry_id) & live)
+            if len(matches):
+                return np.asarray(records['vector'][matches[-1]], dtype=np.float32)
+        return None
+
+    def search(self, user_id, vector, k=5, exclude=()):
+        """Top-k (entry id, cosine similarity) pairs, most similar first"""
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        records, live = self._load(user_id, query.size)
+        if records is None or k <= 0:
+            return []
+
+        excluded = np.asarray(list(exclude), dtype=np.int64)
+        candidate_scores, candidate_ids = [], []
+        # Float16 has no BLAS path, so widen one cache-sized block at a time
+        buffer = np.empty((min(self.block_rows, len(records)), query.size), dtype=np.float32)
+        for start in range(0, len(records), self.block_rows):
+            block = records[start:start + self.block_rows]
+            widened = buffer[:len(block)]
+            np.copyto(widened, block['vector'], casting='unsafe')
+            scores = widened @ query
+            ids = np.asarray(block['id'])
+            scores[~live[start:start + self.block_rows]] = -np.inf
+            if len(excluded):
+                scores[np.isin(ids, excluded)] = -np.inf
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+                scores, ids = scores[top], ids[top]
+            candidate_scores.append(scores)
+            candidate_ids.append(ids)
+
+        scores = np.concatenate(candidate_scores)
+        ids = np.concatenate(candidate_ids)
+        order = np.argsort(-scores)[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order if np.isfinite(scores[i])]
+
+
+# Global index, pointed at VECTOR_INDEX_DIR when the routes load
+vector_index = VectorIndex()
\ No newline at end of file